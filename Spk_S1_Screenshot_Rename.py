@@ -1,28 +1,261 @@
 import os
+import re
+import json
+import time
+import hashlib
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from Spk_manifest import file_hash
 
-def rename_screenshots(folder_path, new_name):
-    files = os.listdir(folder_path)
-    
+# === 配置区 ===
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp')
+ORDERS = ("name", "mtime", "exif")
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+DUPLICATE_DIR = "_duplicates"           # 内容完全相同的截图移到这里，不删除
+JOURNAL_NAME = ".rename_plan.json"      # 两阶段重命名的计划，全部完成后删除
+TEMP_PREFIX = ".spk_rename_"
+COPY_CHUNK = 1024 * 1024
+MAX_INGEST_SIDE = 4096                  # 导入时长边超过该像素数的图片会被缩小（手机截图一般不超过 2800）
+
+# === 两阶段重命名 ===
+# 1. 规划：按确定的顺序排好所有图片，算出每张图的目标名 {前缀}_{序号}{扩展名}，写入计划文件
+# 2. 暂存：所有需要改名的文件先改成临时名，腾出目标名
+# 3. 落地：临时名 → 目标名
+# 目标名之间不会冲突，重复运行结果一致；中途中断时，下次运行先按计划文件把上次的改名做完。
+# 已经是 {前缀}_{序号} 的文件按原序号排在最前面，之后是新加入的图片，序号始终从 1 连续编号。
+
+def natural_key(name: str):
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", name)]
+
+
+def list_images(folder_path):
+    with os.scandir(folder_path) as entries:
+        return [e.name for e in entries
+                if e.is_file() and e.name.lower().endswith(IMAGE_EXTS) and not e.name.startswith(TEMP_PREFIX)]
+
+
+def _mtime_stamp(path):
+    return time.strftime("%Y:%m:%d %H:%M:%S", time.localtime(os.path.getmtime(path)))
+
+
+# 拍摄时间：EXIF DateTimeOriginal / DateTime，没有时退回修改时间（格式相同，可直接比较）
+def _exif_stamp(path):
+    try:
+        from PIL import Image
+        with Image.open(path) as image:
+            exif = image.getexif()
+            stamp = exif.get_ifd(0x8769).get(36867) or exif.get(306)
+    except Exception:
+        stamp = None
+    return stamp or _mtime_stamp(path)
+
+
+def sort_key(folder_path, name, order):
+    path = os.path.join(folder_path, name)
+    if order == "mtime":
+        return _mtime_stamp(path), natural_key(name)
+    if order == "exif":
+        return _exif_stamp(path), natural_key(name)
+    return natural_key(name)
+
+
+def ordered_images(folder_path, files, new_name, order="name"):
+    numbered = re.compile(rf"^{re.escape(new_name)}_(\d+)\.[^.]+$", re.IGNORECASE)
+    done = sorted((int(numbered.match(f).group(1)), f) for f in files if numbered.match(f))
+    rest = sorted((f for f in files if not numbered.match(f)), key=lambda f: sort_key(folder_path, f, order))
+    return [f for _, f in done] + rest
+
+
+# 内容完全相同的文件只保留排序最靠前的一份，其余移到 _duplicates；哈希在线程池里并行计算
+def move_duplicates(folder_path, files, workers=DEFAULT_WORKERS):
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        hashes = list(pool.map(file_hash, [os.path.join(folder_path, f) for f in files]))
+    seen, kept = {}, []
+    for name, digest in zip(files, hashes):
+        if digest not in seen:
+            seen[digest] = name
+            kept.append(name)
+            continue
+        dup_dir = os.path.join(folder_path, DUPLICATE_DIR)
+        os.makedirs(dup_dir, exist_ok=True)
+        target = unique_path(dup_dir, name)
+        os.replace(os.path.join(folder_path, name), target)
+        print(f"重复截图（与 {seen[digest]} 相同），已移到 {DUPLICATE_DIR}：{name}")
+    return kept
+
+
+def unique_path(folder, name):
+    base, ext = os.path.splitext(name)
+    path, n = os.path.join(folder, name), 1
+    while os.path.exists(path):
+        path = os.path.join(folder, f"{base}_{n}{ext}")
+        n += 1
+    return path
+
+
+def plan_renames(files, new_name):
+    moves = []
     for index, file in enumerate(files):
-        if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
-            file_extension = os.path.splitext(file)[1]
-            new_file_name = f"{new_name}_{index + 1}{file_extension}"
+        target = f"{new_name}_{index + 1}{os.path.splitext(file)[1]}"
+        if file != target:
+            moves.append([file, f"{TEMP_PREFIX}{index + 1}{os.path.splitext(file)[1]}", target])
+    return moves
+
+
+def _write_journal(folder_path, plan):
+    with open(os.path.join(folder_path, JOURNAL_NAME), "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False)
 
-            old_file_path = os.path.join(folder_path, file)
-            new_file_path = os.path.join(folder_path, new_file_name)
 
-            if os.path.exists(new_file_path):
-                print(f"已存在目标文件，跳过：{new_file_name}")
+# 按计划执行暂存和落地，计划里记录已完成的阶段。中断后再次调用会从断点继续：
+# 暂存阶段还没有文件落地，源文件名仍指向原文件，不存在的视为已暂存；
+# 落地阶段只移动仍然存在的临时文件。
+def apply_plan(folder_path, plan, workers=DEFAULT_WORKERS):
+    def move(src, dst):
+        src_path = os.path.join(folder_path, src)
+        if os.path.exists(src_path):
+            os.replace(src_path, os.path.join(folder_path, dst))
+
+    moves = plan["moves"]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        if not plan.get("staged"):
+            list(pool.map(lambda m: move(m[0], m[1]), moves))
+            plan["staged"] = True
+            _write_journal(folder_path, plan)
+        list(pool.map(lambda m: move(m[1], m[2]), moves))
+    os.remove(os.path.join(folder_path, JOURNAL_NAME))
+
+
+def recover(folder_path, workers=DEFAULT_WORKERS):
+    journal = os.path.join(folder_path, JOURNAL_NAME)
+    if not os.path.exists(journal):
+        return
+    with open(journal, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    print(f"发现未完成的重命名计划（{len(plan['moves'])} 个文件），继续执行")
+    apply_plan(folder_path, plan, workers)
+
+
+# 返回 [(原文件名, 新文件名), ...]，只包含实际改名的文件
+def rename_screenshots(folder_path, new_name, order="name", dedup=True, workers=DEFAULT_WORKERS):
+    recover(folder_path, workers)
+    files = ordered_images(folder_path, list_images(folder_path), new_name, order)
+    if dedup:
+        files = move_duplicates(folder_path, files, workers)
+
+    moves = plan_renames(files, new_name)
+    if not moves:
+        print(f"共 {len(files)} 张截图，文件名均已是目标名")
+        return []
+
+    plan = {"prefix": new_name, "staged": False, "moves": moves}
+    _write_journal(folder_path, plan)
+    apply_plan(folder_path, plan, workers)
+
+    for src, _, dst in moves:
+        print(f"Renamed: {src} -> {dst}")
+    print(f"共 {len(files)} 张截图，重命名 {len(moves)} 张")
+    return [(src, dst) for src, _, dst in moves]
+
+
+# === 导入单张图片 ===
+# 从任意文件对象分块写到临时文件，写的同时计算哈希（内存里只有一个块），
+# 再按需缩小过大的图片，最后换成不重名的目标文件名。
+# 哈希（按原始内容计算）已在 seen 里时丢弃，返回 (文件名或 None, 哈希)。
+def ingest_image(src, folder_path, name, max_side=MAX_INGEST_SIDE, seen=None):
+    temp_path = os.path.join(folder_path, f"{TEMP_PREFIX}ingest{os.path.splitext(name)[1]}")
+    digest = hashlib.sha256()
+    with open(temp_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(COPY_CHUNK), b""):
+            digest.update(chunk)
+            dst.write(chunk)
+    digest = digest.hexdigest()
+    if seen is not None and digest in seen:
+        os.remove(temp_path)
+        return None, digest
+    original = limit_size(temp_path, max_side)
+    target = unique_path(folder_path, name)
+    os.replace(temp_path, target)
+    if original:
+        print(f"图片过大（{original[0]}x{original[1]}），导入时缩小到长边 {max_side}：{os.path.basename(target)}")
+    return os.path.basename(target), digest
+
+
+# 长边超过 max_side 时原地缩小，保持原格式，返回原始尺寸（没有缩小时返回 None）；
+# JPEG 先用 draft 让解码器直接按比例解码，不必展开整张原图
+def limit_size(path, max_side=MAX_INGEST_SIDE):
+    if not max_side:
+        return None
+    from PIL import Image
+    with Image.open(path) as image:
+        if max(image.size) <= max_side:
+            return None
+        original = image.size
+        image_format = image.format
+        dpi = image.info.get("dpi")
+        image.draft("RGB", (max_side, max_side))
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        options = {"dpi": tuple(d * image.width / original[0] for d in dpi)} if dpi else {}
+        resized_path = path + ".resized"
+        image.save(resized_path, format=image_format, **options)
+    os.replace(resized_path, path)
+    return original
+
+
+# === 从 zip 导入 ===
+# 逐个成员流式写出（不先整体解压到临时目录），与文件夹里已有图片或前面成员内容相同的直接丢弃。
+# 保留 zip 里的修改时间，供 --order mtime 使用。
+# zip_source 可以是路径或任意可 seek 的文件对象（如 Streamlit 的上传文件）。返回导入的文件名列表。
+def import_zip(zip_source, folder_path, workers=DEFAULT_WORKERS, max_side=MAX_INGEST_SIDE):
+    import zipfile
+    os.makedirs(folder_path, exist_ok=True)
+    existing = list_images(folder_path)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        seen = set(pool.map(file_hash, [os.path.join(folder_path, f) for f in existing]))
+
+    imported, skipped = [], 0
+    with zipfile.ZipFile(zip_source) as zf:
+        for info in zf.infolist():
+            name = os.path.basename(info.filename.replace("\\", "/"))
+            if info.is_dir() or info.filename.startswith("__MACOSX/") or name.startswith(".") \
+                    or not name.lower().endswith(IMAGE_EXTS):
                 continue
+            with zf.open(info) as src:
+                saved, digest = ingest_image(src, folder_path, name, max_side, seen)
+            if saved is None:
+                skipped += 1
+                continue
+            seen.add(digest)
+            stamp = time.mktime(info.date_time + (0, 0, -1))
+            os.utime(os.path.join(folder_path, saved), (stamp, stamp))
+            imported.append(saved)
+
+    print(f"从 zip 导入 {len(imported)} 张截图，跳过重复 {skipped} 张")
+    return imported
 
-            os.rename(old_file_path, new_file_path)
-            print(f"Renamed: {file} -> {new_file_name}")
+
+# === 供流水线调用的入口 ===
+def run(folder_path, new_name="input", order="name", dedup=True, workers=DEFAULT_WORKERS, zip_path=None,
+        max_side=MAX_INGEST_SIDE):
+    if zip_path:
+        import_zip(zip_path, folder_path, workers, max_side)
+    return rename_screenshots(folder_path, new_name, order, dedup, workers)
 
 # ⬇️ 下面是入口，负责接收命令行参数
-parser = argparse.ArgumentParser()
-parser.add_argument("--input", required=True, help="截图文件夹路径")
-parser.add_argument("--prefix", default="input", help="文件名前缀")
-args = parser.parse_args()
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="截图文件夹路径")
+    parser.add_argument("--prefix", default="input", help="文件名前缀")
+    parser.add_argument("--order", choices=ORDERS, default="name",
+                        help="编号顺序：name 自然排序 / mtime 修改时间 / exif 拍摄时间")
+    parser.add_argument("--no-dedup", action="store_true", help="不移走内容完全相同的截图")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并行计算哈希 / 改名的线程数")
+    parser.add_argument("--zip", default=None, help="先从 zip 压缩包导入截图到 --input 文件夹")
+    parser.add_argument("--max-side", type=int, default=MAX_INGEST_SIDE, help="zip 导入时图片长边上限（0 表示不缩小）")
+    args = parser.parse_args()
+
+    run(args.input, args.prefix, args.order, dedup=not args.no_dedup, workers=args.workers, zip_path=args.zip,
+        max_side=args.max_side)
 
-rename_screenshots(args.input, args.prefix)
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,31 @@
 import os
 import re
 import time
-import requests
-from PIL import Image
-import pytesseract
-
-# === 配置区 ===
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import Spk_config as config
+from Spk_llm_cache import ResponseCache, make_key
+import Spk_perf as perf
+from Spk_deepseek_client import get_client, READ_TIMEOUT
+from Spk_manifest import Manifest, DONE, FAILED, DUPLICATE, file_hash, content_hash, batch_id_for
+from Spk_image_dedup import (image_hashes, group_by_phash, text_fingerprint, TextDeduper, report_collapsed,
+                             resolve_duplicates)
+import Spk_token_budget as token_budget
+import Spk_ocr_engine as ocr_engine
+from Spk_token_budget import count_tokens, compact_ocr, detect_parts, split_sections
+import Spk_local_structurer as local_structurer
+from Spk_local_structurer import extract_clean_parts, structure_locally, DEFAULT_LOCAL_THRESHOLD
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--input", required=True, help="图片输入路径")
-parser.add_argument("--output", required=True, help="预填文本输出路径")
-args = parser.parse_args()
-
-IMAGE_FOLDER = args.input
-OUTPUT_FOLDER = args.output
+# === 配置区 ===
+DEFAULT_OCR_WORKERS = os.cpu_count() or 1
+DEFAULT_LLM_WORKERS = 4
+DEFAULT_REUSE_THRESHOLD = 0.97    # 索引里找最相近页面的最低相似度；找到的页面规范化后的 OCR 文本还必须完全相同才复用
+STRUCT_MAX_TOKENS = 4096          # deepseek-chat 不设 max_tokens 时的默认输出上限
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg')
+PDF_EXT = '.pdf'
 
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
-import streamlit as st
-DEEPSEEK_API_KEY = st.secrets["DEEPSEEK_API_KEY"]
-TESSERACT_CMD = r"D:\Outlet\tesseract\tesseract.exe"
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-os.environ["TESSDATA_PREFIX"] = r"D:\Outlet\tesseract\tessdata"
+# OCR 后端（tesserocr / pytesseract）、tesseract 程序和 tessdata 的位置由 Spk_ocr_engine 自动查找，
+# 也可在环境变量或 spk_config.toml 里用 OCR_BACKEND / TESSERACT_CMD / TESSDATA_PREFIX 指定
 
 # === LLM 提示词 ===
 STRUCT_PROMPT = """
@@ -129,122 +133,422 @@ Part 3
 3. Should schools teach students how to manage stress?
 """
 
-def extract_clean_parts(text: str) -> str:
-    # 去 markdown 粗体（保留内容）
-    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
+# 提示词按小节切开：开头的任务说明、Part 1 的格式要求、Part 2/3 的格式要求、三个输出示例。
+# 压缩时按 OCR 文本里检测到的 Part 类型只保留对应的要求和一个最接近的示例；检测不到 Part 时发送完整提示词
+(STRUCT_HEAD, STRUCT_PART1, STRUCT_PART23,
+ STRUCT_EXAMPLE_PART1, STRUCT_EXAMPLE_PART23, STRUCT_EXAMPLE_ALL) = split_sections(
+    STRUCT_PROMPT, ["---\n 如果识别到 Part 1", "---\n 如果识别到 Part 2", "## 输出示例 1", "## 输出示例 2", "## 输出示例 3"])
 
-    # 去掉中英文注释括号内的内容，但保留英文说明（更安全）
-    # 仅去除 “括号内全是中文或标点”的情况
-    text = re.sub(r"[（(][\u4e00-\u9fa5，。、《》！？：；、—…·【】]*[）)]", "", text)
 
-    # 去分割线（---）
-    text = re.sub(r"-{2,}", "", text)
+def struct_prompt(parts):
+    if not parts:
+        return STRUCT_PROMPT
+    has_part1, has_part23 = 1 in parts, bool(parts & {2, 3})
+    sections = [STRUCT_HEAD]
+    if has_part1:
+        sections.append(STRUCT_PART1)
+    if has_part23:
+        sections.append(STRUCT_PART23)
+    if has_part1 and has_part23:
+        sections.append(STRUCT_EXAMPLE_ALL)
+    else:
+        sections.append(STRUCT_EXAMPLE_PART1 if has_part1 else STRUCT_EXAMPLE_PART23)
+    return "".join(sections)
 
-    # 去除多余空行
-    text = re.sub(r"\n{2,}", "\n\n", text)
 
-    return text.strip()
+# 结构化输出基本是把题目重新排版，长度与输入相当；留出一倍余量
+def struct_max_tokens(ocr_text):
+    return min(STRUCT_MAX_TOKENS, 2 * count_tokens(ocr_text) + 300)
 
-    # 提取 Part 1/2/3
-    part_pattern = r"(Part\s+[123][\s\S]*?)(?=Part\s+[123]|$)"
-    parts = re.findall(part_pattern, text, flags=re.IGNORECASE)
-
-    cleaned_parts = []
-    for p in parts:
-        p = re.sub(r"\n{2,}", "\n", p.strip())     # 多空行压缩
-        p = re.sub(r" {2,}", " ", p)               # 多空格压缩
-        cleaned_parts.append(p.strip())
-
-    return "\n\n".join(cleaned_parts).strip()
 
 # === 调用 Deepseek ===
-def call_deepseek(prompt_text):
-    headers = {
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-        "Content-Type": "application/json"
-    }
+# max_tokens 为 None 时不设上限（即 STRUCT_MAX_TOKENS）；输出被截断时不写缓存，去掉上限重新请求一次
+# full_tokens 为不压缩时的输入 token 数，用于统计节省量
+def call_deepseek(prompt_text, cache, client, max_tokens=None, full_tokens=None):
     data = {
         "model": "deepseek-chat",
         "messages": [{"role": "user", "content": prompt_text}],
         "temperature": 0.3
     }
+    if max_tokens:
+        data["max_tokens"] = max_tokens
+    cache_key = make_key(data)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    sent_tokens = count_tokens(prompt_text)
+    token_budget.stats.record("structure", full_tokens or sent_tokens, sent_tokens,
+                              STRUCT_MAX_TOKENS, max_tokens or STRUCT_MAX_TOKENS)
+    meta = {}
     try:
-        res = requests.post(DEEPSEEK_API_URL, headers=headers, json=data, timeout=30)
-        if res.status_code == 200:
-            return res.json()["choices"][0]["message"]["content"].strip()
+        content = client.chat(data, label="structure", retries=2, meta=meta)
     except Exception as e:
         print(f"Deepseek 请求失败: {e}")
-    return ""
+        return ""
+    if content:
+        token_budget.stats.record_output("structure", meta.get("completion_tokens"))
+    if content and meta.get("finish_reason") == "length" and max_tokens:
+        print(f"结构化输出达到 max_tokens={max_tokens} 被截断，去掉上限重新请求")
+        token_budget.stats.record_retry("structure")
+        return call_deepseek(prompt_text, cache, client, None, full_tokens)
+    if content:
+        cache.put(cache_key, content)
+    return content or ""
+
+# === 文件名自然排序（input_2 排在 input_10 前面）===
+def natural_key(name: str):
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", name)]
+
+# === OCR（在子进程中执行）===
+# PDF 只在 OCR 子进程里按页渲染（pdf2image 的 first_page / last_page），整份 PDF 不会一次性栅格化进内存。
+# 直接按 OCR 的目标 DPI 渲染，并写进图片的 dpi 信息，预处理时不会再按截图的假定 DPI 缩放。
+def render_pdf_page(pdf_path, page, dpi):
+    from pdf2image import convert_from_path
+    image = convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page)[0]
+    image.info["dpi"] = (dpi, dpi)
+    return image
+
+# page 为 None 表示普通图片，否则为 PDF 的页码（从 1 开始）；ocr_dpi 为 None 时使用 Spk_ocr_preprocess.TARGET_DPI
+# PIL / numpy / OCR 引擎只在真正 OCR 时导入（在 OCR 子进程里），导入本模块不加载它们；
+# 引擎是本进程常驻的那一个（Spk_ocr_engine.get_engine），不会每张图重新初始化
+def ocr_image(image_path, preprocess_images=True, ocr_dpi=None, page=None):
+    from PIL import Image
+    from Spk_ocr_preprocess import preprocess, TARGET_DPI
+    engine = ocr_engine.get_engine()
+    ocr_dpi = ocr_dpi or TARGET_DPI
+    image = Image.open(image_path) if page is None else render_pdf_page(image_path, page, ocr_dpi)
+    with image:
+        if not preprocess_images:
+            return engine.recognize(image)
+        processed, tess_config = preprocess(image, ocr_dpi)
+        return engine.recognize(processed, tess_config)
+
+# 在子进程里计时，返回 (文本, 耗时秒数)，父进程据此记录单张图 / 单页的 OCR 时间
+def ocr_image_timed(image_path, preprocess_images=True, ocr_dpi=None, page=None):
+    start = time.perf_counter()
+    text = ocr_image(image_path, preprocess_images, ocr_dpi, page)
+    return text, time.perf_counter() - start
+
+# 话题索引里结构化结果的分类，带上提示词哈希：修改提示词后不复用旧结果
+def index_kind():
+    return "structure:" + content_hash(STRUCT_PROMPT)[:12]
+
+# === 结构化单张图的 OCR 文本：查话题索引 / 调用 Deepseek ===
+# 传入 index（Spk_topic_index.TopicIndex）时，先找之前批次里 OCR 文本规范化后完全相同的页面，找到就直接复用。
+# 只看相似度时改了一个词的页面也会命中（相似度仍在 0.9 以上），复用的结构化结果保留旧的问题措辞，
+# 所以与 S3 一样要求规范化文本完全相同（lookup 的 exact=True）
+# compact=True 时先去掉 OCR 噪声行，提示词只保留与检测到的 Part 类型有关的小节，并按文本长度设 max_tokens
+# 返回结构化文本，失败时返回 None
+def structure_remote(filename, ocr_text, cache, client, index=None, compact=True):
+    hit = index.lookup(index_kind(), 0, ocr_text, exact=True) if index is not None else None
+    if hit:
+        cleaned, similarity, source = hit
+        print(f"复用之前的结构化结果（相似度 {similarity:.2f}，来自 {source}）：{filename}")
+        return cleaned
+    if compact:
+        text = compact_ocr(ocr_text)
+        if not text:
+            print(f"OCR 文本只有噪声，跳过该图：{filename}")
+            return None
+        result = call_deepseek(struct_prompt(detect_parts(text)) + text, cache, client,
+                               struct_max_tokens(text), count_tokens(STRUCT_PROMPT + ocr_text))
+    else:
+        result = call_deepseek(STRUCT_PROMPT + ocr_text, cache, client)
+    if not result:
+        print(f"Deepseek 无返回，跳过该图：{filename}")
+        return None
+    cleaned = extract_clean_parts(result)
+    if index is not None:
+        index.add(index_kind(), 0, ocr_text, cleaned, source=filename)
+    return cleaned
+
+# === 结构化并保存单张图的结果（在线程池中执行）===
+# local_threshold 不为 None 时先在本地按规则结构化（Spk_local_structurer），置信度达到该值就直接使用，
+# 不查索引也不调用 Deepseek；置信度不足的页面走 structure_remote
+def structure_and_save(image_folder, filename, ocr_text, cache, client, index=None, compact=True,
+                       local_threshold=DEFAULT_LOCAL_THRESHOLD):
+    local = structure_locally(ocr_text) if local_threshold is not None else None
+    use_local = local is not None and local.confidence >= local_threshold
+    if local is not None:
+        local_structurer.stats.record(filename, local.confidence, use_local)
+    if use_local:
+        cleaned = local.text
+        print(f"本地结构化完成（置信度 {local.confidence:.2f}）：{filename}")
+    else:
+        cleaned = structure_remote(filename, ocr_text, cache, client, index, compact)
+        if cleaned is None:
+            return None
+
+    output_path = os.path.join(image_folder, output_name(filename))
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(cleaned)
+    print(f"已保存：{output_name(filename)}")
+    return cleaned
+
+def list_images(image_folder):
+    return sorted(
+        (f for f in os.listdir(image_folder)
+         if f.lower().endswith(IMAGE_EXTS) and f.startswith("input")),
+        key=natural_key,
+    )
+
+# PDF 不经过 Step 1 重命名，文件夹里的所有 PDF 都会处理
+def list_pdfs(image_folder):
+    return sorted((f for f in os.listdir(image_folder) if f.lower().endswith(PDF_EXT)), key=natural_key)
+
+def pdf_page_count(pdf_path):
+    from pdf2image import pdfinfo_from_path
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+# 处理单元：{单元名: (文件路径, 页码)}。图片的单元名就是文件名、页码为 None；
+# PDF 的每一页是一个单元，名为 "<文件名>#<页码>"。图片在前，PDF 按文件名和页码排在后面。
+def list_units(image_folder):
+    units = {f: (os.path.join(image_folder, f), None) for f in list_images(image_folder)}
+    for f in list_pdfs(image_folder):
+        path = os.path.join(image_folder, f)
+        for page in range(1, pdf_page_count(path) + 1):
+            units[f"{f}#{page}"] = (path, page)
+    return units
+
+# 单元对应的结果文件：input_3.png → input_3-已识别.txt，book.pdf#12 → book_p012-已识别.txt
+def output_name(unit):
+    name, _, page = unit.partition("#")
+    stem = os.path.splitext(name)[0]
+    return f"{stem}_p{int(page):03d}-已识别.txt" if page else f"{stem}-已识别.txt"
+
+# 每个单元的输入哈希；PDF 只读一遍文件，各页的哈希为 "<文件哈希>#<页码>"
+def unit_hashes(units):
+    file_hashes = {}
+    hashes = {}
+    for unit, (path, page) in units.items():
+        if path not in file_hashes:
+            file_hashes[path] = file_hash(path)
+        hashes[unit] = file_hashes[path] if page is None else f"{file_hashes[path]}#{page}"
+    return hashes
+
+# 批次清单放在输出文件夹，文件名带上由图片内容决定的批次 ID
+def open_batch(image_folder, output_folder, units=None):
+    input_hashes = unit_hashes(units if units is not None else list_units(image_folder))
+    batch_id = batch_id_for(input_hashes.values())
+    manifest = Manifest(os.path.join(output_folder, f"{batch_id}_manifest.json"), batch_id)
+    return manifest, input_hashes
 
 # === 主处理流程 ===
-def process_all_images():
-    image_files = [
-    f for f in os.listdir(IMAGE_FOLDER)
-    if f.lower().endswith(('.png', '.jpg', '.jpeg')) and f.startswith("input")
-    ]
+# OCR 在进程池中并行（PDF 按页并行）；每张图 / 每页 OCR 完成后立即交给线程池调用 Deepseek，
+# 线程池大小即同时在途的请求数上限。
+# 返回 {单元名: 结构化文本}，供下一步直接在内存中使用。
+# 传入 manifest 时，输入哈希未变且已完成的单元直接读取上次的结果，不再 OCR / 调用 Deepseek。
+def process_all_images(image_folder, cache, client, ocr_workers=DEFAULT_OCR_WORKERS, llm_workers=DEFAULT_LLM_WORKERS,
+                       dedup=True, preprocess_images=True, ocr_dpi=None, manifest=None, input_hashes=None, units=None,
+                       index=None, compact=True, local_threshold=DEFAULT_LOCAL_THRESHOLD, ocr_backend=None):
+    units = units if units is not None else list_units(image_folder)
+    image_files = list(units)
     if not image_files:
-        print("没有找到任何图片。")
-        return
-
-    for idx, filename in enumerate(sorted(image_files), start=1):
-        image_path = os.path.join(IMAGE_FOLDER, filename)
-        print(f"正在处理第 {idx} 张图：{filename}")
-
-        try:
-            image = Image.open(image_path)
-            ocr_text = pytesseract.image_to_string(image, lang="eng")
-
-            prompt = STRUCT_PROMPT + ocr_text
-            print("正在调用 Deepseek...")
-            result = call_deepseek(prompt)
-
-            if result:
-                cleaned = extract_clean_parts(result)
-                output_name = os.path.splitext(filename)[0] + "-已识别.txt"
-                output_path = os.path.join(IMAGE_FOLDER, output_name)
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write(cleaned)
-                print(f"已保存：{output_name}")
+        print("没有找到任何图片或 PDF。")
+        return {}
+
+    total = len(image_files)
+    pages = sum(page is not None for _, page in units.values())
+    ocr_workers, llm_workers = max(1, ocr_workers), max(1, llm_workers)
+    print(f"共 {total - pages} 张图、{pages} 页 PDF，OCR 进程数：{ocr_workers}，Deepseek 并发数：{llm_workers}")
+
+    results = {}
+    # 断点续跑：上次去重时被合并掉、且保留下来的那张已完成的图片不再计算哈希和比较
+    if manifest is not None:
+        remaining = [f for f in image_files if not manifest.is_duplicate(f, input_hashes[f], input_hashes)]
+        if len(remaining) < len(image_files):
+            print(f"跳过上次已合并的重复图片 {len(image_files) - len(remaining)} 张")
+        image_files = remaining
+
+    phash_collapsed = {}
+    # 每个 OCR 进程启动时建好自己的 Tesseract 引擎，之后的图片都复用它
+    with ProcessPoolExecutor(max_workers=min(ocr_workers, total), initializer=ocr_engine.init_worker,
+                             initargs=(ocr_backend,)) as ocr_pool, \
+            ThreadPoolExecutor(max_workers=llm_workers) as llm_pool:
+        # 去重第一步：感知哈希相近的截图只 OCR 一次（PDF 的页不参与）
+        if dedup:
+            screenshots = [f for f in image_files if units[f][1] is None]
+            groups = group_by_phash(dict(zip(screenshots, ocr_pool.map(image_hashes, [units[f][0] for f in screenshots]))))
+            phash_collapsed = {g[0]: g[1:] for g in groups}
+            report_collapsed(phash_collapsed, "感知哈希")
+            kept = {g[0] for g in groups}
+            image_files = [f for f in image_files if units[f][1] is not None or f in kept]
+
+        # 断点续跑：跳过上次已完成的图片
+        if manifest is not None:
+            remaining = []
+            for filename in image_files:
+                if manifest.is_done(filename, input_hashes[filename]):
+                    with open(manifest.output_of(filename), "r", encoding="utf-8") as f:
+                        results[filename] = f.read()
+                else:
+                    remaining.append(filename)
+            if len(remaining) < len(image_files):
+                print(f"跳过上次已完成的 {len(image_files) - len(remaining)} 张图")
+            image_files = remaining
+
+        # 每页只把 (路径, 页码) 交给子进程，由子进程自己渲染
+        ocr_futures = {
+            ocr_pool.submit(ocr_image_timed, units[filename][0], preprocess_images, ocr_dpi, units[filename][1]): filename
+            for filename in image_files
+        }
+        llm_futures = {}
+        deduper = TextDeduper()
+        collapsed = {}
+        for done, future in enumerate(as_completed(ocr_futures), start=1):
+            filename = ocr_futures[future]
+            try:
+                ocr_text, ocr_seconds = future.result()
+                perf.record("ocr", image=filename, seconds=round(ocr_seconds, 3), chars=len(ocr_text))
+            except Exception as e:
+                print(f"OCR 失败：{filename} → {e}")
+                if manifest is not None:
+                    manifest.mark(filename, input_hashes[filename], FAILED, error=str(e))
+                continue
+
+            # 去重第二步：OCR 文本与已提交的某张图重复（或是其裁剪）时不再调用 Deepseek；
+            # 若新图内容更完整且旧图的请求尚未开始，则用新图替换旧图
+            if dedup:
+                fingerprint = text_fingerprint(ocr_text)
+                duplicate_of, is_larger = deduper.match(fingerprint)
+                if duplicate_of and not is_larger:
+                    collapsed.setdefault(duplicate_of, []).append(filename)
+                    continue
+                if duplicate_of:
+                    old_future = next(f for f, name in llm_futures.items() if name == duplicate_of)
+                    if old_future.cancel():
+                        del llm_futures[old_future]
+                        deduper.discard(duplicate_of)
+                        collapsed[filename] = collapsed.pop(duplicate_of, []) + [duplicate_of]
+                deduper.accept(filename, fingerprint)
+
+            print(f"OCR 完成（{done}/{len(ocr_futures)}）：{filename}，正在结构化...")
+            llm_futures[llm_pool.submit(structure_and_save, image_folder, filename, ocr_text, cache, client, index,
+                                        compact, local_threshold)] = filename
+
+        report_collapsed(collapsed, "OCR 文本")
+
+        for future in as_completed(llm_futures):
+            filename = llm_futures[future]
+            try:
+                cleaned = future.result()
+            except Exception as e:
+                print(f"处理失败：{filename} → {e}")
+                cleaned, error = None, str(e)
             else:
-                print(f"Deepseek 无返回，跳过该图。")
-
-        except Exception as e:
-            print(f"处理失败：{filename} → {e}")
-
+                error = None if cleaned else "Deepseek 无返回"
+            if cleaned:
+                results[filename] = cleaned
+            if manifest is not None:
+                output_path = os.path.join(image_folder, output_name(filename))
+                manifest.mark(filename, input_hashes[filename], DONE if cleaned else FAILED,
+                              output=output_path if cleaned else None, error=error)
+
+    # 被合并掉的图片记进清单并指向最终保留的图片；保留的图片失败时不记，重跑时重新比较
+    if manifest is not None:
+        for keep, dropped in resolve_duplicates(phash_collapsed, collapsed).items():
+            if keep in results:
+                for filename in dropped:
+                    manifest.mark(filename, input_hashes[filename], DUPLICATE, duplicate_of=keep)
+
+    print(cache.summary())
+    print(client.summary())
+    print(token_budget.stats.summary())
+    if local_threshold is not None:
+        print(local_structurer.stats.summary())
+    if index is not None:
+        print(index.summary())
+    if manifest is not None:
+        print(manifest.summary())
     print("\n所有图片处理完毕！")
+    return results
 
 #对txt文件进行合并与重命名#
-import random
-
-def merge_output_files():
-    input_dir = IMAGE_FOLDER
-    output_dir = OUTPUT_FOLDER  # ✅ 使用传入参数，而不是写死路径
-    os.makedirs(output_dir, exist_ok=True)
-
-    merged_text = ""
-    file_list = sorted(f for f in os.listdir(input_dir) if f.endswith("-已识别.txt"))
-
-    for f in file_list:
-        file_path = os.path.join(input_dir, f)
-        with open(file_path, "r", encoding="utf-8") as infile:
-            content = infile.read().strip()
-            if content:
-                merged_text += content + "\n\n"  # 每份之间留空行分隔
-
-    if not merged_text.strip():
+# results 为 process_all_images 的返回值；不传时读取文件夹里的所有 -已识别.txt
+# batch_id 不传时由合并内容的哈希决定，同样的内容总是得到同一个文件名
+# 返回 (合并文件路径, 合并文本)
+def merge_output_files(image_folder, output_folder, results=None, batch_id=None):
+    os.makedirs(output_folder, exist_ok=True)
+
+    if results is None:
+        results = {}
+        for f in os.listdir(image_folder):
+            if f.endswith("-已识别.txt"):
+                with open(os.path.join(image_folder, f), "r", encoding="utf-8") as infile:
+                    results[f] = infile.read()
+
+    # 每份之间留空行分隔
+    merged_text = "\n\n".join(
+        results[name].strip() for name in sorted(results, key=natural_key) if results[name].strip()
+    )
+
+    if not merged_text:
         print("没有可合并的内容。")
-        return
+        return None, ""
 
-    random_number = f"{random.randint(1000, 9999)}"
-    merged_filename = f"{random_number}_口语话题_预填.txt"
-    merged_path = os.path.join(output_dir, merged_filename)
+    batch_id = batch_id or batch_id_for([content_hash(merged_text)])
+    merged_filename = f"{batch_id}_口语话题_预填.txt"
+    merged_path = os.path.join(output_folder, merged_filename)
 
     with open(merged_path, "w", encoding="utf-8") as outfile:
-        outfile.write(merged_text.strip())
+        outfile.write(merged_text)
 
     print(f"\n所有已识别文本已合并为：{merged_filename}")
+    return merged_path, merged_text
+
+# === 供流水线调用的入口 ===
+def run(image_folder, output_folder, ocr_workers=DEFAULT_OCR_WORKERS, llm_workers=DEFAULT_LLM_WORKERS,
+        use_cache=True, dedup=True, preprocess_images=True, ocr_dpi=None, http2=False, read_timeout=READ_TIMEOUT,
+        reuse=True, reuse_threshold=DEFAULT_REUSE_THRESHOLD, compact=True, local=True,
+        local_threshold=DEFAULT_LOCAL_THRESHOLD, ocr_backend=None):
+    cache = ResponseCache(enabled=use_cache)
+    client = get_client(config.get_secret("DEEPSEEK_API_KEY"), http2=http2, read_timeout=read_timeout)
+    token_budget.stats.reset()
+    local_structurer.stats.reset()
+    index = None
+    if reuse:
+        from Spk_topic_index import TopicIndex   # 依赖 NumPy，只在需要时导入
+        index = TopicIndex(threshold=reuse_threshold)
+    units = list_units(image_folder)
+    manifest, input_hashes = open_batch(image_folder, output_folder, units)
+    try:
+        results = process_all_images(image_folder, cache, client, ocr_workers, llm_workers, dedup, preprocess_images,
+                                     ocr_dpi, manifest, input_hashes, units, index, compact,
+                                     local_threshold if local else None, ocr_backend)
+    finally:
+        if index is not None:
+            index.close()
+    return merge_output_files(image_folder, output_folder, results, manifest.batch_id)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="图片 / PDF 输入路径")
+    parser.add_argument("--output", required=True, help="预填文本输出路径")
+    parser.add_argument("--ocr-workers", type=int, default=DEFAULT_OCR_WORKERS, help="并行 OCR 进程数")
+    parser.add_argument("--llm-workers", type=int, default=DEFAULT_LLM_WORKERS, help="同时进行的 Deepseek 请求数上限")
+    parser.add_argument("--no-cache", action="store_true", help="不读写 Deepseek 响应缓存")
+    parser.add_argument("--no-dedup", action="store_true", help="不合并重复上传的截图")
+    parser.add_argument("--no-preprocess", action="store_true", help="OCR 前不做缩放 / 二值化 / 裁剪")
+    parser.add_argument("--ocr-dpi", type=int, default=None, help="预处理缩放的目标 DPI，也是 PDF 的渲染 DPI（默认 300）")
+    parser.add_argument("--http2", action="store_true", help="使用 HTTP/2 连接（需要 httpx[http2]）")
+    parser.add_argument("--read-timeout", type=float, default=READ_TIMEOUT, help="单次请求的读取超时（秒）")
+    parser.add_argument("--no-reuse", action="store_true", help="不查话题索引，所有页面都重新结构化")
+    parser.add_argument("--reuse-threshold", type=float, default=DEFAULT_REUSE_THRESHOLD, help="复用所需的最低相似度")
+    parser.add_argument("--no-compact", action="store_true", help="发送完整提示词和原始 OCR 文本，不设 max_tokens")
+    parser.add_argument("--no-local", action="store_true", help="不做本地结构化，所有页面都交给 Deepseek")
+    parser.add_argument("--local-threshold", type=float, default=DEFAULT_LOCAL_THRESHOLD,
+                        help="本地结构化结果直接使用所需的最低置信度")
+    parser.add_argument("--ocr-backend", choices=ocr_engine.BACKENDS, default=None,
+                        help="OCR 后端（默认读 OCR_BACKEND 配置，未设置时为 auto）")
+    args = parser.parse_args()
+
+    run(args.input, args.output, args.ocr_workers, args.llm_workers,
+        use_cache=not args.no_cache, dedup=not args.no_dedup,
+        preprocess_images=not args.no_preprocess, ocr_dpi=args.ocr_dpi,
+        http2=args.http2, read_timeout=args.read_timeout,
+        reuse=not args.no_reuse, reuse_threshold=args.reuse_threshold, compact=not args.no_compact,
+        local=not args.no_local, local_threshold=args.local_threshold, ocr_backend=args.ocr_backend)
 
 # === 入口 ===
 if __name__ == "__main__":
-    process_all_images()
-    merge_output_files()
+    main()
@@ -1,22 +1,32 @@
 import os
 import re
-import requests
 import json
 import time
-
-# 配置区
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
-import streamlit as st
-DEEPSEEK_API_KEY = st.secrets["DEEPSEEK_API_KEY"]
+import queue
 import argparse
-
-parser = argparse.ArgumentParser()
-parser.add_argument("--input", required=True, help="预填txt文件夹")
-parser.add_argument("--output", required=True, help="生成答案输出文件夹")
-args = parser.parse_args()
-
-INPUT_TXT_FOLDER = args.input
-OUTPUT_FOLDER = args.output
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import Spk_config as config
+from Spk_llm_cache import ResponseCache, make_key
+from Spk_topic_parser import Topic, parse_topics, parse_file
+from Spk_manifest import Manifest, DONE, FAILED, content_hash
+from Spk_deepseek_client import get_client, GenerationCancelled, READ_TIMEOUT
+import Spk_token_budget as token_budget
+import Spk_perf as perf
+from Spk_token_budget import count_tokens, max_tokens_for, split_sections
+
+# 配置区（DEEPSEEK_API_KEY 由 Spk_config 在 run() 时读取）
+DEFAULT_WORKERS = 4
+DEFAULT_RPM = 60
+DEFAULT_TPM = 200000
+# 批量请求默认关闭：合并成一次 JSON 请求能省下重复的系统提示和请求数，但批量请求不是流式的，
+# 要等整组答案生成完才有第一段内容，Step 3 的实时输出对这些 Part 不再生效。需要省 token / 请求数时再打开
+DEFAULT_BATCH_SIZE = 1
+BATCH_SIZE = 4            # 打开批量时建议的 Part 1 每组题组数
+DEFAULT_REUSE_THRESHOLD = 0.97    # 索引里找候选的最低相似度；复用还要求整个 Part 的题目规范化后完全相同
+MAX_TOKENS = 3000         # 单个 Part 的 max_tokens 上限；压缩时按 Part 类型和问题数取更小的值
+BATCH_MAX_TOKENS = 8192   # deepseek-chat 单次输出上限
 
 
 # 系统提示
@@ -68,111 +78,521 @@ Only answers are needed, not outlines, summaries, or tips.
 - Add a line `---` between each Part for clarity.
 """
 
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+# 系统提示按小节切开：开头（角色、目标）、各 Part 的要求、结尾（注意事项、语言、输出格式）。
+# 压缩时只发送本次请求涉及的 Part 的要求
+BASE_HEAD, *_base_parts, BASE_TAIL = split_sections(
+    BASE_PROMPT, ["## Part 1", "## Part 2", "## Part 3", "# Pitfalls to Avoid"])
+BASE_PARTS = dict(zip((1, 2, 3), _base_parts))
+
+
+def system_prompt(parts):
+    if not parts or not set(parts) <= set(BASE_PARTS):
+        return BASE_PROMPT
+    return BASE_HEAD + "".join(BASE_PARTS[part] for part in sorted(parts)) + BASE_TAIL
+
+
+# 一组题目的请求设置：(系统提示, max_tokens)；compact=False 时为完整提示词和固定上限
+def request_budget(topics, compact=True, cap=MAX_TOKENS):
+    if not compact:
+        return BASE_PROMPT, cap
+    return (system_prompt({topic.part for topic in topics}),
+            min(cap, sum(max_tokens_for(topic.part, len(topic.questions), MAX_TOKENS) for topic in topics)))
+
+# === 令牌桶限流：同时限制每分钟请求数和 token 数 ===
+class RateLimiter:
+    def __init__(self, rpm=0, tpm=0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.req_tokens = float(rpm)
+        self.tok_tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        if self.rpm:
+            self.req_tokens = min(self.rpm, self.req_tokens + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.tok_tokens = min(self.tpm, self.tok_tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens=0):
+        # 单次请求超过桶容量时按桶容量计，避免永远等不到
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        while True:
+            with self.lock:
+                self._refill()
+                need_req = 0 if not self.rpm else max(0.0, 1 - self.req_tokens) * 60 / self.rpm
+                need_tok = 0 if not self.tpm else max(0.0, tokens - self.tok_tokens) * 60 / self.tpm
+                wait = max(need_req, need_tok)
+                if wait <= 0:
+                    if self.rpm:
+                        self.req_tokens -= 1
+                    if self.tpm:
+                        self.tok_tokens -= tokens
+                    return
+            time.sleep(wait)
+
+
+
+# 流式输出的落盘器：边收边写 "<答案文件>.part"，完整结束后才改名为正式文件，
+# 这样连接中断时已收到的内容仍保留在 .part 里，而 Step 4 只会读到完整的答案。
+class StreamWriter:
+    def __init__(self, output_path, label=None, events=None):
+        self.output_path = output_path
+        self.part_path = output_path + ".part"
+        self.label = label
+        self.events = events
+        self.file = open(self.part_path, "w", encoding="utf-8")
+
+    def reset(self):
+        self.file.seek(0)
+        self.file.truncate()
+        if self.events is not None:
+            self.events.put((self.label, None))
+
+    def write(self, delta):
+        self.file.write(delta)
+        self.file.flush()
+        if self.events is not None:
+            self.events.put((self.label, delta))
+
+    def finish(self, content):
+        self.file.close()
+        with open(self.output_path, "w", encoding="utf-8") as out_f:
+            out_f.write(content)
+        os.remove(self.part_path)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+# 查缓存 → 限流 → 请求 → 写缓存；validate 不通过的返回不写入缓存
+# on_request 只在缓存未命中、真正发请求时调用一次（记录 token 预算）；meta 见 DeepseekClient.chat
+def cached_chat(payload, budget, cache, rate_limiter, client, label, retries=3, delay=5,
+                sink=None, cancel_event=None, validate=None, on_request=None, meta=None):
+    cache_key = make_key(payload)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        if sink is not None:
+            sink.write(cached)
+        return cached
+    if on_request is not None:
+        on_request()
+
+    def before_attempt(attempt):
+        rate_limiter.acquire(budget)
+        if sink is not None and attempt:
+            sink.reset()
+
+    content = client.chat(payload, label=label, retries=retries, delay=delay,
+                          sink=sink, cancel_event=cancel_event, before_attempt=before_attempt, meta=meta)
+    if content and (validate is None or validate(content)):
+        cache.put(cache_key, content)
+    return content
+
 
 # 调用Deepseek的函数（带重试）
-def call_deepseek(prompt_content: str, retries=3, delay=5):
-    headers = {
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-        "Content-Type": "application/json"
-    }
+# stream=True 时使用流式接口，sink（StreamWriter）实时接收内容；cancel_event 被置位时中途停止
+# system / max_tokens 由 request_budget 给出；输出被压缩后的 max_tokens 截断时按 MAX_TOKENS 重新生成
+def call_deepseek(prompt_content: str, cache, rate_limiter, client, retries=3, delay=5,
+                  stream=False, sink=None, cancel_event=None, system=BASE_PROMPT, max_tokens=MAX_TOKENS):
     payload = {
         "model": "deepseek-chat",
         "messages": [
-            {"role": "system", "content": BASE_PROMPT},
+            {"role": "system", "content": system},
             {"role": "user", "content": prompt_content}
         ],
         "temperature": 0.7,
-        "max_tokens": 3000,
+        "max_tokens": max_tokens,
         "top_p": 1,
         "frequency_penalty": 0,
         "presence_penalty": 0
     }
-
-    for attempt in range(retries):
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload)
-        if response.status_code == 200:
-            result = response.json()
-            return result["choices"][0]["message"]["content"].strip()
-        else:
-            print(f"请求失败（第{attempt + 1}次），状态码: {response.status_code}")
-            time.sleep(delay)
+    if stream:
+        payload["stream"] = True
+    prompt_tokens = count_tokens(system + prompt_content)
+    meta = {}
+    content = cached_chat(payload, prompt_tokens + max_tokens, cache, rate_limiter, client, "answer", retries, delay,
+                          sink=sink, cancel_event=cancel_event,
+                          validate=lambda c: meta.get("finish_reason") != "length",
+                          on_request=lambda: token_budget.stats.record(
+                              "answer", count_tokens(BASE_PROMPT + prompt_content), prompt_tokens,
+                              MAX_TOKENS, max_tokens),
+                          meta=meta)
+    token_budget.stats.record_output("answer", meta.get("completion_tokens"))
+    if content and meta.get("finish_reason") == "length" and max_tokens < MAX_TOKENS:
+        print(f"输出达到 max_tokens={max_tokens} 被截断，按 {MAX_TOKENS} 重新生成")
+        token_budget.stats.record_retry("answer")
+        if sink is not None:
+            sink.reset()
+        return call_deepseek(prompt_content, cache, rate_limiter, client, retries, delay,
+                             stream, sink, cancel_event, system, MAX_TOKENS)
+    if content:
+        return content
 
     print("所有重试失败，跳过该段落。")
     return None
 
-def split_parts(file_content: str):
-    parts = {}
-    pattern = r"(Part\s*\d+(?:-\d+)?)[\s\S]*?(?=Part\s*\d+(?:-\d+)?|$)"
-    matches = re.finditer(pattern, file_content, re.IGNORECASE)
 
-    count_tracker = {}  # 用来记录 Part 1/2/3 出现了几次
+# === 批量模式：多个题目块合并成一次请求，按块 ID 返回 JSON ===
+BATCH_INSTRUCTION = """Answer each of the following IELTS Speaking blocks independently, following the system instructions for its Part.
+Return ONLY a JSON object of the form {{"answers": {{"<block id>": "<complete answer text>"}}}} containing exactly these block ids: {ids}.
+Inside each answer keep the normal plain-text formatting (questions, answers, and `---` separators)."""
+
+
+# 解析批量返回；缺失或为空的块不出现在结果里
+def parse_batch_answers(content, block_ids):
+    text = content.strip()
+    fenced = re.match(r"^```(?:json)?\s*([\s\S]*?)\s*```$", text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}
+    answers = data.get("answers", data) if isinstance(data, dict) else {}
+    if not isinstance(answers, dict):
+        return {}
+    return {
+        block_id: answers[block_id].strip()
+        for block_id in block_ids
+        if isinstance(answers.get(block_id), str) and answers[block_id].strip()
+    }
 
-    for match in matches:
-        full_text = match.group(0).strip()
 
-        # 提取 Part 编号：只取 Part 后的数字（例如 Part 1-2 -> 1）
-        part_number_match = re.match(r"Part\s*(\d+)", full_text, re.IGNORECASE)
-        if not part_number_match:
+# blocks 为 {块ID: 题目文本}，返回 {块ID: 答案}；system / max_tokens 由 request_budget 给出（max_tokens 为 None 时按块数）
+# 输出被截断时 JSON 不完整、校验不通过，由调用方退回到逐块请求
+def call_deepseek_batch(blocks: dict, cache, rate_limiter, client, cancel_event=None, system=BASE_PROMPT,
+                        max_tokens=None):
+    ids = list(blocks)
+    user_content = BATCH_INSTRUCTION.format(ids=", ".join(json.dumps(i) for i in ids)) + "\n\n" + "\n\n".join(
+        f"### {block_id}\n{text}" for block_id, text in blocks.items()
+    )
+    full_max_tokens = min(BATCH_MAX_TOKENS, MAX_TOKENS * len(ids))
+    max_tokens = min(max_tokens or full_max_tokens, BATCH_MAX_TOKENS)
+    payload = {
+        "model": "deepseek-chat",
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user_content}
+        ],
+        "temperature": 0.7,
+        "max_tokens": max_tokens,
+        "top_p": 1,
+        "frequency_penalty": 0,
+        "presence_penalty": 0,
+        "response_format": {"type": "json_object"}
+    }
+    prompt_tokens = count_tokens(system + user_content)
+    meta = {}
+    content = cached_chat(payload, prompt_tokens + max_tokens, cache, rate_limiter, client, "answer.batch",
+                          cancel_event=cancel_event,
+                          validate=lambda c: len(parse_batch_answers(c, ids)) == len(ids),
+                          on_request=lambda: token_budget.stats.record(
+                              "answer.batch", count_tokens(BASE_PROMPT + user_content), prompt_tokens,
+                              full_max_tokens, max_tokens),
+                          meta=meta)
+    token_budget.stats.record_output("answer.batch", meta.get("completion_tokens"))
+    return parse_batch_answers(content, ids) if content else {}
+
+# 单个Part的生成结果，按内存对象传给下一步
+@dataclass
+class GeneratedAnswer:
+    base_name: str
+    topic: Topic
+    text: str
+    path: str
+
+    @property
+    def part_title(self):
+        return self.topic.title
+
+# 清单里的输入哈希同时覆盖题目文本和系统提示，修改提示词后会重新生成
+def unit_hash(prompt_text):
+    return content_hash(BASE_PROMPT + "\n" + str(MAX_TOKENS) + "\n" + prompt_text)
+
+# 话题索引里答案的分类，与清单哈希一样带上提示词：修改提示词后不复用旧答案
+def index_kind():
+    return "answer:" + content_hash(BASE_PROMPT + "\n" + str(MAX_TOKENS))[:12]
+
+# 索引按题目正文匹配，不含关键词行（同一话题在不同批次里的中文关键词常常不同）
+def index_text(topic):
+    return "\n".join(topic.lines)
+
+# 从话题索引复用答案：写出答案文件，和新生成的答案一样交给后续步骤；来源写进运行记录（"reuse" 条目）
+def reuse_answer(output_folder, base_name, topic, hit):
+    text, similarity, source = hit
+    output_path = answer_path(output_folder, base_name, topic)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    print(f"复用已有答案: {base_name}-{topic.title}（相似度 {similarity:.2f}，来自 {source}）")
+    perf.record("reuse", part=f"{base_name}-{topic.title}", source=source, similarity=round(similarity, 3))
+    return GeneratedAnswer(base_name, topic, text, output_path)
+
+# 生成单个Part的答案并写入文件（在线程池中执行）
+# 文件名沿用原来的 "<预填>-Part x-y-已生成-1.txt"（S4 / S5 按文件名读取答案，Word 里的小节标题也取自文件名）
+def answer_path(output_folder, base_name, topic):
+    return os.path.join(output_folder, f"{base_name}-{topic.title}-已生成-1.txt")
+
+def generate_part(output_folder, base_name, topic, cache, rate_limiter, client,
+                  stream=True, events=None, cancel_event=None, compact=True):
+    part_title = topic.title
+    print(f"正在处理 {base_name}-{part_title} ...")
+    output_path = answer_path(output_folder, base_name, topic)
+    output_filename = os.path.basename(output_path)
+
+    sink = StreamWriter(output_path, f"{base_name}-{part_title}", events) if stream else None
+    try:
+        system, max_tokens = request_budget([topic], compact)
+        generated_answer = call_deepseek(topic.text(), cache, rate_limiter, client,
+                                         stream=stream, sink=sink, cancel_event=cancel_event,
+                                         system=system, max_tokens=max_tokens)
+    except GenerationCancelled:
+        print(f"已取消: {base_name}-{part_title}（已收到的内容保留在 .part 文件中）")
+        return None
+    finally:
+        if sink is not None:
+            sink.close()
+
+    if not generated_answer:
+        print(f"Deepseek失败: {base_name}-{part_title}")
+        return None
+
+    if sink is not None:
+        sink.finish(generated_answer)
+    else:
+        with open(output_path, "w", encoding="utf-8") as out_f:
+            out_f.write(generated_answer)
+    print(f"成功生成: {output_filename}")
+    return GeneratedAnswer(base_name, topic, generated_answer, output_path)
+
+# 把待生成的Part分组：同一预填文件里的 Part 1 每 batch_size 个一组，Part 2-y 与 Part 3-y 成对一组，
+# 其余单独成组。batch_size <= 1（默认）时每个Part单独请求。多于一个 Part 的组走非流式的批量请求。
+def plan_batches(jobs, batch_size):
+    if batch_size <= 1:
+        return [[job] for job in jobs]
+
+    batches = []
+    part1 = {}
+    pairs = {}
+    for job in jobs:
+        base_name, topic = job
+        if topic.part == 1:
+            part1.setdefault(base_name, []).append(job)
+        elif topic.part in (2, 3):
+            pairs.setdefault((base_name, topic.index), []).append(job)
+        else:
+            batches.append([job])
+    for group in part1.values():
+        batches.extend(group[i:i + batch_size] for i in range(0, len(group), batch_size))
+    batches.extend(pairs.values())
+    return batches
+
+# 处理一组Part（在线程池中执行），返回 [(job, GeneratedAnswer 或 None, 错误信息)]
+# 批量请求缺失或解析失败的块退回到单块请求
+def generate_batch(output_folder, batch, cache, rate_limiter, client, stream=True, events=None, cancel_event=None,
+                   compact=True):
+    results = []
+    answered = {}
+    if len(batch) > 1:
+        base_name = batch[0][0]
+        print(f"正在批量处理 {base_name}：{', '.join(topic.title for _, topic in batch)} ...")
+        system, max_tokens = request_budget([topic for _, topic in batch], compact, BATCH_MAX_TOKENS)
+        try:
+            answered = call_deepseek_batch({topic.title: topic.text() for _, topic in batch},
+                                           cache, rate_limiter, client, cancel_event, system,
+                                           max_tokens if compact else None)
+        except GenerationCancelled:
+            return [(job, None, "已取消") for job in batch]
+        except Exception as e:
+            print(f"批量请求失败，改为逐个请求: {e}")
+        if len(answered) < len(batch):
+            print(f"批量返回缺少 {len(batch) - len(answered)} 个块，改为逐个请求")
+
+    for job in batch:
+        base_name, topic = job
+        part_title = topic.title
+        if part_title in answered:
+            output_path = answer_path(output_folder, base_name, topic)
+            with open(output_path, "w", encoding="utf-8") as out_f:
+                out_f.write(answered[part_title])
+            if events is not None:
+                events.put((f"{base_name}-{part_title}", answered[part_title]))
+            print(f"成功生成: {os.path.basename(output_path)}")
+            results.append((job, GeneratedAnswer(base_name, topic, answered[part_title], output_path), None))
             continue
-        part_number = int(part_number_match.group(1))
-
-        # 维护每种 Part 的出现次数
-        count_tracker[part_number] = count_tracker.get(part_number, 0) + 1
-        suffix = count_tracker[part_number]
-
-        # 构造统一格式：Part x-y
-        part_title = f"Part {part_number}-{suffix}"
-
-        # 存入 dict
-        parts[part_title] = [full_text]
-
-    return parts
+        try:
+            answer = generate_part(output_folder, base_name, topic, cache, rate_limiter, client, stream, events,
+                                   cancel_event, compact)
+            results.append((job, answer, None))
+        except Exception as e:
+            print(f"处理失败: {base_name}-{part_title} → {e}")
+            results.append((job, None, str(e)))
+    return results
+
+# 把工作线程放进队列的流式片段转交给 on_delta(标签, 片段)；片段为 None 表示该 Part 重新开始
+def drain_events(events, on_delta):
+    while True:
+        try:
+            label, delta = events.get_nowait()
+        except queue.Empty:
+            return
+        on_delta(label, delta)
 
 # 主处理流程
-def process_all_txts():
-    txt_files = [f for f in os.listdir(INPUT_TXT_FOLDER) if f.endswith("_口语话题_预填.txt")]
-
-    if not txt_files:
+# prefill_topics 为 {预填文件名: [Topic]}，由上一步在内存中传入；prefill_texts 为 {预填文件名: 内容}；
+# 都不传时逐行解析 input_folder 下的预填文件
+# on_delta 在调用线程中执行（Streamlit 只能在脚本线程里更新页面）
+# index（Spk_topic_index.TopicIndex）不为 None 时，之前批次里题目完全相同（规范化后）的 Part 直接复用答案，
+# 新生成的答案写回索引
+# compact=True 时按题目的 Part 类型压缩系统提示和 max_tokens（见 request_budget）
+def process_all_txts(input_folder, output_folder, cache, rate_limiter, client, workers=DEFAULT_WORKERS, prefill_texts=None,
+                     stream=True, on_delta=None, cancel_event=None, batch_size=DEFAULT_BATCH_SIZE, prefill_topics=None,
+                     index=None, compact=True):
+    os.makedirs(output_folder, exist_ok=True)
+
+    if prefill_topics is None and prefill_texts is not None:
+        prefill_topics = {name: parse_topics(text) for name, text in prefill_texts.items()}
+    if prefill_topics is None:
+        prefill_topics = {}
+        for txt_filename in os.listdir(input_folder):
+            if txt_filename.endswith("_口语话题_预填.txt"):
+                print(f"正在读取: {txt_filename}")
+                prefill_topics[txt_filename] = parse_file(os.path.join(input_folder, txt_filename))
+
+    if not prefill_topics:
         print("没找到符合要求的预填文件。")
-        return
-
-    for txt_filename in txt_files:
-        txt_path = os.path.join(INPUT_TXT_FOLDER, txt_filename)
+        return []
+
+    # 先解析所有文件，收集全部待生成的Part，再统一并发提交
+    # 每个预填文件对应一份清单，已完成且输入未变的Part直接复用上次的答案
+    jobs = []
+    answers = []
+    manifests = {}
+    for txt_filename, topics in prefill_topics.items():
         base_name = os.path.splitext(txt_filename)[0]
-
-        print(f"正在读取: {txt_filename}")
-        with open(txt_path, "r", encoding="utf-8") as file:
-            file_content = file.read()
-
-        parts = split_parts(file_content)
-
-        if not parts:
+        if not topics:
             print(f"没拆分出任何Part，跳过 {txt_filename}")
             continue
 
-        # 处理每个Part
-        for part_title, part_text_list in parts.items():
-            # part_text_list 是一个列表，包含了多个相同的Part内容
-            for part_index, part_text in enumerate(part_text_list, start=1):
-                prompt_text = part_text.strip()
-                if not prompt_text:
-                    continue
-
-                print(f"正在处理 {base_name}-{part_title} ...")
-                generated_answer = call_deepseek(prompt_text)
-
-                if generated_answer:
-                    # 为避免文件名冲突，添加序号
-                    output_filename = f"{base_name}-{part_title}-已生成-{part_index}.txt"
-                    output_path = os.path.join(OUTPUT_FOLDER, output_filename)
-                    with open(output_path, "w", encoding="utf-8") as out_f:
-                        out_f.write(generated_answer)
-                    print(f"成功生成: {output_filename}")
-                else:
-                    print(f"Deepseek失败: {base_name}-{part_title}-{part_index}")
-
+        manifest = manifests[base_name] = Manifest(os.path.join(output_folder, f"{base_name}_manifest.json"), base_name)
+        for topic in topics:
+            if not topic.lines:
+                continue
+            if manifest.is_done(topic.title, unit_hash(topic.text())):
+                output_path = manifest.output_of(topic.title)
+                with open(output_path, "r", encoding="utf-8") as f:
+                    answers.append(GeneratedAnswer(base_name, topic, f.read(), output_path))
+                continue
+            hit = index.lookup(index_kind(), topic.part, index_text(topic), exact=True) if index is not None else None
+            if hit:
+                answer = reuse_answer(output_folder, base_name, topic, hit)
+                answers.append(answer)
+                manifest.mark(topic.title, unit_hash(topic.text()), DONE, output=answer.path)
+                continue
+            jobs.append((base_name, topic))
+
+    if answers:
+        print(f"跳过上次已完成的 {len(answers)} 个Part")
+
+    workers = max(1, workers)
+    cancel_event = cancel_event or threading.Event()
+    events = queue.Queue() if on_delta else None
+    batches = plan_batches(jobs, batch_size)
+    print(f"共 {len(jobs)} 个Part，合并为 {len(batches)} 个请求，并发数：{workers}")
+    if stream and any(len(batch) > 1 for batch in batches):
+        print("注意：合并的请求不是流式的，这些 Part 要等整组生成完才会输出")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(generate_batch, output_folder, batch, cache, rate_limiter, client, stream, events, cancel_event,
+                        compact): batch
+            for batch in batches
+        }
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                if events is not None:
+                    drain_events(events, on_delta)
+                for future in done:
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        results = [(job, None, str(e)) for job in futures[future]]
+                    for (base_name, topic), answer, error in results:
+                        if answer:
+                            answers.append(answer)
+                            manifests[base_name].mark(topic.title, unit_hash(topic.text()), DONE, output=answer.path)
+                            if index is not None:
+                                index.add(index_kind(), topic.part, index_text(topic), answer.text,
+                                          source=f"{base_name}-{topic.title}")
+                        else:
+                            manifests[base_name].mark(topic.title, unit_hash(topic.text()), FAILED, error=error)
+        except BaseException:
+            # Ctrl+C 或页面被中断：通知所有线程在下一个片段处停止
+            cancel_event.set()
+            for future in pending:
+                future.cancel()
+            raise
+
+    print(cache.summary())
+    print(client.summary())
+    print(token_budget.stats.summary())
+    if index is not None:
+        print(index.summary())
+    for manifest in manifests.values():
+        print(manifest.summary())
     print("\n全部txt处理完成！")
+    return answers
+
+# === 供流水线调用的入口 ===
+def run(input_folder, output_folder, workers=DEFAULT_WORKERS, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM,
+        use_cache=True, prefill_texts=None, stream=True, on_delta=None, cancel_event=None,
+        http2=False, read_timeout=READ_TIMEOUT, batch_size=DEFAULT_BATCH_SIZE, prefill_topics=None,
+        reuse=True, reuse_threshold=DEFAULT_REUSE_THRESHOLD, compact=True):
+    cache = ResponseCache(enabled=use_cache)
+    rate_limiter = RateLimiter(rpm, tpm)
+    token_budget.stats.reset()
+    client = get_client(config.get_secret("DEEPSEEK_API_KEY"), http2=http2, read_timeout=read_timeout)
+    index = None
+    if reuse:
+        from Spk_topic_index import TopicIndex   # 依赖 NumPy，只在需要时导入
+        index = TopicIndex(threshold=reuse_threshold)
+    try:
+        return process_all_txts(input_folder, output_folder, cache, rate_limiter, client, workers, prefill_texts,
+                                stream, on_delta, cancel_event, batch_size, prefill_topics, index, compact)
+    finally:
+        if index is not None:
+            index.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="预填txt文件夹")
+    parser.add_argument("--output", required=True, help="生成答案输出文件夹")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="同时在途的 Deepseek 请求数")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM, help="每分钟请求数上限（0 表示不限）")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TPM, help="每分钟 token 数上限（0 表示不限）")
+    parser.add_argument("--no-cache", action="store_true", help="不读写 Deepseek 响应缓存")
+    parser.add_argument("--no-stream", action="store_true", help="不使用流式接口，等完整返回后再写文件")
+    parser.add_argument("--http2", action="store_true", help="使用 HTTP/2 连接（需要 httpx[http2]）")
+    parser.add_argument("--read-timeout", type=float, default=READ_TIMEOUT, help="单次请求的读取超时（秒）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"每个请求合并的 Part 1 题组数（默认 1 不合并；大于 1 时 Part 2/3 也成对合并，"
+                             f"可省 token 和请求数，但合并的请求不流式输出，建议 {BATCH_SIZE}）")
+    parser.add_argument("--no-reuse", action="store_true", help="不查话题索引，所有题目都重新生成")
+    parser.add_argument("--reuse-threshold", type=float, default=DEFAULT_REUSE_THRESHOLD, help="索引里找候选的最低相似度（复用还要求题目完全相同）")
+    parser.add_argument("--no-compact", action="store_true", help="发送完整系统提示，max_tokens 一律用上限")
+    args = parser.parse_args()
+
+    run(args.input, args.output, args.workers, args.rpm, args.tpm,
+        use_cache=not args.no_cache, stream=not args.no_stream,
+        http2=args.http2, read_timeout=args.read_timeout, batch_size=args.batch_size,
+        reuse=not args.no_reuse, reuse_threshold=args.reuse_threshold, compact=not args.no_compact)
+
 # 执行主程序
 if __name__ == "__main__":
-    process_all_txts()
\ No newline at end of file
+    main()
@@ -1,61 +1,85 @@
 import os
 import re
+import argparse
 from collections import defaultdict
-from docx import Document
-from docx.shared import Pt
-from docx.oxml.ns import qn
+from Spk_topic_parser import part_key
+from Spk_docx_writer import paragraph_xml, write_docx
 
 # 设置路径
-source_folder = "answer"  # 你在项目中创建的 answer 文件夹
-output_path = os.path.join(source_folder, "汇总口语答案.docx")
-
-# 创建文档对象
-doc = Document()
-style = doc.styles['Normal']
-style.font.name = 'Times New Roman'
-style._element.rPr.rFonts.set(qn('w:eastAsia'), '宋体')
-style.font.size = Pt(12)
-
-# 提取 Part x-y 信息（兼容 Part x 直接变 Part x-1）
-pattern = re.compile(r'Part\s*(\d+)(?:-(\d+))?', re.IGNORECASE)
-parts_dict = defaultdict(dict)  # 结构: parts_dict[x][y] = filename
-
-# 收集文件信息到字典中
-for f in os.listdir(source_folder):
-    if f.endswith(".txt"):
-        match = pattern.search(f)
-        if match:
-            x = int(match.group(1))
-            y = int(match.group(2)) if match.group(2) else 1
-            parts_dict[x][y] = f
-
-# 1. 处理 Part 1 全部 y 升序
-for y in sorted(parts_dict[1]):
-    filename = parts_dict[1][y]
-    filepath = os.path.join(source_folder, filename)
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
+DEFAULT_SOURCE_FOLDER = "answer"  # 你在项目中创建的 answer 文件夹
+OUTPUT_NAME = "汇总口语答案.docx"
+
+# 收集文件信息到字典中，结构: parts_dict[x][y] = (标题, 内容)
+# 单独运行时只能从文件名里取 Part x-y（兼容 Part x 直接变 Part x-1）
+def collect_answer_files(source_folder):
+    parts_dict = defaultdict(dict)
+    for f in os.listdir(source_folder):
+        if f.endswith(".txt"):
+            key = part_key(f)
+            if key:
+                x, y = key
+                with open(os.path.join(source_folder, f), "r", encoding="utf-8") as infile:
+                    parts_dict[x][y] = (f.replace(".txt", ""), infile.read())
+    return parts_dict
+
+
+# 由上一步在内存中传来的 GeneratedAnswer 列表构造同样的字典，Part 编号直接取自话题记录
+def collect_answers(answers):
+    parts_dict = defaultdict(dict)
+    for answer in answers:
+        title = os.path.splitext(os.path.basename(answer.path))[0]
+        parts_dict[answer.topic.part][answer.topic.index] = (title, answer.text)
+    return parts_dict
+
+
+# 一个答案小节：二级标题 + 按空行分段的正文
+def section_xml(title, content):
     cleaned = re.sub(r'[*#`“”]', '', content).strip()
-    doc.add_heading(filename.replace(".txt", ""), level=2)
+    fragments = [paragraph_xml(title, "Heading 2")]
     for para in cleaned.split("\n\n"):
         if para.strip():
-            doc.add_paragraph(para.strip())
-
-# 2. 获取 Part 2 和 Part 3 的所有 y 值，合并去重后排序
-all_y = set(parts_dict[2].keys()) | set(parts_dict[3].keys())
-for y in sorted(all_y):
-    for x in [2, 3]:  # 先写 Part 2-y，再写 Part 3-y
-        if y in parts_dict[x]:
-            filename = parts_dict[x][y]
-            filepath = os.path.join(source_folder, filename)
-            with open(filepath, "r", encoding="utf-8") as f:
-                content = f.read()
-            cleaned = re.sub(r'[*#`“”]', '', content).strip()
-            doc.add_heading(filename.replace(".txt", ""), level=2)
-            for para in cleaned.split("\n\n"):
-                if para.strip():
-                    doc.add_paragraph(para.strip())
-
-# 保存 Word 文档
-doc.save(output_path)
-print("已生成 Word 文件，路径：", output_path)
+            fragments.append(paragraph_xml(para.strip()))
+    return "".join(fragments)
+
+
+# 按顺序产出各小节：Part 1 全部 y 升序，然后按 y 交替写 Part 2-y、Part 3-y
+def ordered_sections(parts_dict):
+    for y in sorted(parts_dict.get(1, {})):
+        yield parts_dict[1][y]
+
+    all_y = set(parts_dict.get(2, {})) | set(parts_dict.get(3, {}))
+    for y in sorted(all_y):
+        for x in [2, 3]:
+            if y in parts_dict.get(x, {}):
+                yield parts_dict[x][y]
+
+
+def answer_fragments(parts_dict):
+    for title, content in ordered_sections(parts_dict):
+        yield section_xml(title, content)
+
+
+# === 供流水线调用的入口 ===
+# answers 不为空时直接使用内存中的答案，否则读取 source_folder 下的 txt
+# 返回 (parts_dict, 输出路径)，parts_dict 供 S5 直接拼接合并文档
+def run(source_folder=DEFAULT_SOURCE_FOLDER, output_path=None, answers=None):
+    parts_dict = collect_answers(answers) if answers else collect_answer_files(source_folder)
+
+    # 保存 Word 文档
+    output_path = output_path or os.path.join(source_folder, OUTPUT_NAME)
+    write_docx(output_path, answer_fragments(parts_dict))
+    print("已生成 Word 文件，路径：", output_path)
+    return parts_dict, output_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=DEFAULT_SOURCE_FOLDER, help="答案txt文件夹")
+    parser.add_argument("--output", default=None, help="输出的 Word 文件路径")
+    args = parser.parse_args()
+
+    run(args.input, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,85 @@
 import os
 import re
-from docx import Document
-
-# === 路径设置 ===
 import argparse
+from itertools import chain
+from Spk_topic_parser import parse_topics, parse_file
+from Spk_docx_writer import paragraph_xml, write_docx
+from Spk_S4_Txt_to_Docx import collect_answer_files, answer_fragments
+from Spk_export import FORMATS, build_model, export
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--input", required=True, help="预填txt文件夹")
-parser.add_argument("--output", required=True, help="生成答案文件夹")
-args = parser.parse_args()
-
-prefill_folder = args.input
-output_folder = args.output
-
-origin_docx_path = os.path.join(output_folder, "汇总口语答案.docx")
-output_docx_path = os.path.join(output_folder, "汇总口语答案_标题.docx")
-prefill_docx_path = os.path.join(output_folder, "预填内容.docx")
-
-# === Step 1: 自动查找符合格式的预填 txt 文件 ===
-prefill_txt = None
-for fname in os.listdir(prefill_folder):
-    if re.match(r"\d{4}_口语话题_预填\.txt", fname):
-        prefill_txt = os.path.join(prefill_folder, fname)
-        break
-
-if prefill_txt is None:
-    raise FileNotFoundError("未找到“xxxx_口语话题_预填.txt”文件")
-
-# === Step 2: 创建预填内容 Word 并写入清洗后的段落 ===
-doc = Document()
-
-clean_line = lambda line: re.sub(r'[*#`“”]', '', line.strip())
-
-with open(prefill_txt, "r", encoding="utf-8") as f:
-    raw_lines = f.readlines()
-
-lines = [clean_line(line) for line in raw_lines if clean_line(line) != ""]
-
-for line in lines:
-    # 去掉项目符号 "- " 以防止被识别为列表
-    if line.lstrip().startswith("- "):
-        line = line.lstrip()[2:]
-    doc.add_paragraph(line)
-
-# === Step 3: 将 Part 1 / 2 的上一段设置为 Heading 3 ===
-pattern_part12 = re.compile(r"Part\s*[12](?:-\d+)?", re.IGNORECASE)
-paragraphs = doc.paragraphs
-
-for i in range(1, len(paragraphs)):
-    text = paragraphs[i].text.strip()
-    if pattern_part12.fullmatch(text):
-        prev_para = paragraphs[i - 1]
-        if prev_para.text.strip():
-            prev_para.style = 'Heading 3'
-
-# 保存预填内容 Word 文档
-doc.save(prefill_docx_path)
-print("已生成清洗后的预填内容 Word：", prefill_docx_path)
-
-# === Step 4: 合并到汇总文档开头 ===
-prefill_doc = Document(prefill_docx_path)
-main_doc = Document(origin_docx_path)
-
-for element in main_doc.element.body:
-    prefill_doc.element.body.append(element)
-
-prefill_doc.save(output_docx_path)
-print("已输出合并文档：", output_docx_path)
\ No newline at end of file
+# === 路径设置 ===
+OUTPUT_NAME = "汇总口语答案_标题"          # 合并文档，各导出格式共用这个文件名
+OUTPUT_DOCX_NAME = OUTPUT_NAME + ".docx"
+PREFILL_DOCX_NAME = "预填内容.docx"
+
+
+# === Step 1: 自动查找符合格式的预填 txt 文件（有多个批次时取最新的一个）===
+def find_prefill_txt(prefill_folder):
+    candidates = [
+        os.path.join(prefill_folder, fname) for fname in os.listdir(prefill_folder)
+        if re.fullmatch(r"\w+_口语话题_预填\.txt", fname)
+    ]
+    if not candidates:
+        raise FileNotFoundError("未找到“<批次ID>_口语话题_预填.txt”文件")
+    return max(candidates, key=os.path.getmtime)
+
+
+# === Step 2: 按话题记录生成预填内容段落 ===
+# Part 1 / Part 2 的关键词设为 Heading 3；紧跟 Part 2 的 Part 3 与其共用关键词，不再重复标题
+def topic_xml(topic):
+    fragments = []
+    if topic.keyword and topic.part in (1, 2):
+        fragments.append(paragraph_xml(topic.keyword, "Heading 3"))
+    fragments.append(paragraph_xml(f"Part {topic.part}"))
+    for line in topic.lines:
+        # 去掉项目符号 "- " 以防止被识别为列表
+        if line.startswith("- "):
+            line = line[2:]
+        fragments.append(paragraph_xml(line))
+    return "".join(fragments)
+
+
+def prefill_fragments(topics):
+    for topic in topics:
+        yield topic_xml(topic)
+
+
+# === 供流水线调用的入口 ===
+# topics / answer_parts 由前面步骤在内存中传入；不传时解析磁盘上的预填 txt 和 output_folder 下的答案 txt。
+# 预填内容和合并文档都由话题记录直接写出，不再保存后重新打开 docx 搬运段落。
+# formats 为合并结果要导出的格式（见 Spk_export.FORMATS），各格式由同一份导出模型依次写出
+def run(prefill_folder, output_folder, prefill_text=None, answer_parts=None, topics=None, formats=FORMATS):
+    if topics is None:
+        topics = parse_topics(prefill_text) if prefill_text is not None else parse_file(find_prefill_txt(prefill_folder))
+    if answer_parts is None:
+        answer_parts = collect_answer_files(output_folder)
+
+    # 保存预填内容 Word 文档
+    prefill_docx_path = os.path.join(output_folder, PREFILL_DOCX_NAME)
+    write_docx(prefill_docx_path, prefill_fragments(topics))
+    print("已生成清洗后的预填内容 Word：", prefill_docx_path)
+
+    # === Step 3: 预填内容在前、答案在后的合并文档，和其他导出格式同时写出 ===
+    def docx_writer(path, model):
+        return write_docx(path, chain(prefill_fragments(topics), answer_fragments(answer_parts)))
+
+    # docx 直接由话题记录渲染，只导出 docx 时不必整理导出模型
+    model = build_model(topics, answer_parts) if set(formats) - {"docx"} else []
+    paths = export(os.path.join(output_folder, OUTPUT_NAME), model, formats, docx_writer)
+    for path in paths.values():
+        print("已输出合并文档：", path)
+    return paths.get("docx")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="预填txt文件夹")
+    parser.add_argument("--output", required=True, help="生成答案文件夹")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS), help="合并结果的导出格式")
+    args = parser.parse_args()
+
+    run(args.input, args.output, formats=args.formats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+from functools import lru_cache
+
+# === 配置与密钥 ===
+# 各步骤脚本不再为了读一个密钥而导入 streamlit。查找顺序（先找到先用）：
+#   1. 环境变量，如 DEEPSEEK_API_KEY=...
+#   2. SPK_CONFIG 指向的 TOML 文件
+#   3. 当前目录下的 spk_config.toml
+#   4. 当前目录下的 .streamlit/secrets.toml，再到 ~/.streamlit/secrets.toml（与 Streamlit 共用同一份密钥）
+# TOML 只读取顶层的键。文件在第一次用到时读取并缓存，导入本模块不做任何事（tomllib 也在那时才导入）。
+
+CONFIG_FILES = [
+    "spk_config.toml",
+    os.path.join(".streamlit", "secrets.toml"),
+    os.path.join("~", ".streamlit", "secrets.toml"),
+]
+
+
+class ConfigError(Exception):
+    pass
+
+
+def config_files():
+    paths = [os.environ["SPK_CONFIG"]] if os.environ.get("SPK_CONFIG") else []
+    return paths + [os.path.expanduser(path) for path in CONFIG_FILES]
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    if not os.path.isfile(path):
+        return {}
+    try:
+        import tomllib
+    except ImportError:   # Python 3.10 及以下没有 tomllib，有 tomli 就用，否则只读环境变量
+        try:
+            import tomli as tomllib
+        except ImportError:
+            return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def get(name, default=None):
+    if name in os.environ:
+        return os.environ[name]
+    for path in config_files():
+        values = _load(path)
+        if name in values:
+            return values[name]
+    return default
+
+
+# 必须提供的密钥，找不到时报出查过的位置
+def get_secret(name):
+    value = get(name)
+    if not value:
+        searched = "、".join(config_files())
+        raise ConfigError(f"缺少 {name}：请设置同名环境变量，或写入以下任一 TOML 文件：{searched}")
+    return value
@@ -0,0 +1,348 @@
+import json
+import time
+import random
+import bisect
+import threading
+import Spk_config as config
+import Spk_perf as perf
+
+# === Deepseek HTTP 客户端（S2 / S3 共用）===
+# - 连接池 + keep-alive：同一进程内所有请求复用 TLS 连接
+# - 可选 HTTP/2（需要安装 httpx[http2]，否则自动退回 requests）
+# - 连接超时与读取超时分开设置，挂起的请求不会拖住整个批次
+# - 熔断：连续失败达到阈值后暂停请求一段时间，避免对故障端点狂轰
+# - 每类调用的延迟直方图
+
+# 可通过环境变量 / 配置文件的 DEEPSEEK_API_URL 指向本地 mock 服务器做离线基准测试，创建客户端时读取
+DEFAULT_API_URL = "https://api.deepseek.com/v1/chat/completions"
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 120
+POOL_SIZE = 16
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30
+MAX_RETRY_WAIT = BREAKER_COOLDOWN     # Retry-After 的上限，异常的响应头不会让工作线程一直等下去
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 40, 60, 120]
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TransportError(Exception):
+    pass
+
+
+# === 延迟直方图 ===
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    # 用桶上界估算分位数；上界超过实际最大值时取最大值（比如所有请求都落在同一个桶里）
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for i, c in enumerate(self.counts):
+            running += c
+            if running >= target:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max,
+            "buckets": dict(zip([f"<={b}s" for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+# === 熔断器：closed → open（冷却）→ half-open（放行一个试探请求）===
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    # 返回本次请求是否为半开状态下的试探请求
+    def before_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            if time.monotonic() - self.opened_at < self.cooldown or self.probing:
+                raise CircuitOpenError(f"Deepseek 连续失败 {self.failures} 次，熔断中")
+            self.probing = True
+            return True
+
+    # 试探请求没有结果就结束（被取消、意外异常）：放开试探名额，不计成功也不计失败
+    def release(self):
+        with self.lock:
+            self.probing = False
+
+    def record(self, ok):
+        with self.lock:
+            self.probing = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+
+# === 传输层：统一 requests 与 httpx 的响应接口 ===
+# requests / httpx 都在创建传输层时才导入
+class _RequestsTransport:
+    def __init__(self, pool_size, connect_timeout, read_timeout):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+
+    def post(self, url, headers, payload, stream):
+        try:
+            response = self.session.post(url, headers=headers, json=payload, stream=stream, timeout=self.timeout)
+        except self.requests.RequestException as e:
+            raise TransportError(str(e)) from e
+        response.encoding = "utf-8"
+        return _Response(response.status_code, response.headers, response.json,
+                         lambda: response.iter_lines(decode_unicode=True), response.close,
+                         self.requests.RequestException)
+
+    def close(self):
+        self.session.close()
+
+
+class _HttpxTransport:
+    def __init__(self, pool_size, connect_timeout, read_timeout):
+        import httpx
+        self.httpx = httpx
+        self.client = httpx.Client(
+            http2=True,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    def post(self, url, headers, payload, stream):
+        try:
+            request = self.client.build_request("POST", url, headers=headers, json=payload)
+            response = self.client.send(request, stream=stream)
+        except self.httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+        return _Response(response.status_code, response.headers, response.json,
+                         response.iter_lines, response.close, self.httpx.HTTPError)
+
+    def close(self):
+        self.client.close()
+
+
+class _Response:
+    def __init__(self, status_code, headers, json_fn, lines_fn, close_fn, error_type):
+        self.status_code = status_code
+        self.headers = headers
+        self._json = json_fn
+        self._lines = lines_fn
+        self.close = close_fn
+        self.error_type = error_type
+
+    def json(self):
+        try:
+            return self._json()
+        except self.error_type as e:
+            raise TransportError(str(e)) from e
+
+    def iter_lines(self):
+        try:
+            yield from self._lines()
+        except self.error_type as e:
+            raise TransportError(str(e)) from e
+
+
+def _make_transport(http2, pool_size, connect_timeout, read_timeout):
+    if http2:
+        try:
+            import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+            return _HttpxTransport(pool_size, connect_timeout, read_timeout)
+        except ImportError:
+            print("未安装 httpx[http2]，退回 HTTP/1.1 连接池")
+    return _RequestsTransport(pool_size, connect_timeout, read_timeout)
+
+
+# 计算重试等待时间：优先使用服务端的 Retry-After（不超过 MAX_RETRY_WAIT），否则指数退避加抖动
+def retry_wait(response, attempt, delay):
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(max(0.0, float(retry_after)), MAX_RETRY_WAIT)
+            except ValueError:
+                pass
+    return delay * (2 ** attempt) + random.uniform(0, delay)
+
+
+# 解析 SSE 流（data: {...} 行），每收到一段内容就交给 sink.write；末尾的 usage 和 finish_reason 写进 usage 字典
+def read_stream(response, sink=None, cancel_event=None, usage=None):
+    chunks = []
+    for line in response.iter_lines():
+        if cancel_event is not None and cancel_event.is_set():
+            response.close()
+            raise GenerationCancelled()
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        event = json.loads(data)
+        if usage is not None and event.get("usage"):
+            usage.update(event["usage"])
+        choices = event.get("choices") or []
+        if not choices:
+            continue  # 末尾只带 usage 的片段
+        if usage is not None and choices[0].get("finish_reason"):
+            usage["finish_reason"] = choices[0]["finish_reason"]
+        delta = choices[0].get("delta", {}).get("content")
+        if delta:
+            chunks.append(delta)
+            if sink is not None:
+                sink.write(delta)
+    return "".join(chunks).strip()
+
+
+class DeepseekClient:
+    def __init__(self, api_key, url=None, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 pool_size=POOL_SIZE, http2=False, breaker=None):
+        self.api_key = api_key
+        self.url = url or config.get("DEEPSEEK_API_URL", DEFAULT_API_URL)
+        self.transport = _make_transport(http2, pool_size, connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def _record_latency(self, label, seconds):
+        with self.lock:
+            self.histograms.setdefault(label, LatencyHistogram()).record(seconds)
+
+    # 发送一次 chat completions 请求（带重试），返回内容字符串；全部失败时返回 None。
+    # before_attempt(attempt) 在每次尝试前调用（限流、重置流式落盘等）。
+    # 传入 meta 字典时写入成功那次请求的 usage 和 finish_reason（"length" 表示输出被 max_tokens 截断）
+    def chat(self, payload, label="chat", retries=3, delay=5, sink=None, cancel_event=None, before_attempt=None,
+             meta=None):
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        stream = bool(payload.get("stream"))
+        if stream and "stream_options" not in payload:
+            payload = dict(payload, stream_options={"include_usage": True})
+
+        attempt, start = 0, time.perf_counter()
+        for attempt in range(retries):
+            if before_attempt is not None:
+                before_attempt(attempt)
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled()
+            probe = self.breaker.before_request()
+
+            response = None
+            start = time.perf_counter()
+            try:
+                response = self.transport.post(self.url, headers, payload, stream)
+                if response.status_code == 200:
+                    usage = {}
+                    if stream:
+                        content = read_stream(response, sink, cancel_event, usage)
+                    else:
+                        body = response.json()
+                        content = body["choices"][0]["message"]["content"].strip()
+                        usage = dict(body.get("usage") or {}, finish_reason=body["choices"][0].get("finish_reason"))
+                    if meta is not None:
+                        meta.update(usage)
+                    self.breaker.record(True)
+                    seconds = time.perf_counter() - start
+                    self._record_latency(label, seconds)
+                    perf.record("llm", label=label, seconds=round(seconds, 3), retries=attempt, ok=True,
+                                prompt_tokens=usage.get("prompt_tokens"),
+                                completion_tokens=usage.get("completion_tokens"))
+                    return content
+                print(f"请求失败（第{attempt + 1}次），状态码: {response.status_code}")
+                response.close()
+                # 4xx（429 除外）重试也不会成功；端点本身是通的，不计入熔断
+                if response.status_code < 500 and response.status_code != 429:
+                    self.breaker.record(True)
+                    break
+                self.breaker.record(False)
+            except (TransportError, ValueError, KeyError, IndexError, TypeError) as e:
+                print(f"请求异常（第{attempt + 1}次）: {e}")
+                self.breaker.record(False)
+            finally:
+                # 取消（GenerationCancelled）或其他异常直接抛出时没有调用 record，试探名额必须放开，
+                # 否则熔断器一直停在半开状态，之后的请求全部被拒绝
+                if probe:
+                    self.breaker.release()
+            self._record_latency(label + ".failed", time.perf_counter() - start)
+            if attempt < retries - 1:
+                time.sleep(retry_wait(response, attempt, delay))
+
+        perf.record("llm", label=label, seconds=round(time.perf_counter() - start, 3), retries=attempt, ok=False)
+        return None
+
+    def stats(self):
+        with self.lock:
+            return {label: h.snapshot() for label, h in self.histograms.items()}
+
+    def summary(self):
+        lines = []
+        for label, snap in self.stats().items():
+            lines.append(f"{label}: {snap['count']} 次，平均 {snap['mean']:.2f}s，"
+                         f"p50≈{snap['p50']:.2f}s，p95≈{snap['p95']:.2f}s，最大 {snap['max']:.2f}s")
+        return "\n".join(lines)
+
+    def close(self):
+        self.transport.close()
+
+
+# === 进程内共享的客户端 ===
+# 按 (api_key, 端点, 选项) 区分：同一工作进程里先后运行的步骤 / 任务传入不同的 http2、read_timeout 时
+# 各用各的客户端，相同设置的调用共用连接池
+_shared_clients = {}
+_shared_lock = threading.Lock()
+
+
+def get_client(api_key, **options):
+    url = options.get("url") or config.get("DEEPSEEK_API_URL", DEFAULT_API_URL)
+    key = (api_key, url, frozenset((name, value) for name, value in options.items() if name != "url"))
+    with _shared_lock:
+        if key not in _shared_clients:
+            _shared_clients[key] = DeepseekClient(api_key, **dict(options, url=url))
+        return _shared_clients[key]
@@ -0,0 +1,92 @@
+import io
+import re
+import zipfile
+from functools import lru_cache
+
+# === 流式 Word 写出 ===
+# python-docx 每次 add_paragraph 都要在整个 body 里找 sectPr 再插入，段落越多越慢，
+# 而且 S5 以前要先存一份 docx、再重新打开两份文档逐个搬运元素。
+# 这里只用 python-docx 生成一次空白模板（样式、页面设置等），正文段落直接拼成 XML
+# 边生成边写进 zip 里的 word/document.xml，整个文档只写一遍，不会在内存里建出完整的 DOM。
+
+DOCUMENT_PART = "word/document.xml"
+WRITE_CHUNK = 256 * 1024
+STYLE_IDS = {"Heading 1": "Heading1", "Heading 2": "Heading2", "Heading 3": "Heading3"}
+
+# XML 1.0 不允许的控制字符（OCR 文本里偶尔会有）
+INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+# 去掉 XML 不允许的控制字符。绝大多数文本里没有：去掉换行和制表符后 isprintable() 为真就原样返回，
+# 比用正则扫一遍快一倍左右；含全角空格等其他不可打印字符时仍按正则处理
+def strip_invalid(text):
+    if text.replace("\n", "").replace("\t", "").isprintable():
+        return text
+    return INVALID_XML_CHARS.sub("", text)
+
+
+# 与 xml.sax.saxutils.escape 相同；那个模块会连带导入 urllib / http.client，拖慢 S4 / S5 启动
+def escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+# 模板：正文字体 Times New Roman / 宋体 12 磅；返回 (其余部件, document.xml 开头, 结尾)
+@lru_cache(maxsize=1)
+def template_parts():
+    from docx import Document
+    from docx.shared import Pt
+    from docx.oxml.ns import qn
+
+    doc = Document()
+    style = doc.styles['Normal']
+    style.font.name = 'Times New Roman'
+    style._element.rPr.rFonts.set(qn('w:eastAsia'), '宋体')
+    style.font.size = Pt(12)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(buffer) as zf:
+        parts = {name: zf.read(name) for name in zf.namelist()}
+    document_xml = parts.pop(DOCUMENT_PART).decode("utf-8")
+    body_start = document_xml.index("<w:body>") + len("<w:body>")
+    body_end = document_xml.index("<w:sectPr")
+    return parts, document_xml[:body_start], document_xml[body_end:]
+
+
+def _run_xml(text):
+    pieces = []
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            pieces.append("<w:br/>")
+        for j, chunk in enumerate(line.split("\t")):
+            if j:
+                pieces.append("<w:tab/>")
+            if chunk:
+                pieces.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+    return f"<w:r>{''.join(pieces)}</w:r>"
+
+
+# 一个段落的 XML；style 为样式名（如 "Heading 2"），None 表示正文
+def paragraph_xml(text, style=None):
+    text = strip_invalid(text)
+    props = f'<w:pPr><w:pStyle w:val="{STYLE_IDS.get(style, style)}"/></w:pPr>' if style else ""
+    return f"<w:p>{props}{_run_xml(text) if text else ''}</w:p>"
+
+
+# fragments 为段落 XML 字符串的可迭代对象，攒够 WRITE_CHUNK 个字符写一次，不在内存里拼接整个文档
+def write_docx(path, fragments):
+    parts, head, tail = template_parts()
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+        with zf.open(DOCUMENT_PART, "w") as f:
+            pending, size = [head], len(head)
+            for fragment in fragments:
+                pending.append(fragment)
+                size += len(fragment)
+                if size >= WRITE_CHUNK:
+                    f.write("".join(pending).encode("utf-8"))
+                    pending, size = [], 0
+            pending.append(tail)
+            f.write("".join(pending).encode("utf-8"))
+    return path
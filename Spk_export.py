@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import time
+from dataclasses import dataclass, field
+import Spk_perf as perf
+from Spk_xlsx_writer import write_xlsx as write_sheet
+
+# === 多格式导出 ===
+# 话题记录和答案先整理成一份导出模型（按预填文件里的话题顺序，每个话题带上答案和逐题拆开的问答），
+# 各格式的写出函数都只读这份模型，依次写出：
+#   docx  合并 Q&A 文档（由 S5 传入写出函数，沿用流式写出）
+#   xlsx  每行一个问题和答案，方便老师在表格里筛选、批注（Spk_xlsx_writer 流式写出）
+#   md    Markdown，话题标题 + 问题 + 答案
+#   json  完整的结构化数据，供其他工具读取
+# 各格式的写出都是纯 Python 的 CPU 计算，放进线程池并不会更快（benchmarks/bench_export.py 实测与逐个写相同），所以按顺序写。
+
+FORMATS = ("docx", "xlsx", "md", "json")
+XLSX_COLUMNS = ("关键词", "Part", "编号", "问题", "答案")
+XLSX_WIDTHS = (16, 6, 10, 60, 100)
+XLSX_TITLE = "口语答案"
+
+MARKUP = str.maketrans("", "", "*#`“”")          # 与 S4 的 re.sub(r'[*#`“”]', '', ...) 相同
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+@dataclass
+class ExportTopic:
+    keyword: str
+    part: int
+    title: str                                       # Part x-y
+    cue: str = ""
+    bullets: list = field(default_factory=list)
+    questions: list = field(default_factory=list)
+    answer: str = ""
+    qa: list = field(default_factory=list)           # [(问题, 答案)]，答案拆不开时只有一项
+
+    # JSON 里答案只在 qa 中出现一次（拆不开时 qa 只有一项，就是整段答案）
+    def to_dict(self):
+        data = {k: v for k, v in self.__dict__.items() if k not in ("answer", "qa")}
+        data["qa"] = [{"question": q, "answer": a} for q, a in self.qa]
+        return data
+
+
+def clean_answer(text):
+    return text.translate(MARKUP).strip()
+
+
+def _match_key(text):
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+# 把 Part 1 / Part 3 的答案按问题拆开：模型先列出全部问题，再逐题作答，
+# 所以从后往前找每个问题最后一次出现的行，作为该题答案的开头。
+# 有问题找不到时返回 None，整段答案对应全部问题。比问题长得多的行是答案正文，不参与匹配；
+# 各行的匹配键在扫描时按需计算，开头列出问题的那几行通常用不到。
+# 每个答案都要逐行扫一遍，这里用普通循环和列表，不用生成器和闭包（导出模型的大部分时间花在这里）。
+def split_answer(questions, answer):
+    if not questions or not answer:
+        return None
+    lines = answer.split("\n")
+    limit = 2 * max(len(q) for q in questions) + 20
+    keys = [None] * len(lines)
+
+    starts, end = [], len(lines)
+    for question in reversed(questions):
+        key = _match_key(question)
+        if not key:
+            return None
+        for row in range(end - 1, -1, -1):
+            line_key = keys[row]
+            if line_key is None:
+                line = lines[row]
+                line_key = keys[row] = _match_key(line) if 0 < len(line) <= limit else ""
+            if key in line_key:
+                break
+        else:
+            return None
+        starts.append(row)
+        end = row
+    starts.reverse()
+    bounds = starts[1:] + [len(lines)]
+    return [(q, "\n".join(lines[s + 1:e]).strip()) for q, s, e in zip(questions, starts, bounds)]
+
+
+def _question_text(topic):
+    if topic.part == 2:
+        return "\n".join(([topic.cue] if topic.cue else []) + ["- " + b for b in topic.bullets])
+    return "\n".join(topic.questions)
+
+
+# topics 为 Spk_topic_parser.Topic 列表，answer_parts 为 S4 的 parts_dict[x][y] = (标题, 内容)
+# 没有对应话题记录的答案（只从磁盘读到答案 txt 时）排在最后，问题留空
+def build_model(topics, answer_parts):
+    model, used = [], set()
+    for topic in topics:
+        _, answer = answer_parts.get(topic.part, {}).get(topic.index, ("", ""))
+        used.add((topic.part, topic.index))
+        answer = clean_answer(answer)
+        qa = split_answer(topic.questions, answer) if topic.part != 2 else None
+        model.append(ExportTopic(topic.keyword, topic.part, topic.title, topic.cue, list(topic.bullets),
+                                 list(topic.questions), answer, qa or [(_question_text(topic), answer)]))
+    for part in sorted(answer_parts):
+        for index in sorted(answer_parts[part]):
+            if (part, index) not in used:
+                title, answer = answer_parts[part][index]
+                answer = clean_answer(answer)
+                model.append(ExportTopic("", part, f"Part {part}-{index}", answer=answer, qa=[("", answer)]))
+    return model
+
+
+# === 各格式的写出函数：write_xxx(path, model) ===
+def write_xlsx(path, model):
+    rows = ((topic.keyword, topic.part, topic.title, question, answer)
+            for topic in model for question, answer in topic.qa)
+    return write_sheet(path, XLSX_COLUMNS, rows, XLSX_WIDTHS, XLSX_TITLE)
+
+
+def write_markdown(path, model):
+    with open(path, "w", encoding="utf-8") as f:
+        for topic in model:
+            heading = f"{topic.keyword} · {topic.title}" if topic.keyword else topic.title
+            f.write(f"## {heading}\n\n")
+            if topic.cue:
+                f.write(f"**{topic.cue}**\n\n")
+            for bullet in topic.bullets:
+                f.write(f"- {bullet}\n")
+            if topic.bullets:
+                f.write("\n")
+            if len(topic.qa) > 1:
+                for question, answer in topic.qa:
+                    f.write(f"### {question}\n\n{answer}\n\n")
+                continue
+            for i, question in enumerate(topic.questions, 1):
+                f.write(f"{i}. {question}\n")
+            if topic.questions:
+                f.write("\n")
+            if topic.answer:
+                f.write(f"{topic.answer}\n\n")
+    return path
+
+
+def write_json(path, model):
+    # 不缩进、整体 dumps 时走 json 的 C 编码器（indent 或 json.dump 都会退回纯 Python 实现）
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps([topic.to_dict() for topic in model], ensure_ascii=False))
+    return path
+
+
+WRITERS = {"xlsx": write_xlsx, "md": write_markdown, "json": write_json}
+
+
+def _timed(fmt, writer, path, model):
+    start = time.perf_counter()
+    writer(path, model)
+    seconds = time.perf_counter() - start
+    perf.record("export", format=fmt, seconds=round(seconds, 3), bytes=os.path.getsize(path))
+    return path
+
+
+# 按 formats 的顺序写出各格式，文件名为 base_path + "." + 格式；docx 的写出函数由调用方传入
+# 返回 {格式: 路径}，某个格式失败时抛出异常（之后的格式不再写）
+def export(base_path, model, formats=FORMATS, docx_writer=None):
+    writers = dict(WRITERS, docx=docx_writer)
+    unknown = [fmt for fmt in formats if fmt not in writers]
+    if unknown:
+        raise ValueError(f"不支持的导出格式：{'、'.join(unknown)}（可选 {'、'.join(FORMATS)}）")
+    if "docx" in formats and docx_writer is None:
+        raise ValueError("导出 docx 需要传入 docx_writer")
+
+    return {fmt: _timed(fmt, writers[fmt], f"{base_path}.{fmt}", model) for fmt in formats}
@@ -0,0 +1,135 @@
+import re
+import zlib
+
+# === 截图去重 ===
+# 第一步：感知哈希（aHash + dHash），在 OCR 之前合并重复上传的同一张截图；
+# 第二步：OCR 文本指纹（词级 shingle），在调用 Deepseek 之前合并同一页的不同裁剪。
+
+# 文字截图大多是白底黑字，8x8 哈希几乎分不开不同页面，所以用 16x16
+HASH_SIZE = 16
+PHASH_THRESHOLD = 12       # 256 位哈希中允许不同的位数
+TEXT_THRESHOLD = 0.85      # 文本包含度阈值
+SHINGLE_SIZE = 3
+
+
+# 平均哈希：缩成 NxN 灰度图，每个像素与均值比较
+def ahash(image, size=HASH_SIZE) -> int:
+    from PIL import Image
+    small = image.convert("L").resize((size, size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    mean = sum(pixels) / len(pixels)
+    bits = 0
+    for p in pixels:
+        bits = (bits << 1) | (p >= mean)
+    return bits
+
+
+# 差值哈希：缩成 (N+1)xN 灰度图，比较相邻像素的明暗
+def dhash(image, size=HASH_SIZE) -> int:
+    from PIL import Image
+    small = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+# 供进程池调用：返回 (aHash, dHash)
+def image_hashes(image_path):
+    from PIL import Image
+    with Image.open(image_path) as image:
+        return ahash(image), dhash(image)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+# 按感知哈希分组，返回 [[代表文件, 重复文件...], ...]，组内及组间保持输入顺序
+def group_by_phash(hashes: dict, threshold=PHASH_THRESHOLD):
+    names = list(hashes)
+    parent = list(range(len(names)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(names)):
+        a1, d1 = hashes[names[i]]
+        for j in range(i + 1, len(names)):
+            a2, d2 = hashes[names[j]]
+            if hamming(a1, a2) <= threshold and hamming(d1, d2) <= threshold:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+
+    groups = {}
+    for i, name in enumerate(names):
+        groups.setdefault(find(i), []).append(name)
+    return list(groups.values())
+
+
+# OCR 文本指纹：小写单词的 3-gram 哈希集合
+def text_fingerprint(text: str) -> frozenset:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return frozenset([zlib.crc32(" ".join(words).encode("utf-8"))]) if words else frozenset()
+    return frozenset(
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    )
+
+
+# 包含度：较小集合有多少落在较大集合里（裁剪图的文本是整页文本的子集）
+def containment(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+# 流式文本去重：逐个加入 OCR 结果，判断与已接受的哪一份重复
+class TextDeduper:
+    def __init__(self, threshold=TEXT_THRESHOLD):
+        self.threshold = threshold
+        self.accepted = {}  # 文件名 -> 指纹
+
+    # 返回 (重复的已接受文件名或 None, 新文本是否包含更多内容)
+    def match(self, fingerprint):
+        for name, fp in self.accepted.items():
+            if containment(fingerprint, fp) >= self.threshold:
+                return name, len(fingerprint) > len(fp)
+        return None, False
+
+    def accept(self, name, fingerprint):
+        self.accepted[name] = fingerprint
+
+    def discard(self, name):
+        self.accepted.pop(name, None)
+
+
+def report_collapsed(collapsed: dict, reason: str):
+    for keep, dropped in collapsed.items():
+        if dropped:
+            print(f"[{reason}] {keep} 合并了重复图片：{', '.join(dropped)}")
+
+
+# 把两步去重的结果合成 {最终保留的图片: [被合并掉的图片]}：
+# 感知哈希保留下来的图片若又被 OCR 文本去重合并掉，它的重复项也归到最终保留的那张
+def resolve_duplicates(*collapsed_maps) -> dict:
+    kept_by = {}
+    for collapsed in collapsed_maps:
+        for keep, dropped in collapsed.items():
+            for name in dropped:
+                kept_by[name] = keep
+    resolved = {}
+    for name in kept_by:
+        keep = kept_by[name]
+        while keep in kept_by:
+            keep = kept_by[keep]
+        resolved.setdefault(keep, []).append(name)
+    return resolved
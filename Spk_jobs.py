@@ -0,0 +1,331 @@
+import os
+import io
+import json
+import time
+import uuid
+import atexit
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from contextlib import redirect_stdout
+
+# === 任务队列与后台工作进程 ===
+# 每次上传建一个独立的任务工作区 jobs/<工作区ID>/（截图、预填 txt、答案各一个子目录），
+# 多位老师同时使用时互不覆盖。要执行的步骤作为任务写进 SQLite 队列，由后台工作进程领取运行，
+# Streamlit 页面只负责提交任务和轮询状态，长时间的步骤不会卡住页面。
+#
+# 每个工作进程同一时间只跑一个任务（流水线会重定向整个进程的 stdout 来收集日志），
+# 并发数即工作进程数。同一工作区的任务按提交顺序串行执行。
+#
+#   python Spk_jobs.py --workers 4        # 单独启动工作进程池（页面设置 SPK_EXTERNAL_WORKERS=1 时使用）
+
+JOBS_ROOT = os.environ.get("SPK_JOBS_ROOT", "jobs")
+QUEUE_PATH = os.path.join(JOBS_ROOT, "jobs.sqlite")
+DEFAULT_WORKERS = int(os.environ.get("SPK_JOB_WORKERS", "2"))
+POLL_INTERVAL = 1.0
+LIVE_INTERVAL = 0.5
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+IMG_DIR = "uploaded_imgs"
+PREFILL_DIR = "txt_prefill"
+ANSWER_DIR = "answer_output"
+
+HOSTNAME = socket.gethostname()
+
+
+# === 任务工作区 ===
+def new_workspace(root=JOBS_ROOT):
+    workspace_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    for sub in (IMG_DIR, PREFILL_DIR, ANSWER_DIR):
+        os.makedirs(os.path.join(root, workspace_id, sub), exist_ok=True)
+    return workspace_id
+
+
+def workspace_dirs(workspace_id, root=JOBS_ROOT):
+    base = os.path.join(root, workspace_id)
+    return os.path.join(base, IMG_DIR), os.path.join(base, PREFILL_DIR), os.path.join(base, ANSWER_DIR)
+
+
+# === SQLite 队列 ===
+class JobQueue:
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, workspace TEXT NOT NULL, steps TEXT NOT NULL, options TEXT NOT NULL, "
+            "status TEXT NOT NULL, current_step TEXT, stages TEXT NOT NULL DEFAULT '[]', live TEXT, error TEXT, "
+            "cancel_requested INTEGER NOT NULL DEFAULT 0, worker TEXT, "
+            "created REAL NOT NULL, started REAL, finished REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params)
+
+    def submit(self, workspace, steps=None, options=None):
+        job_id = uuid.uuid4().hex[:12]
+        self._execute(
+            "INSERT INTO jobs (id, workspace, steps, options, status, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, workspace, json.dumps(steps), json.dumps(options or {}), QUEUED, time.time()),
+        )
+        return job_id
+
+    # 原子地领取最早的排队任务；同一工作区已有任务在运行时先跳过
+    def claim(self, worker):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND cancel_requested = 0 AND workspace NOT IN "
+                    "(SELECT workspace FROM jobs WHERE status = ?) ORDER BY created LIMIT 1",
+                    (QUEUED, RUNNING),
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute("UPDATE jobs SET status = ?, worker = ?, started = ? WHERE id = ?",
+                                      (RUNNING, worker, time.time(), row["id"]))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return _decode(row) if row is not None else None
+
+    def set_current(self, job_id, step):
+        self._execute("UPDATE jobs SET current_step = ? WHERE id = ?", (step, job_id))
+
+    def add_stage(self, job_id, stage):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                stages = json.loads(row["stages"]) + [stage]
+                self.conn.execute("UPDATE jobs SET stages = ? WHERE id = ?",
+                                  (json.dumps(stages, ensure_ascii=False), job_id))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def set_live(self, job_id, text):
+        self._execute("UPDATE jobs SET live = ? WHERE id = ?", (text, job_id))
+
+    def finish(self, job_id, status, error=None):
+        self._execute("UPDATE jobs SET status = ?, error = ?, finished = ?, current_step = NULL, live = NULL WHERE id = ?",
+                      (status, error, time.time(), job_id))
+
+    # 排队中的任务直接取消；运行中的任务由工作进程发现标记后中止
+    def cancel(self, job_id):
+        self._execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+        self._execute("UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                      (CANCELLED, time.time(), job_id, QUEUED))
+
+    def cancel_requested(self, job_id):
+        row = self._execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def get(self, job_id):
+        row = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _decode(row) if row is not None else None
+
+    def list(self, job_ids=None, limit=50):
+        if job_ids is not None:
+            if not job_ids:
+                return []
+            marks = ",".join("?" * len(job_ids))
+            rows = self._execute(f"SELECT * FROM jobs WHERE id IN ({marks}) ORDER BY created DESC", list(job_ids))
+        else:
+            rows = self._execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,))
+        return [_decode(row) for row in rows.fetchall()]
+
+    # 工作进程异常退出时留下的"运行中"任务重新排队；各步骤有批次清单，重跑只补未完成的部分。
+    # 只处理本机上进程已不存在的工作进程，其他机器 / 其他进程池的任务不动。
+    def requeue_stale(self):
+        stale = [
+            row["id"] for row in self._execute("SELECT id, worker FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+            if _worker_dead(row["worker"])
+        ]
+        for job_id in stale:
+            self._execute("UPDATE jobs SET status = ?, worker = NULL, current_step = NULL, live = NULL "
+                          "WHERE id = ? AND status = ?", (QUEUED, job_id, RUNNING))
+        return len(stale)
+
+    def close(self):
+        self.conn.close()
+
+
+def worker_name(pid=None):
+    return f"{HOSTNAME}:{pid or os.getpid()}"
+
+
+def _worker_dead(worker):
+    if not worker:
+        return True
+    host, _, pid = worker.rpartition(":")
+    if host != HOSTNAME:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (PermissionError, ValueError):
+        return False
+    return False
+
+
+def _decode(row):
+    job = dict(row)
+    job["steps"] = json.loads(job["steps"])
+    job["options"] = json.loads(job["options"])
+    job["stages"] = json.loads(job["stages"])
+    return job
+
+
+# === 工作进程 ===
+def run_job(queue, job, root=JOBS_ROOT):
+    from Spk_pipeline import Pipeline
+
+    img_dir, prefill_dir, answer_dir = workspace_dirs(job["workspace"], root)
+    options = dict(job["options"])
+    profile = options.pop("profile", {})      # {"Step 3": "cprofile"}，见 Spk_perf
+    pipeline = Pipeline(img_dir, prefill_dir, answer_dir, options=options, profile=profile)
+    live = {"texts": {}, "written": 0.0}
+    stop = threading.Event()
+
+    # 页面点了取消时中止流水线（Step 3 会同时取消在途请求）
+    def watch_cancel():
+        while not stop.wait(POLL_INTERVAL):
+            if queue.cancel_requested(job["id"]):
+                pipeline.cancel()
+
+    def on_stage(step, result):
+        if result is None:
+            queue.set_current(job["id"], step)
+            return
+        queue.add_stage(job["id"], {"step": step, "ok": result.ok, "seconds": round(result.seconds, 2),
+                                    "log": result.log, "error": result.error, "perf": result.perf})
+
+    # Step 3 的流式输出：最多每 LIVE_INTERVAL 秒写一次最新片段，供页面轮询显示
+    def on_delta(label, delta):
+        texts = live["texts"]
+        texts[label] = "" if delta is None else texts.get(label, "") + delta
+        now = time.monotonic()
+        if now - live["written"] > LIVE_INTERVAL:
+            live["written"] = now
+            queue.set_live(job["id"], json.dumps({"label": label, "parts": len(texts), "text": texts[label][-1500:]},
+                                                 ensure_ascii=False))
+
+    watcher = threading.Thread(target=watch_cancel, daemon=True)
+    watcher.start()
+    try:
+        results = pipeline.run(job["steps"], on_stage, on_delta)
+    except Exception as e:
+        queue.finish(job["id"], FAILED, f"{type(e).__name__}: {e}")
+        return
+    finally:
+        stop.set()
+
+    if pipeline.cancel_event.is_set():
+        queue.finish(job["id"], CANCELLED)
+    elif all(r.ok for r in results):
+        queue.finish(job["id"], DONE)
+    else:
+        queue.finish(job["id"], FAILED, next(r.error for r in results if not r.ok))
+
+
+def worker_loop(queue_path=QUEUE_PATH, root=JOBS_ROOT, poll_interval=POLL_INTERVAL):
+    queue = JobQueue(queue_path)
+    worker = worker_name()
+    parent = multiprocessing.parent_process()
+    while True:
+        # 工作进程不是 daemon，启动它的进程被强制结束时不会连带退出，发现父进程不在了就自己退出
+        if parent is not None and not parent.is_alive():
+            return
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        # 任务内部的打印全部由流水线收集进各步骤日志，这里不再输出到控制台
+        with redirect_stdout(io.StringIO()):
+            run_job(queue, job, root)
+
+
+class WorkerPool:
+    def __init__(self, workers=DEFAULT_WORKERS, queue_path=QUEUE_PATH, root=JOBS_ROOT):
+        self.workers = max(1, workers)
+        self.queue_path = queue_path
+        self.root = root
+        self.processes = []
+
+    def _spawn(self):
+        # spawn：不从 Streamlit 服务进程 fork，子进程里没有它的线程和锁。
+        # 不能设 daemon：Step 2 在工作进程里还要开 OCR 进程池，daemon 进程不允许有子进程
+        context = multiprocessing.get_context("spawn")
+        process = context.Process(target=worker_loop, args=(self.queue_path, self.root))
+        process.start()
+        return process
+
+    def start(self):
+        self.requeue_stale()
+        self.processes = [self._spawn() for _ in range(self.workers)]
+        # 非 daemon 子进程在解释器退出时会被等待；先结束它们，服务进程才能正常退出
+        atexit.register(self.stop)
+        return self
+
+    def requeue_stale(self):
+        queue = JobQueue(self.queue_path)
+        try:
+            count = queue.requeue_stale()
+        finally:
+            queue.close()
+        if count:
+            print(f"重新排队 {count} 个中断的任务")
+
+    # 重启意外退出的工作进程，并把它们没跑完的任务重新排队
+    def ensure_alive(self):
+        dead = [i for i, process in enumerate(self.processes) if not process.is_alive()]
+        if not dead:
+            return
+        self.requeue_stale()
+        for i in dead:
+            self.processes[i] = self._spawn()
+
+    def stop(self):
+        atexit.unregister(self.stop)
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="工作进程数（同时运行的任务数）")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="任务队列 SQLite 路径")
+    parser.add_argument("--root", default=JOBS_ROOT, help="任务工作区根目录")
+    args = parser.parse_args()
+
+    pool = WorkerPool(args.workers, args.queue, args.root).start()
+    print(f"已启动 {pool.workers} 个工作进程，队列：{args.queue}")
+    try:
+        while True:
+            time.sleep(5)
+            pool.ensure_alive()
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# === Deepseek 响应缓存 ===
+# 以 (模型, 消息, 采样参数) 的哈希为键，把返回内容存进本地 SQLite。
+# 重跑同一批截图 / 预填文件时直接命中缓存，不再消耗 API token。
+
+DEFAULT_CACHE_PATH = os.path.join(".llm_cache", "deepseek.sqlite")
+DEFAULT_TTL = 30 * 24 * 3600          # 30 天
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+
+# 这些字段不影响返回内容，不参与缓存键
+_NON_SEMANTIC_KEYS = {"stream", "stream_options"}
+
+
+def make_key(payload: dict) -> str:
+    material = {k: v for k, v in payload.items() if k not in _NON_SEMANTIC_KEYS}
+    raw = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = None
+        if enabled:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.conn.commit()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, content):
+        if not self.enabled or not content:
+            return
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, content, size, now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    # 先删过期条目，再按最近访问时间淘汰到容量以内
+    def _evict(self, now):
+        if self.ttl:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        if not self.max_bytes:
+            return
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "enabled": self.enabled}
+
+    def summary(self):
+        if not self.enabled:
+            return "缓存已关闭"
+        return f"缓存命中 {self.hits} 次，未命中 {self.misses} 次"
@@ -0,0 +1,232 @@
+import re
+import threading
+from dataclasses import dataclass, field
+import Spk_perf as perf
+from Spk_token_budget import compact_ocr
+from Spk_topic_parser import HEADER, BULLET, SHOULD_SAY
+
+# === 本地结构化 ===
+# 大部分截图的 OCR 文本本来就是 "关键词 / Part N / 编号问题" 的排版，交给 Deepseek 只是换个格式。
+# 这里先在本地按规则整理：清理 OCR 文本 → 逐行识别 Part 标题、编号问题、Part 2 题干和 "You should say" 要点
+# → 按 S2 提示词里的格式输出，同时给出置信度。置信度达到阈值的页面直接使用本地结果，其余页面仍交给 Deepseek。
+#
+# 处理的常见 OCR 问题：
+#   长问题 / 题干 / 要点被截图折行 → 接到上一行（问题以问号结尾，题干以句号结尾，要点按开头的疑问词分）
+#   "PART l"、"Part2:" 等标题写法，"1," "l." 等编号写法，"•" "e " 等要点符号
+# 置信度从 1 开始按发现的问题扣分（见 PENALTIES），宁可多交给 Deepseek，也不把没把握的页面留在本地。
+
+DEFAULT_LOCAL_THRESHOLD = 0.8
+
+# 各类问题的扣分
+PENALTIES = {
+    "no_questions": 0.5,        # Part 1 / Part 3 没有问题
+    "numbering": 0.2,           # 问题编号不是 1, 2, 3, ...
+    "no_question_mark": 0.2,    # 每个不以问号结尾的问题
+    "no_keyword": 0.15,         # Part 1 前没有关键词
+    "no_cue": 0.3,              # Part 2 没有 "Describe ..." 题干
+    "bullets": 0.2,             # Part 2 要点不是 3~6 条
+    "stray_line": 0.15,         # 每行无法归类的文本
+    "garbled": 0.25,            # 每行含 OCR 乱码符号的题目
+}
+
+OCR_HEADER = re.compile(r"P\s*a\s*r\s*t\s*([123lI|])\b\s*[:：.]?", re.IGNORECASE)
+OCR_QUESTION = re.compile(r"([0-9lI]{1,2})\s*[.,)、．]\s*(.+)")
+OCR_BULLET = re.compile(r"(?:[eo°«]|[-*•·])\s+(.+)")     # tesseract 常把圆点识别成 e / o / ° / «
+GARBLED = re.compile(r"[|©®{}\[\]<>_~^\\@$%]")
+CUE = re.compile(r"describe\b", re.IGNORECASE)
+BULLET_STARTERS = ("who", "what", "where", "when", "why", "how", "which", "whether", "if", "and")
+
+
+def extract_clean_parts(text: str) -> str:
+    # 去 markdown 粗体（保留内容）
+    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
+
+    # 去掉中英文注释括号内的内容，但保留英文说明（更安全）
+    # 仅去除 “括号内全是中文或标点”的情况
+    text = re.sub(r"[（(][\u4e00-\u9fa5，。、《》！？：；、—…·【】]*[）)]", "", text)
+
+    # 去分割线（---）
+    text = re.sub(r"-{2,}", "", text)
+
+    # 去除多余空行
+    text = re.sub(r"\n{2,}", "\n\n", text)
+
+    return text.strip()
+
+
+@dataclass
+class LocalTopic:
+    part: int
+    keyword: str = ""
+    cue: str = ""
+    bullets: list = field(default_factory=list)
+    questions: list = field(default_factory=list)
+    numbers: list = field(default_factory=list)      # OCR 识别到的编号，未编号的问题为 None
+    follows_part2: bool = False
+
+
+@dataclass
+class LocalResult:
+    text: str
+    confidence: float
+    issues: list = field(default_factory=list)
+
+
+def _ocr_digit(text):
+    return int(text.translate(str.maketrans("lI|", "111")))
+
+
+def _header(line):
+    match = OCR_HEADER.fullmatch(line)
+    if match:
+        return _ocr_digit(match.group(1))
+    match = HEADER.fullmatch(line)
+    return int(match.group(1)) if match else None
+
+
+def _is_open(text):
+    return not text.endswith(("?", "？", ".", "。", ":", "："))
+
+
+# 逐行归类，返回 (话题列表, 无法归类的行)
+# 紧挨着 Part 标题（紧跟 Part 2 的 Part 3 除外）、不以问号结尾的一行是下一个话题的关键词，不接到上一个话题里
+def parse_ocr(lines):
+    topics, stray, pending = [], [], []
+    current, in_bullets = None, False
+    parts = [_header(line) for line in lines] + [None]
+    for line, part, next_part in zip(lines, parts, parts[1:]):
+        if part is not None:
+            follows = part == 3 and current is not None and current.part == 2
+            if pending and (follows or GARBLED.search(pending[-1])):   # 带乱码符号的多半是状态栏 / 导航栏
+                stray.extend(pending)
+                pending = []
+            stray.extend(pending[:-1])
+            keyword = current.keyword if follows else (pending[-1] if pending else "")
+            current = LocalTopic(part, keyword, follows_part2=follows)
+            topics.append(current)
+            pending, in_bullets = [], False
+            continue
+        starts_topic = next_part is not None and not (next_part == 3 and current is not None and current.part == 2)
+        if current is None or (starts_topic and not line.endswith(("?", "？"))):
+            pending.append(line)
+            continue
+
+        question = OCR_QUESTION.fullmatch(line)
+        bullet = OCR_BULLET.fullmatch(line) if current.part == 2 else BULLET.fullmatch(line)
+        if question and not in_bullets:
+            current.questions.append(question.group(2).strip())
+            current.numbers.append(_ocr_digit(question.group(1)))
+        elif current.part == 2 and SHOULD_SAY.match(line):
+            in_bullets = True
+        elif current.part == 2 and not current.cue and not in_bullets:
+            current.cue = line
+        elif current.part == 2 and not in_bullets and _is_open(current.cue):
+            current.cue += " " + line
+        elif in_bullets and not pending:
+            text = bullet.group(1).strip() if bullet else line
+            if current.bullets and not bullet and not text.lower().startswith(BULLET_STARTERS):
+                current.bullets[-1] += " " + text
+            else:
+                current.bullets.append(text)
+        elif current.questions and _is_open(current.questions[-1]) and not pending:
+            current.questions[-1] += " " + line
+        elif line.endswith(("?", "？")) and not pending:
+            current.questions.append(line)
+            current.numbers.append(None)
+        else:
+            pending.append(line)        # 可能是下一个话题的关键词
+    return topics, stray + pending
+
+
+# Part 2 前没有关键词时用题干代替："Describe a relaxing activity ..." → "A relaxing activity ..."
+def cue_keyword(cue):
+    text = CUE.sub("", cue, count=1).strip().rstrip(".。")
+    return text[:1].upper() + text[1:]
+
+
+def score(topics, stray):
+    issues = []
+    if not topics:
+        return 0.0, ["没有识别到 Part 标题"]
+    for topic in topics:
+        name = f"Part {topic.part}"
+        if topic.part == 2:
+            if not CUE.match(topic.cue):
+                issues.append(("no_cue", f"{name} 没有题干"))
+            if not 3 <= len(topic.bullets) <= 6:
+                issues.append(("bullets", f"{name} 有 {len(topic.bullets)} 条要点"))
+        else:
+            if not topic.questions:
+                issues.append(("no_questions", f"{name} 没有问题"))
+            elif topic.numbers != list(range(1, len(topic.numbers) + 1)):
+                issues.append(("numbering", f"{name} 的问题编号不连续"))
+            if topic.part == 1 and not topic.keyword:
+                issues.append(("no_keyword", f"{name} 没有关键词"))
+        for question in topic.questions:
+            if not question.endswith(("?", "？")):
+                issues.append(("no_question_mark", f"不以问号结尾：{question}"))
+        for text in [topic.keyword, topic.cue] + topic.bullets + topic.questions:
+            if GARBLED.search(text):
+                issues.append(("garbled", f"含乱码符号：{text}"))
+    issues.extend(("stray_line", f"无法归类：{line}") for line in stray)
+    confidence = max(0.0, 1.0 - sum(PENALTIES[kind] for kind, _ in issues))
+    return round(confidence, 2), [message for _, message in issues]
+
+
+# 按 S2 提示词的格式输出：话题之间空一行，紧跟 Part 2 的 Part 3 与之同一块
+def render(topics):
+    blocks = []
+    for topic in topics:
+        lines = []
+        if not topic.follows_part2:
+            keyword = topic.keyword or (cue_keyword(topic.cue) if topic.part == 2 else "")
+            if keyword:
+                lines.append(keyword)
+        lines.append(f"Part {topic.part}")
+        if topic.part == 2:
+            lines.append(topic.cue)
+            lines.append("You should say:")
+            lines.extend("- " + bullet for bullet in topic.bullets)
+        lines.extend(f"{i}. {question}" for i, question in enumerate(topic.questions, 1))
+        if topic.follows_part2 and blocks:
+            blocks[-1] += "\n" + "\n".join(lines)
+        else:
+            blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def structure_locally(ocr_text):
+    text = compact_ocr(extract_clean_parts(ocr_text))
+    topics, stray = parse_ocr(text.splitlines())
+    confidence, issues = score(topics, stray)
+    return LocalResult(render(topics) if topics else "", confidence, issues)
+
+
+# 整个进程共用的统计（S2 的 run() 开始时清零），每页的结果同时写进运行记录（"local" 条目）
+class LocalStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.local = 0
+            self.fallback = 0
+
+    def record(self, image, confidence, used):
+        with self.lock:
+            if used:
+                self.local += 1
+            else:
+                self.fallback += 1
+        perf.record("local", image=image, confidence=confidence, used=used)
+
+    def summary(self):
+        with self.lock:
+            total = self.local + self.fallback
+            if not total:
+                return "本地结构化：未启用"
+            return f"本地结构化：{self.local}/{total} 页直接完成，{self.fallback} 页置信度不足交给 Deepseek"
+
+
+stats = LocalStats()
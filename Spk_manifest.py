@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# === 批次清单（manifest）===
+# 记录一个批次里每个工作单元（一张图 / 一个 Part）的输入哈希、状态和输出路径。
+# 重跑时输入哈希没变、状态为 done 且输出文件还在的单元直接跳过，只重试失败或新增的部分。
+# 去重时被合并掉的单元记为 duplicate，并用 duplicate_of 指向保留下来的单元；它所指的单元仍是完成状态时重跑也直接跳过。
+
+DONE = "done"
+FAILED = "failed"
+DUPLICATE = "duplicate"
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path, chunk_size=1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 批次 ID 由全部输入内容的哈希决定：同一批输入重跑时得到同一个 ID，不同批次不会撞名
+def batch_id_for(input_hashes) -> str:
+    return content_hash("\n".join(sorted(input_hashes)))[:12]
+
+
+class Manifest:
+    def __init__(self, path, batch_id=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"batch_id": batch_id, "units": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        if batch_id:
+            self.data["batch_id"] = batch_id
+
+    @property
+    def batch_id(self):
+        return self.data.get("batch_id")
+
+    @property
+    def units(self):
+        return self.data["units"]
+
+    def is_done(self, unit_id, input_hash) -> bool:
+        unit = self.units.get(unit_id)
+        return bool(
+            unit
+            and unit["status"] == DONE
+            and unit["input_hash"] == input_hash
+            and unit.get("output")
+            and os.path.exists(unit["output"])
+        )
+
+    # input_hashes 为本次全部单元的 {单元: 输入哈希}，用来确认被重复的单元还在、内容没变且已完成
+    def is_duplicate(self, unit_id, input_hash, input_hashes) -> bool:
+        unit = self.units.get(unit_id)
+        original = unit.get("duplicate_of") if unit else None
+        return bool(
+            unit
+            and unit["status"] == DUPLICATE
+            and unit["input_hash"] == input_hash
+            and original in input_hashes
+            and self.is_done(original, input_hashes[original])
+        )
+
+    def output_of(self, unit_id):
+        return self.units[unit_id].get("output")
+
+    def mark(self, unit_id, input_hash, status, output=None, error=None, duplicate_of=None):
+        with self.lock:
+            self.units[unit_id] = {
+                "input_hash": input_hash,
+                "status": status,
+                "output": output,
+                "error": error,
+                "duplicate_of": duplicate_of,
+                "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._save()
+
+    def summary(self):
+        statuses = [u["status"] for u in self.units.values()]
+        return (f"批次 {self.batch_id}：共 {len(statuses)} 个，完成 {statuses.count(DONE)} 个，"
+                f"重复 {statuses.count(DUPLICATE)} 个，失败 {statuses.count(FAILED)} 个")
+
+    # 先写临时文件再替换，进程中途被杀也不会留下半个 JSON
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,157 @@
+import os
+import re
+import sys
+import shutil
+import Spk_config as config
+
+# === OCR 引擎 ===
+# pytesseract 每识别一张图都要启动一个 tesseract 进程、重新加载语言数据，再通过临时文件传图和结果，
+# 截图不大时这部分开销比识别本身还多。这里改为在每个 OCR 进程里保留一个初始化好的 Tesseract 句柄
+# （tesserocr 直接调用 libtesseract，语言数据只加载一次），图片在内存里交给引擎。
+# S2 的 OCR 进程池以 init_worker 为 initializer，进程启动时就建好句柄：每个进程一个，整个进程池就是句柄池。
+#
+# 后端由 OCR_BACKEND 指定（环境变量或 spk_config.toml，S2 的 --ocr-backend 优先）：
+#   auto         tesserocr 可用且能加载语言数据时用它，否则退回 pytesseract（默认）
+#   tesserocr    只用 tesserocr
+#   pytesseract  每张图调用一次 tesseract 命令行（原来的做法）
+# tesseract 程序和 tessdata 目录的查找顺序：TESSERACT_CMD / TESSDATA_PREFIX（环境变量或配置文件）
+# → PATH 里的 tesseract、程序旁边的 tessdata → 各系统的常见安装位置（见下面的列表）。
+
+BACKENDS = ("auto", "tesserocr", "pytesseract")
+DEFAULT_LANG = "eng"
+DEFAULT_PSM = 3           # tesseract 命令行不指定 --psm 时的默认值（全自动版面分析）
+
+CMD_CANDIDATES = [
+    "/usr/bin/tesseract",
+    "/usr/local/bin/tesseract",
+    "/opt/homebrew/bin/tesseract",
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+    r"D:\Outlet\tesseract\tesseract.exe",
+]
+TESSDATA_CANDIDATES = [
+    os.path.join(sys.prefix, "share", "tessdata"),      # pip 安装的 tessdata.* 语言包
+    "/usr/share/tesseract-ocr/5/tessdata",
+    "/usr/share/tesseract-ocr/4.00/tessdata",
+    "/usr/share/tessdata",
+    "/usr/local/share/tessdata",
+    "/opt/homebrew/share/tessdata",
+    r"C:\Program Files\Tesseract-OCR\tessdata",
+    r"D:\Outlet\tesseract\tessdata",
+]
+
+_PSM = re.compile(r"--psm\s+(\d+)")
+_DPI = re.compile(r"--dpi\s+(\d+)")
+
+
+class OcrUnavailable(Exception):
+    pass
+
+
+def find_tesseract():
+    configured = config.get("TESSERACT_CMD")
+    for cmd in [configured, shutil.which("tesseract")] + CMD_CANDIDATES:
+        if cmd and (os.path.isfile(cmd) or shutil.which(cmd)):
+            return cmd
+    return None
+
+
+# 含有 lang 全部语言数据（如 "eng+chi_sim"）的第一个 tessdata 目录，找不到时返回 None（使用引擎的默认位置）
+def find_tessdata(lang=DEFAULT_LANG):
+    cmd = find_tesseract()
+    beside_cmd = os.path.join(os.path.dirname(os.path.abspath(cmd)), "tessdata") if cmd and os.path.isfile(cmd) else None
+    for folder in [config.get("TESSDATA_PREFIX"), beside_cmd] + TESSDATA_CANDIDATES:
+        if folder and all(os.path.isfile(os.path.join(folder, f"{name}.traineddata")) for name in lang.split("+")):
+            return folder
+    return None
+
+
+# 从 pytesseract 的 config 字符串（Spk_ocr_preprocess.preprocess 返回的 "--psm 6 --dpi 300"）里取 psm 和 dpi
+def parse_config(tess_config):
+    psm, dpi = _PSM.search(tess_config or ""), _DPI.search(tess_config or "")
+    return int(psm.group(1)) if psm else DEFAULT_PSM, int(dpi.group(1)) if dpi else 0
+
+
+class TesserocrEngine:
+    name = "tesserocr"
+
+    def __init__(self, lang=DEFAULT_LANG, tessdata=None):
+        import tesserocr
+        options = {"path": os.path.join(tessdata, "")} if tessdata else {}
+        self.api = tesserocr.PyTessBaseAPI(lang=lang, **options)
+
+    # 句柄在多张图之间复用，psm 和 dpi 每次都重新设置，识别结果用完即清掉
+    def recognize(self, image, tess_config=""):
+        psm, dpi = parse_config(tess_config)
+        self.api.SetPageSegMode(psm)
+        self.api.SetVariable("user_defined_dpi", str(dpi))
+        self.api.SetImage(image)
+        try:
+            return self.api.GetUTF8Text()
+        finally:
+            self.api.Clear()
+
+    def close(self):
+        self.api.End()
+
+
+class PytesseractEngine:
+    name = "pytesseract"
+
+    def __init__(self, lang=DEFAULT_LANG, cmd=None, tessdata=None):
+        import pytesseract
+        if cmd:
+            pytesseract.pytesseract.tesseract_cmd = cmd
+        if tessdata:
+            os.environ["TESSDATA_PREFIX"] = tessdata
+        self.pytesseract = pytesseract
+        self.lang = lang
+
+    def recognize(self, image, tess_config=""):
+        return self.pytesseract.image_to_string(image, lang=self.lang, config=tess_config)
+
+    def close(self):
+        pass
+
+
+def create_engine(backend=None, lang=None):
+    backend = backend or config.get("OCR_BACKEND", "auto")
+    lang = lang or config.get("OCR_LANG", DEFAULT_LANG)
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的 OCR 后端：{backend}（可选 {'、'.join(BACKENDS)}）")
+    tessdata = find_tessdata(lang)
+    errors = []
+    if backend in ("auto", "tesserocr"):
+        try:
+            return TesserocrEngine(lang, tessdata)
+        except (ImportError, RuntimeError) as e:
+            errors.append(f"tesserocr 不可用（{e}）")
+    if backend in ("auto", "pytesseract"):
+        cmd = find_tesseract()
+        if cmd:
+            return PytesseractEngine(lang, cmd, tessdata)
+        errors.append("找不到 tesseract 程序")
+    raise OcrUnavailable("没有可用的 OCR 引擎：" + "；".join(errors)
+                         + "。请安装 tesserocr，或安装 tesseract 后用 TESSERACT_CMD 指定路径")
+
+
+# === 每个 OCR 进程一个引擎 ===
+_engine = None
+_backend = None
+
+
+# 进程池的 initializer：进程启动时建好引擎。失败时不抛出（否则整个进程池不可用），
+# 留到识别时由 get_engine 报错，错误信息会出现在每张图的 "OCR 失败" 里
+def init_worker(backend=None):
+    global _backend
+    _backend = backend
+    try:
+        get_engine()
+    except Exception:
+        pass
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(_backend)
+    return _engine
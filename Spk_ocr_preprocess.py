@@ -0,0 +1,119 @@
+import numpy as np
+from PIL import Image
+
+# === OCR 前的图像预处理 ===
+# 手机截图分辨率高、带状态栏和导航栏，直接交给 Tesseract 既慢又容易识别出杂字。
+# 这里依次做：缩放到目标 DPI → 灰度 → Otsu 二值化 → 裁掉系统栏并只保留文字区域 → 选择 --psm。
+# 灰度、阈值和投影统计都直接在 NumPy 数组上完成。
+
+TARGET_DPI = 300
+ASSUMED_SOURCE_DPI = 450   # 截图没有 DPI 信息时，按常见手机屏幕密度估算
+SYSTEM_BAR_RATIO = 0.045   # 竖屏截图顶部 / 底部系统栏约占的高度比例
+SOLID_ROW_RATIO = 0.6      # 一行里超过该比例是"墨迹"时，视为色块（标题栏、按钮）而非文字
+INK_ROW_RATIO = 0.002      # 一行里至少有这么多墨迹才算有文字
+ROI_MARGIN = 12            # 裁剪文字区域时四周保留的像素
+GUTTER_RATIO = 0.06        # 中间空白列宽超过该比例时视为多栏排版
+
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+# 按 DPI 缩小（只缩不放）
+def downscale(image, target_dpi=TARGET_DPI):
+    source_dpi = image.info.get("dpi", (ASSUMED_SOURCE_DPI,))[0] or ASSUMED_SOURCE_DPI
+    scale = target_dpi / float(source_dpi)
+    if scale >= 1:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.LANCZOS)
+
+
+def to_gray(image) -> np.ndarray:
+    rgb = np.asarray(image.convert("RGB"), dtype=np.float32)
+    return rgb @ _LUMA
+
+
+# Otsu 阈值：用直方图一次算出所有候选阈值的类间方差
+def otsu_threshold(gray: np.ndarray) -> int:
+    hist = np.bincount(gray.astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(variance))
+
+
+# 返回墨迹掩码（True 表示文字像素），深色模式截图会自动反相
+def binarize(gray: np.ndarray) -> np.ndarray:
+    threshold = otsu_threshold(gray)
+    ink = gray < threshold
+    if ink.mean() > 0.5:
+        ink = ~ink
+    return ink
+
+
+# 找到文字所在的矩形区域：去掉系统栏和整行色块，再按行列投影取包围盒
+def text_region(ink: np.ndarray):
+    height, width = ink.shape
+    row_ratio = ink.mean(axis=1)
+    usable = row_ratio < SOLID_ROW_RATIO
+    if height > width * 1.6:
+        bar = int(height * SYSTEM_BAR_RATIO)
+        usable[:bar] = False
+        usable[height - bar:] = False
+
+    rows = np.flatnonzero(usable & (row_ratio > INK_ROW_RATIO))
+    if rows.size == 0:
+        return 0, 0, width, height
+    top, bottom = rows[0], rows[-1] + 1
+
+    col_ratio = ink[top:bottom][usable[top:bottom]].mean(axis=0)
+    cols = np.flatnonzero(col_ratio > 0)
+    if cols.size == 0:
+        return 0, 0, width, height
+    left, right = cols[0], cols[-1] + 1
+
+    return (
+        max(0, left - ROI_MARGIN),
+        max(0, top - ROI_MARGIN),
+        min(width, right + ROI_MARGIN),
+        min(height, bottom + ROI_MARGIN),
+    )
+
+
+# 根据版面选择 Tesseract 的页面分割模式
+def choose_psm(ink: np.ndarray) -> int:
+    height, width = ink.shape
+    row_has_ink = ink.mean(axis=1) > INK_ROW_RATIO
+    # 行投影的上升沿个数即文字行数
+    lines = int(np.count_nonzero(row_has_ink[1:] & ~row_has_ink[:-1]) + row_has_ink[0])
+    if lines <= 1:
+        return 7  # 单行文字
+    if _widest_gutter(~ink.any(axis=0)) > width * GUTTER_RATIO:
+        return 3  # 多栏，交给自动版面分析
+    return 6  # 单个均匀文字块（题目列表的典型情况）
+
+
+# 两侧都有文字的最宽空白列段（左右页边距不算）
+def _widest_gutter(col_empty: np.ndarray) -> int:
+    padded = np.concatenate(([0], col_empty.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[::2], edges[1::2]
+    inner = (starts > 0) & (ends < col_empty.size)
+    if not inner.any():
+        return 0
+    return int((ends[inner] - starts[inner]).max())
+
+
+# 完整预处理，返回 (二值化后的 PIL 图, pytesseract config 字符串)
+def preprocess(image, target_dpi=TARGET_DPI):
+    image = downscale(image, target_dpi)
+    ink = binarize(to_gray(image))
+    left, top, right, bottom = text_region(ink)
+    ink = ink[top:bottom, left:right]
+    psm = choose_psm(ink)
+    # Tesseract 期望白底黑字
+    processed = Image.fromarray(np.where(ink, 0, 255).astype(np.uint8))
+    return processed, f"--psm {psm} --dpi {target_dpi}"
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:   # Windows 没有 resource 模块，CPU / 内存改用 time.process_time 和采样
+    resource = None
+
+# === 性能记录 ===
+# 流水线每次运行创建一个 RunRecorder：每个步骤记录墙钟时间、CPU 时间（含 OCR 子进程）和内存峰值，
+# 步骤内部通过 record() 上报单张图的 OCR 耗时、每次 LLM 调用的延迟 / token 用量 / 重试次数。
+# 运行结束后整次运行追加为 JSONL 的一行。
+#
+# 同一进程同时只有一个流水线在跑（见 Spk_jobs），所以当前记录器放在模块全局变量里，
+# 步骤里开的线程上报的数据也能归到当前步骤。没有活动记录器时 record() 什么都不做。
+
+RSS_SAMPLE_INTERVAL = 0.05
+PROFILERS = ("cprofile", "pyinstrument")
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def _rusage():
+    if resource is None:
+        return time.process_time(), 0.0
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+# 当前进程常驻内存（MB）；Linux 读 /proc，其他系统退回 ru_maxrss
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / 1024 / 1024 if os.uname().sysname == "Darwin" else maxrss / 1024
+    return 0.0
+
+
+# 后台线程定时采样 RSS，得到单个步骤内的峰值（ru_maxrss 是整个进程生命周期的峰值，无法按步骤区分）
+class _RssSampler:
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class RunRecorder:
+    def __init__(self, log_path=None, profile=None, profile_dir=None):
+        self.run_id = time.strftime("%Y%m%d-%H%M%S-") + os.urandom(3).hex()   # 不用 uuid：它会导入 platform
+        self.log_path = log_path
+        self.profile = profile or {}           # {"Step 3": "cprofile" 或 "pyinstrument"}
+        self.profile_dir = profile_dir or (os.path.dirname(log_path) if log_path else ".")
+        self.started = time.time()
+        self.stages = []
+        self.active = None
+        self.lock = threading.Lock()
+
+    # 记录单个步骤；步骤内 record() 上报的事件归到这个步骤
+    @contextmanager
+    def stage(self, name):
+        entry = {"step": name, "ocr": [], "llm": []}
+        with self.lock:
+            self.active = entry
+        cpu_start, child_cpu_start = _rusage()
+        start = time.perf_counter()
+        try:
+            with _RssSampler() as sampler, self._profiled(name, entry):
+                yield entry
+        finally:
+            cpu_end, child_cpu_end = _rusage()
+            entry["wall_s"] = round(time.perf_counter() - start, 3)
+            entry["cpu_s"] = round(cpu_end - cpu_start, 3)
+            entry["child_cpu_s"] = round(child_cpu_end - child_cpu_start, 3)
+            entry["peak_rss_mb"] = round(sampler.peak, 1)
+            with self.lock:
+                self.active = None
+                self.stages.append(entry)
+
+    # 可选：对某个步骤做 cProfile / pyinstrument 分析，结果写到 profile_dir，路径记在 entry["profile"]
+    @contextmanager
+    def _profiled(self, name, entry):
+        kind = self.profile.get(name)
+        if kind not in PROFILERS:
+            yield
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, f"{self.run_id}_{name.replace(' ', '')}")
+        if kind == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                entry["profile_note"] = "未安装 pyinstrument，改用 cProfile"
+            else:
+                profiler = Profiler()
+                profiler.start()
+                try:
+                    yield
+                finally:
+                    profiler.stop()
+                    with open(base + ".html", "w", encoding="utf-8") as f:
+                        f.write(profiler.output_html())
+                    entry["profile"] = base + ".html"
+                return
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(base + ".prof")   # 用 snakeviz / pstats 查看
+            entry["profile"] = base + ".prof"
+
+    def record(self, kind, **fields):
+        with self.lock:
+            if self.active is not None:
+                self.active.setdefault(kind, []).append(fields)
+
+    # 单个步骤的汇总，供界面表格显示
+    @staticmethod
+    def stage_summary(entry):
+        ocr = [e["seconds"] for e in entry.get("ocr", [])]
+        llm = entry.get("llm", [])
+        latencies = [e["seconds"] for e in llm]
+        return {
+            "wall_s": entry["wall_s"],
+            "cpu_s": round(entry["cpu_s"] + entry["child_cpu_s"], 2),
+            "peak_rss_mb": entry["peak_rss_mb"],
+            "ocr_images": len(ocr),
+            "ocr_avg_s": round(sum(ocr) / len(ocr), 2) if ocr else 0.0,
+            "llm_calls": len(llm),
+            "llm_p50_s": round(_percentile(latencies, 0.5), 2),
+            "llm_p95_s": round(_percentile(latencies, 0.95), 2),
+            "prompt_tokens": sum(e.get("prompt_tokens") or 0 for e in llm),
+            "completion_tokens": sum(e.get("completion_tokens") or 0 for e in llm),
+            "retries": sum(e.get("retries", 0) for e in llm),
+            "input_tokens_saved": sum(e.get("input_saved", 0) for e in entry.get("budget", [])),
+            "output_tokens": sum(e.get("output_tokens", 0) for e in entry.get("budget", [])),
+            "max_tokens_reserved": sum(e.get("max_tokens", 0) for e in entry.get("budget", [])),
+            "local_structured": sum(1 for e in entry.get("local", []) if e.get("used")),
+            "reused": len(entry.get("reuse", [])),
+            "profile": entry.get("profile"),
+        }
+
+    def to_dict(self):
+        with self.lock:
+            stages = list(self.stages)
+        return {
+            "run_id": self.run_id,
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "wall_s": round(time.time() - self.started, 3),
+            "stages": [dict(entry, summary=self.stage_summary(entry)) for entry in stages],
+        }
+
+    def write(self):
+        if not self.log_path:
+            return None
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+        return self.log_path
+
+
+# === 当前记录器 ===
+@contextmanager
+def recording(recorder):
+    global _current
+    with _current_lock:
+        previous, _current = _current, recorder
+    try:
+        yield recorder
+    finally:
+        with _current_lock:
+            _current = previous
+
+
+def record(kind, **fields):
+    recorder = _current
+    if recorder is not None:
+        recorder.record(kind, **fields)
+
+
+def read_runs(log_path, limit=20):
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, "r", encoding="utf-8") as f:
+        lines = f.readlines()[-limit:]
+    return [json.loads(line) for line in lines if line.strip()]
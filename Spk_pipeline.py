@@ -0,0 +1,145 @@
+import io
+import os
+import time
+import importlib
+import threading
+from Spk_topic_parser import parse_topics
+import Spk_perf as perf
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+
+# === 进程内流水线 ===
+# 五个步骤都以模块函数的形式在同一个进程里运行，不再为每一步启动新的 python 解释器。
+# 步骤之间通过 context 字典在内存中传递结果（合并后的预填文本、解析出的话题记录、生成的答案、按 Part 整理的答案小节），
+# 单独运行某一步时各步骤会退回到读取磁盘上的文件。
+
+STEP_MODULES = {
+    "Step 1": "Spk_S1_Screenshot_Rename",
+    "Step 2": "Spk_S2_Screenshot_to_text",
+    "Step 3": "Spk_S3_Dpsk_Answer_Draft",
+    "Step 4": "Spk_S4_Txt_to_Docx",
+    "Step 5": "Spk_S5_Q&A_Together",
+}
+
+STEP_LABELS = {
+    "Step 1": "重命名截图",
+    "Step 2": "截图转文本",
+    "Step 3": "生成答案",
+    "Step 4": "TXT转Word",
+    "Step 5": "合并Q&A",
+}
+
+
+# 模块名里有 "&"，只能用 importlib 导入；导入一次后由 sys.modules 缓存
+def load_step(step):
+    return importlib.import_module(STEP_MODULES[step])
+
+
+@dataclass
+class StageResult:
+    step: str
+    ok: bool
+    seconds: float
+    log: str = ""
+    error: str = ""
+    perf: dict = field(default_factory=dict)       # Spk_perf 的步骤汇总：CPU、内存峰值、OCR / LLM 统计
+
+
+@dataclass
+class Pipeline:
+    img_dir: str
+    prefill_dir: str
+    answer_dir: str
+    options: dict = field(default_factory=dict)     # 各步骤 run() 的额外参数，如 {"Step 3": {"workers": 8}}
+    context: dict = field(default_factory=dict)
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    on_delta: object = None                          # Step 3 流式输出回调 on_delta(标签, 片段)
+    perf_log: str = None                             # 运行记录 JSONL，默认写在 answer_dir/perf_runs.jsonl
+    profile: dict = field(default_factory=dict)      # 对指定步骤做性能分析，如 {"Step 3": "cprofile"}
+    recorder: perf.RunRecorder = None
+
+    def _step_1(self, module):
+        module.run(self.img_dir, "input", **self.options.get("Step 1", {}))
+
+    def _step_2(self, module):
+        merged_path, merged_text = module.run(self.img_dir, self.prefill_dir, **self.options.get("Step 2", {}))
+        if merged_path:
+            self.context["prefill_path"] = merged_path
+            self.context["prefill_text"] = merged_text
+            self.context["topics"] = parse_topics(merged_text)
+
+    def _step_3(self, module):
+        prefill_topics = None
+        if self.context.get("prefill_path"):
+            prefill_topics = {os.path.basename(self.context["prefill_path"]): self.context["topics"]}
+        self.context["answers"] = module.run(
+            self.prefill_dir, self.answer_dir, prefill_topics=prefill_topics,
+            on_delta=self.on_delta, cancel_event=self.cancel_event, **self.options.get("Step 3", {})
+        )
+
+    def _step_4(self, module):
+        parts_dict, _ = module.run(self.answer_dir, answers=self.context.get("answers"), **self.options.get("Step 4", {}))
+        self.context["answer_parts"] = parts_dict
+
+    def _step_5(self, module):
+        module.run(
+            self.prefill_dir, self.answer_dir,
+            prefill_text=self.context.get("prefill_text"),
+            topics=self.context.get("topics"),
+            answer_parts=self.context.get("answer_parts"),
+            **self.options.get("Step 5", {})
+        )
+
+    def new_recorder(self):
+        log_path = self.perf_log or os.path.join(self.answer_dir, "perf_runs.jsonl")
+        return perf.RunRecorder(log_path, self.profile)
+
+    # 运行单个步骤，捕获其打印输出，并记录耗时、CPU、内存和步骤内的 OCR / LLM 明细
+    def run_step(self, step):
+        if self.recorder is None:
+            self.recorder = self.new_recorder()
+            try:
+                with perf.recording(self.recorder):
+                    return self.run_step(step)
+            finally:
+                self.recorder.write()
+                self.recorder = None
+
+        handler = getattr(self, "_step_" + step.split()[-1])
+        buffer = io.StringIO()
+        start = time.perf_counter()
+        error = ""
+        with self.recorder.stage(step) as entry:
+            try:
+                with redirect_stdout(buffer):
+                    handler(load_step(step))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        return StageResult(step, not error, time.perf_counter() - start, buffer.getvalue(), error,
+                           perf.RunRecorder.stage_summary(entry))
+
+    # 依次运行多个步骤；on_stage(step, result) 在每步开始（result 为 None）和结束时回调，
+    # 某一步失败时停止后续步骤。整次运行追加一行到 perf_log。
+    def run(self, steps=None, on_stage=None, on_delta=None):
+        self.on_delta = on_delta
+        self.cancel_event.clear()
+        results = []
+        self.recorder = self.new_recorder()
+        try:
+            with perf.recording(self.recorder):
+                for step in steps or list(STEP_MODULES):
+                    if on_stage:
+                        on_stage(step, None)
+                    result = self.run_step(step)
+                    results.append(result)
+                    if on_stage:
+                        on_stage(step, result)
+                    if not result.ok or self.cancel_event.is_set():
+                        break
+        finally:
+            self.recorder.write()
+            self.recorder = None
+        return results
+
+    def cancel(self):
+        self.cancel_event.set()
@@ -0,0 +1,126 @@
+import re
+import math
+import threading
+import Spk_perf as perf
+
+# === token 预算 ===
+# S2 / S3 发请求前在本地估算 token 数，并按实际需要压缩请求：
+#   提示词只保留与检测到的 Part 类型有关的小节（S2 的示例、S3 的各 Part 要求）
+#   max_tokens 按 Part 类型和问题数设定，不再一律 3000（输出被截断时由调用方按完整上限重试）
+#   OCR 文本去掉状态栏、乱码等噪声行，超长时按行截断
+# 每次请求记录完整请求与实际请求的输入 token 差，以及响应 usage 里实际生成的 completion_tokens，
+# 汇总打印并写进运行记录（Spk_perf 的 "budget" 条目）。max_tokens 只是输出上限：压缩它少占的是限流器的预留额度，
+# 不等于少生成的 token；输出上的差别要用实际的 completion_tokens 与不压缩（compact=False）的运行比较。
+#
+# token 数按 DeepSeek 文档的经验值估算：英文约 0.3 token / 字符，中文约 0.6 token / 字。
+
+CJK = re.compile(r"[\u4e00-\u9fff]")
+OCR_MAX_TOKENS = 1500            # 一页截图的 OCR 文本上限，正常的题目页远低于此
+PART_RE = re.compile(r"\bPart\s*([123])\b", re.IGNORECASE)
+PART2_HINTS = re.compile(r"you should say|describe an? ", re.IGNORECASE)
+_LETTERS = re.compile(r"[A-Za-z\u4e00-\u9fff]")
+
+# 各 Part 答案的 max_tokens：基础量 + 每个问题的量（Part 2 为一整段独白，按固定值），不超过调用方给的上限
+# Part 1 每题 3~5 句、Part 3 每题 4~6 句，约 60~150 词；这里按 2 倍余量取值
+PART_BASE_TOKENS = {1: 200, 2: 1300, 3: 200}
+PER_QUESTION_TOKENS = {1: 250, 2: 0, 3: 320}
+
+
+def count_tokens(text):
+    cjk = len(CJK.findall(text))
+    return math.ceil(cjk * 0.6 + (len(text) - cjk) * 0.3)
+
+
+# 题目文本里出现的 Part 编号；没有 "Part N" 标题但像 Part 2 题卡时算作 Part 2。都没有时返回空集合
+def detect_parts(text):
+    parts = {int(n) for n in PART_RE.findall(text)}
+    if not parts and PART2_HINTS.search(text):
+        parts.add(2)
+    return parts
+
+
+# 按标记把提示词切成小节：返回 [第一个标记之前, 第一个标记起, ...]，拼回去与原提示词完全相同
+def split_sections(prompt, markers):
+    cuts = [0] + [prompt.index(marker) for marker in markers] + [len(prompt)]
+    return [prompt[a:b] for a, b in zip(cuts, cuts[1:])]
+
+
+def max_tokens_for(part, questions, cap):
+    if part not in PART_BASE_TOKENS:
+        return cap
+    return min(cap, PART_BASE_TOKENS[part] + PER_QUESTION_TOKENS[part] * max(1, questions))
+
+
+# 去掉 OCR 噪声：空白压缩、连续重复行、字母 / 汉字不足 3 个或不到一半的行（状态栏时间、电量、页码、
+# 框线识别出的符号串等），最后按行截断到 max_tokens
+def compact_ocr(text, max_tokens=OCR_MAX_TOKENS):
+    lines, previous, used = [], None, 0
+    for raw in text.splitlines():
+        line = " ".join(raw.split())
+        if not line or line == previous:
+            continue
+        letters = len(_LETTERS.findall(line))
+        if letters < 3 or letters * 2 < len(line.replace(" ", "")):
+            continue
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        previous, used = line, used + cost
+    return "\n".join(lines)
+
+
+# 整个进程共用的节省统计（S2 / S3 的 run() 开始时清零）；perf.record 同时把每次请求写进当前步骤的运行记录
+class BudgetStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.full_input = 0
+            self.sent_input = 0
+            self.full_max = 0
+            self.sent_max = 0
+            self.output = 0
+            self.retried = 0
+
+    # full_* 为不压缩时的请求（完整提示词、原始 OCR 文本、固定 max_tokens），sent_* 为实际发送的
+    def record(self, label, full_input, sent_input, full_max, sent_max):
+        with self.lock:
+            self.requests += 1
+            self.full_input += full_input
+            self.sent_input += sent_input
+            self.full_max += full_max
+            self.sent_max += sent_max
+        perf.record("budget", label=label, input_saved=full_input - sent_input, max_tokens=sent_max,
+                    reserved_saved=full_max - sent_max)
+
+    # 请求成功后记录响应 usage 里实际生成的 token 数；缓存命中或响应没有 usage 时不记
+    def record_output(self, label, completion_tokens):
+        if completion_tokens is None:
+            return
+        with self.lock:
+            self.output += completion_tokens
+        perf.record("budget", label=label, output_tokens=completion_tokens)
+
+    # 输出达到压缩后的 max_tokens 被截断，按完整上限重新生成
+    def record_retry(self, label):
+        with self.lock:
+            self.retried += 1
+        perf.record("budget", label=label, truncated=True)
+
+    def summary(self):
+        with self.lock:
+            if not self.requests:
+                return "token 预算：没有发出请求"
+            saved = self.full_input - self.sent_input
+            percent = saved / self.full_input * 100 if self.full_input else 0
+            return (f"token 预算：{self.requests} 次请求，输入约 {self.full_input} → {self.sent_input} token"
+                    f"（节省 {saved}，{percent:.0f}%），实际输出 {self.output} token，max_tokens 预留 "
+                    f"{self.full_max} → {self.sent_max}（少占限流额度 {self.full_max - self.sent_max}），"
+                    f"输出被截断后重试 {self.retried} 次")
+
+
+stats = BudgetStats()
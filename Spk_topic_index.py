@@ -0,0 +1,186 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+from itertools import chain
+import numpy as np
+
+# === 跨批次的话题索引 ===
+# 同样的雅思话题每季都会反复出现。这里把生成过的答案（S3）和结构化结果（S2）按题目文本存进本地 SQLite，
+# 新批次先查索引，找到几乎相同的题目就直接复用，不再调用 API。
+#
+# 相似度：题目文本规范化后取词级 3-shingle，用 MinHash（64 个哈希函数）估计 Jaccard 相似度。
+# 查找：MinHash 签名切成 16 段 × 4 行做 LSH 分桶，只和同桶的候选比较，
+# 候选的签名放在一个 NumPy 数组里一次算完相似度；几万条记录时单次查找仍在亚毫秒级。
+# 常见句式（如 "do you like ..."）会让个别桶变得很大，这种桶像停用词一样跳过：
+# 几乎相同的题目有很多段相同，总能在其他小桶里碰上。
+# 签名在打开索引时从 SQLite 读进内存，答案正文只在命中时按 id 读取。
+#
+# kind 区分用途和提示词版本（如 "answer:<提示词哈希>"），修改提示词后旧答案不会被复用；
+# part 必须相同才算匹配（S2 的结构化结果统一用 0）。
+# exact=True 时只接受规范化后完全相同的题目（S3 的答案：只差一个词的问题，如 early / late，答案也不能通用），
+# MinHash 只用来快速找到候选。
+
+DEFAULT_INDEX_PATH = os.path.join(".llm_cache", "topic_index.sqlite")
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.85
+MAX_BUCKET = 256
+_PRIME = np.uint64(4294967311)        # 大于 2^32 的素数
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 2 ** 32, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 32, NUM_PERM, dtype=np.uint64)
+
+_NUMBERING = re.compile(r"^\s*(?:\d+[.)、]|[-•*])\s*", re.MULTILINE)
+_NON_WORD = re.compile(r"[^0-9a-z一-龥]+")
+
+
+# 小写、去掉行首编号和项目符号、标点统一成空格
+def normalize(text):
+    return " ".join(_NON_WORD.sub(" ", _NUMBERING.sub("", text.lower())).split())
+
+
+def shingles(norm):
+    words = norm.split()
+    if len(words) <= SHINGLE_SIZE:
+        return {norm} if norm else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+# MinHash 签名：每个 shingle 先用 crc32 映射成整数，再用 NUM_PERM 个 (a*x+b) mod p 取最小值
+def minhash(norm):
+    items = shingles(norm)
+    if not items:
+        return np.zeros(NUM_PERM, dtype=np.uint32)
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in items), dtype=np.uint64, count=len(items))
+    hashed = (np.outer(x, _A) + _B) % _PRIME
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+def _band_keys(signature):
+    return [bytes([b]) + signature[b * ROWS:(b + 1) * ROWS].tobytes() for b in range(BANDS)]
+
+
+class TopicIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, threshold=DEFAULT_THRESHOLD, enabled=True):
+        self.path = path
+        self.threshold = threshold
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.added = 0
+        self.lock = threading.Lock()
+        self.conn = None
+        self.signatures = np.zeros((0, NUM_PERM), dtype=np.uint32)
+        self.size = 0
+        self.ids = []            # 行号 → SQLite id
+        self.group_codes = {}    # (kind, part) → 编号
+        self.group_of = np.zeros(0, dtype=np.int32)   # 行号 → (kind, part) 的编号
+        self.rows = {}           # SQLite id → 行号
+        self.buckets = {}        # LSH 分桶键 → [行号]
+        if enabled:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS topics ("
+                "id INTEGER PRIMARY KEY, kind TEXT NOT NULL, part INTEGER NOT NULL, norm TEXT NOT NULL, "
+                "signature BLOB NOT NULL, content TEXT NOT NULL, source TEXT, created REAL NOT NULL, "
+                "UNIQUE (kind, part, norm))"
+            )
+            self.conn.commit()
+            self._load()
+
+    def _load(self):
+        rows = self.conn.execute("SELECT id, kind, part, signature FROM topics ORDER BY id").fetchall()
+        self.signatures = np.zeros((max(len(rows), 1024), NUM_PERM), dtype=np.uint32)
+        self.group_of = np.zeros(len(self.signatures), dtype=np.int32)
+        for topic_id, kind, part, signature in rows:
+            self._append(topic_id, kind, part, np.frombuffer(signature, dtype=np.uint32))
+
+    def _append(self, topic_id, kind, part, signature):
+        if self.size == len(self.signatures):
+            grown = np.zeros((max(len(self.signatures) * 2, 1024), NUM_PERM), dtype=np.uint32)
+            grown[:self.size] = self.signatures[:self.size]
+            self.signatures = grown
+            self.group_of = np.resize(self.group_of, len(grown))
+        row = self.size
+        self.signatures[row] = signature
+        self.group_of[row] = self.group_codes.setdefault((kind, part), len(self.group_codes))
+        self.size += 1
+        self.ids.append(topic_id)
+        self.rows[topic_id] = row
+        for key in _band_keys(signature):
+            self.buckets.setdefault(key, []).append(row)
+
+    # 返回 (相似度, SQLite id)；没有达到阈值的候选时返回 None。只查内存，不读 SQLite
+    def nearest(self, kind, part, text):
+        code = self.group_codes.get((kind, part))
+        if code is None:
+            return None
+        signature = minhash(normalize(text))
+        buckets = [self.buckets[key] for key in _band_keys(signature) if key in self.buckets]
+        if not buckets:
+            return None
+        small = [bucket for bucket in buckets if len(bucket) <= MAX_BUCKET] or [min(buckets, key=len)]
+        rows = np.unique(np.fromiter(chain.from_iterable(small), dtype=np.int64))
+        rows = rows[self.group_of[rows] == code]
+        if not len(rows):
+            return None
+        similarity = (self.signatures[rows] == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.threshold:
+            return None
+        return float(similarity[best]), self.ids[rows[best]]
+
+    # 查找几乎相同的题目，命中时返回 (内容, 相似度, 来源)，否则返回 None
+    def lookup(self, kind, part, text, exact=False):
+        if not self.enabled:
+            return None
+        with self.lock:
+            match = self.nearest(kind, part, text)
+            if match is None:
+                self.misses += 1
+                return None
+            similarity, topic_id = match
+            content, source, norm = self.conn.execute(
+                "SELECT content, source, norm FROM topics WHERE id = ?", (topic_id,)).fetchone()
+            if exact and norm != normalize(text):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return content, similarity, source
+
+    # 同一题目（规范化后完全相同）再次写入时更新内容
+    def add(self, kind, part, text, content, source=None):
+        if not self.enabled or not content:
+            return
+        norm = normalize(text)
+        signature = minhash(norm)
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO topics (kind, part, norm, signature, content, source, created) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, part, norm) DO UPDATE SET content = excluded.content, source = excluded.source, "
+                "created = excluded.created",
+                (kind, part, norm, signature.tobytes(), content, source, time.time()),
+            )
+            self.conn.commit()
+            topic_id = self.conn.execute(
+                "SELECT id FROM topics WHERE kind = ? AND part = ? AND norm = ?", (kind, part, norm)).fetchone()[0]
+            if topic_id not in self.rows:
+                self._append(topic_id, kind, part, signature)
+            self.added += 1
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def summary(self):
+        if not self.enabled:
+            return "话题索引已关闭"
+        return f"话题索引：{self.size} 条记录，复用 {self.hits} 次，未命中 {self.misses} 次，新增 {self.added} 条"
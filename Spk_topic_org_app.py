@@ -1,74 +1,228 @@
 import streamlit as st
-import subprocess
 import os
-import shutil
-
-# === 脚本路径映射 ===
-SCRIPT_MAP = {
-    "Step 1": "Spk_S1_Screenshot_Rename.py",
-    "Step 2": "Spk_S2_Screenshot_to_text.py",
-    "Step 3": "Spk_S3_Dpsk_Answer_Draft.py",
-    "Step 4": "Spk_S4_Txt_to_Docx.py",
-    "Step 5": "Spk_S5_Q&A_Together.py"
-}
+import json
+import time
+import hashlib
+from Spk_pipeline import STEP_LABELS
+from Spk_S1_Screenshot_Rename import ingest_image, import_zip, list_images, rename_screenshots
+from Spk_jobs import (JobQueue, WorkerPool, new_workspace, workspace_dirs,
+                      QUEUED, RUNNING, DONE, FAILED, CANCELLED, FINISHED)
 
 # === 页面初始化 ===
 st.set_page_config(page_title="雅思口语全流程工具", layout="wide")
 st.title("📘 雅思口语批处理工具 Demo")
 
+STATUS_LABELS = {QUEUED: "⏳ 排队中", RUNNING: "🔄 运行中", DONE: "✅ 完成", FAILED: "❌ 失败", CANCELLED: "⏹ 已取消"}
+RESULT_FILES = ["汇总口语答案_标题.docx", "汇总口语答案.docx", "预填内容.docx"]
+EXPORT_FILES = ["汇总口语答案_标题.xlsx", "汇总口语答案_标题.md", "汇总口语答案_标题.json"]   # Step 5 的其他导出格式
+
+
+# === 任务队列和后台工作进程：整个 Streamlit 服务共用一份 ===
+@st.cache_resource
+def get_queue():
+    return JobQueue()
+
+
+# 设置 SPK_EXTERNAL_WORKERS=1 时由单独运行的 `python Spk_jobs.py` 处理任务
+@st.cache_resource
+def get_worker_pool():
+    if os.environ.get("SPK_EXTERNAL_WORKERS"):
+        return None
+    return WorkerPool().start()
+
+
+queue = get_queue()
+pool = get_worker_pool()
+if pool is not None:
+    pool.ensure_alive()
+
+# 每个浏览器会话有自己的工作区和任务列表
+st.session_state.setdefault("workspace", None)
+st.session_state.setdefault("saved_uploads", {})     # 内容哈希 → 已保存的上传文件名
+st.session_state.setdefault("upload_hashes", {})     # 上传控件的 file_id → 内容哈希，重跑时不再重新计算
+st.session_state.setdefault("image_count", 0)
+st.session_state.setdefault("pdf_count", 0)
+st.session_state.setdefault("job_ids", [])
+
 # === 上传图片 ===
 st.subheader("🖼️ Step 1：上传截图图片")
-uploaded_files = st.file_uploader("上传截图（可多选）", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
+uploaded_files = st.file_uploader("上传截图、PDF 或 zip 压缩包（可多选）", type=["jpg", "jpeg", "png", "pdf", "zip"],
+                                  accept_multiple_files=True)
 
-TEMP_IMG_DIR = "uploaded_imgs"
-TXT_PREFILL_DIR = "txt_prefill"
-ANSWER_DIR = "answer_output"
-DOCX_PATH = os.path.join(ANSWER_DIR, "汇总口语答案.docx")
+# 上传的文件在页面每次刷新时都会重新传进来。按内容哈希记录已保存的文件，刷新时不再写盘，
+# 新加的文件追加到当前工作区；有文件被移除时换一个新工作区（旧工作区可能正被任务使用）。
+# getvalue() 直接拿 Streamlit 持有的 bytes，不会像 getbuffer() 那样复制一份；
+# 写盘分块进行，过大的图片在导入时缩小（见 Spk_S1_Screenshot_Rename.ingest_image）。
+def upload_hash(file):
+    hashes = st.session_state.upload_hashes
+    if file.file_id not in hashes:
+        hashes[file.file_id] = hashlib.sha256(file.getvalue()).hexdigest()
+    return hashes[file.file_id]
 
-os.makedirs(TEMP_IMG_DIR, exist_ok=True)
-os.makedirs(TXT_PREFILL_DIR, exist_ok=True)
-os.makedirs(ANSWER_DIR, exist_ok=True)
 
-if uploaded_files:
-    for i, file in enumerate(uploaded_files):
-        ext = os.path.splitext(file.name)[-1]
-        save_path = os.path.join(TEMP_IMG_DIR, f"input_{i+1}{ext}")
-        with open(save_path, "wb") as f:
-            f.write(file.read())
-    st.success(f"✅ 已保存 {len(uploaded_files)} 张图片到 {TEMP_IMG_DIR} 文件夹")
-
-# === 执行函数 ===
-def run_step(label, script_path, args_list):
-    with st.status(f"{label} 执行中...", expanded=True) as status:
-        try:
-            result = subprocess.run(["python", script_path] + args_list, capture_output=True, text=True)
-            st.code(result.stdout)
-            if result.stderr:
-                st.error(result.stderr)
+def save_uploads(files):
+    current = {upload_hash(file): file for file in files}
+    saved = st.session_state.saved_uploads
+    if st.session_state.workspace is None or not saved.keys() <= current.keys():
+        st.session_state.workspace = new_workspace()
+        saved.clear()
+    new = [(digest, file) for digest, file in current.items() if digest not in saved]
+    if not new:
+        return
+    img_dir, _, _ = workspace_dirs(st.session_state.workspace)
+    archives = False
+    with st.spinner(f"正在保存 {len(new)} 个新上传的文件…"):
+        for digest, file in new:
+            file.seek(0)
+            if file.name.lower().endswith(".zip"):
+                # zip 逐个成员流式导入，之后统一编号成 input_N
+                import_zip(file, img_dir)
+                saved[digest] = file.name
+                archives = True
+            elif file.name.lower().endswith(".pdf"):
+                # PDF 原样保存，Step 2 按页渲染
+                saved[digest], _ = ingest_image(file, img_dir, os.path.basename(file.name), max_side=0)
             else:
-                status.update(label=f"{label} ✅ 成功", state="complete")
-        except Exception as e:
-            st.error(f"❌ 执行失败: {e}")
+                ext = os.path.splitext(file.name)[-1]
+                saved[digest], _ = ingest_image(file, img_dir, f"input_{len(saved) + 1}{ext}")
+        if archives:
+            rename_screenshots(img_dir, "input")
+    st.session_state.image_count = len(list_images(img_dir))
+    st.session_state.pdf_count = sum(name.lower().endswith(".pdf") for name in saved.values())
+
+
+if uploaded_files:
+    save_uploads(uploaded_files)
+    pdfs = f"、{st.session_state.pdf_count} 个 PDF" if st.session_state.pdf_count else ""
+    st.success(f"✅ 已保存 {st.session_state.image_count} 张图片{pdfs}到任务工作区 {st.session_state.workspace}")
+
+
+# === 侧边栏：可选对某个步骤做性能分析（结果文件写在任务的答案文件夹里）===
+with st.sidebar:
+    profile_step = st.selectbox("性能分析步骤", ["不分析"] + list(STEP_LABELS))
+    profiler = st.radio("分析工具", ["cprofile", "pyinstrument"], horizontal=True)
+    # 与 Spk_S3_Dpsk_Answer_Draft.BATCH_SIZE 相同（页面不导入步骤模块）
+    batch_answers = st.checkbox("Step 3 合并请求", help="每 4 组 Part 1、每对 Part 2/3 合成一次请求，省 token 和请求数；"
+                                                    "但合并的请求不是流式的，要等整组生成完才会显示答案")
+
+
+def submit(steps):
+    if st.session_state.workspace is None:
+        st.warning("请先上传截图")
+        return
+    options = {"profile": {profile_step: profiler}} if profile_step in STEP_LABELS else {}
+    if batch_answers:
+        options["Step 3"] = {"batch_size": 4}
+    job_id = queue.submit(st.session_state.workspace, steps, options)
+    st.session_state.job_ids.append(job_id)
+
+
+# === 操作按钮：只负责把任务放进队列，执行在后台工作进程里 ===
+run_col, stop_col = st.columns([3, 1])
+with run_col:
+    if st.button("▶️ 一键运行全部步骤", type="primary"):
+        submit(None)
+with stop_col:
+    if st.button("⏹ 停止当前任务"):
+        for job in queue.list(st.session_state.job_ids):
+            if job["status"] not in FINISHED:
+                queue.cancel(job["id"])
 
-# === 操作按钮 ===
 col1, col2 = st.columns(2)
 
 with col1:
     if st.button("Step 1: 重命名截图"):
-        run_step("Step 1", SCRIPT_MAP["Step 1"], ["--input", TEMP_IMG_DIR, "--prefix", "input"])
+        submit(["Step 1"])
 
     if st.button("Step 3: 生成答案"):
-        run_step("Step 3", SCRIPT_MAP["Step 3"], ["--input", TXT_PREFILL_DIR, "--output", ANSWER_DIR])
+        submit(["Step 3"])
 
     if st.button("Step 5: 合并Q&A"):
-        run_step("Step 5", SCRIPT_MAP["Step 5"], ["--input", TXT_PREFILL_DIR, "--output", ANSWER_DIR])
+        submit(["Step 5"])
 
 with col2:
     if st.button("Step 2: 截图转文本"):
-        run_step("Step 2", SCRIPT_MAP["Step 2"], ["--input", TEMP_IMG_DIR, "--output", TXT_PREFILL_DIR])
+        submit(["Step 2"])
 
     if st.button("Step 4: TXT转Word"):
-        run_step("Step 4", SCRIPT_MAP["Step 4"], ["--input", ANSWER_DIR, "--output", DOCX_PATH])
+        submit(["Step 4"])
+
+
+# === 任务状态：每 2 秒轮询一次队列，只刷新这一块 ===
+# 每个步骤一行：耗时、CPU（含 OCR 子进程）、内存峰值、OCR 与 LLM 统计（来自 Spk_perf）
+def stage_row(stage):
+    perf = stage.get("perf") or {}
+    row = {"步骤": f"{stage['step']}: {STEP_LABELS[stage['step']]}", "耗时(秒)": stage["seconds"],
+           "结果": "成功" if stage["ok"] else "失败"}
+    if perf:
+        row.update({
+            "CPU(秒)": perf["cpu_s"],
+            "内存峰值(MB)": perf["peak_rss_mb"],
+            "OCR 图片数": perf["ocr_images"],
+            "OCR 平均(秒)": perf["ocr_avg_s"],
+            "LLM 调用": perf["llm_calls"],
+            "LLM p50/p95(秒)": f"{perf['llm_p50_s']} / {perf['llm_p95_s']}",
+            "Token(输入/输出)": f"{perf['prompt_tokens']} / {perf['completion_tokens']}",
+            "重试": perf["retries"],
+            "节省输入 Token": perf.get("input_tokens_saved", 0),
+            "输出 Token(实际/预留)": f"{perf.get('output_tokens', 0)} / {perf.get('max_tokens_reserved', 0)}",
+            "本地结构化": perf.get("local_structured", 0),
+            "复用答案": perf.get("reused", 0),
+        })
+    return row
+
+
+def show_job(job):
+    steps = job["steps"] or list(STEP_LABELS)
+    title = "、".join(f"{step}: {STEP_LABELS[step]}" for step in steps) if len(steps) < 5 else "全部步骤"
+    label = f"{STATUS_LABELS[job['status']]} · {title} · 任务 {job['id']}"
+    if job["status"] == RUNNING and job["current_step"]:
+        label += f"（{job['current_step']}: {STEP_LABELS[job['current_step']]}）"
+
+    with st.expander(label, expanded=job["status"] == RUNNING):
+        if job["live"]:
+            live = json.loads(job["live"])
+            st.markdown(f"**{live['label']}**（已收到 {live['parts']} 个 Part 的输出）\n\n{live['text']}")
+        if job["stages"]:
+            st.table([stage_row(stage) for stage in job["stages"]])
+            for stage in job["stages"]:
+                if stage["log"]:
+                    st.caption(stage["step"])
+                    st.code(stage["log"])
+                if stage.get("perf", {}).get("profile"):
+                    st.caption(f"{stage['step']} 性能分析文件：{stage['perf']['profile']}")
+        if job["error"]:
+            st.error(f"❌ 执行失败: {job['error']}")
+        if job["status"] == DONE:
+            _, _, answer_dir = workspace_dirs(job["workspace"])
+            for name in RESULT_FILES:
+                path = os.path.join(answer_dir, name)
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        st.download_button(f"⬇️ 下载 {name}", f.read(), file_name=name, key=f"{job['id']}-{name}")
+                    break
+            for name in EXPORT_FILES:
+                path = os.path.join(answer_dir, name)
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        st.download_button(f"⬇️ 下载 {name}", f.read(), file_name=name, key=f"{job['id']}-{name}")
+
+
+@st.fragment(run_every=2)
+def job_panel():
+    jobs = queue.list(st.session_state.job_ids)
+    if not jobs:
+        st.caption("还没有提交任务")
+        return
+    active = sum(job["status"] not in FINISHED for job in jobs)
+    st.caption(f"共 {len(jobs)} 个任务，{active} 个未完成 · 更新于 {time.strftime('%H:%M:%S')}")
+    for job in jobs:
+        show_job(job)
+
+
+st.divider()
+st.subheader("📋 任务状态")
+job_panel()
 
 st.divider()
 st.caption("© DimitriDai 口语工作流原型 | Powered by Streamlit + Python")
@@ -0,0 +1,147 @@
+import re
+from dataclasses import dataclass, field
+
+# === 预填话题解析（S3 / S4 / S5 共用）===
+# 逐行扫描预填文本，一次遍历得到话题记录：关键词、Part 编号、题干、问题和提示要点。
+# 每行只做常数次匹配，不回溯，大文件也是线性时间；parse_file 逐行读文件，不把整个文件读进内存。
+#
+#   热心的人                       ← 关键词：Part 标题前的最后一行普通文本
+#   Part 2                         ← Part 标题
+#   Describe a person who ...      ← 题干（Part 2 的第一行普通文本）
+#   You should say:
+#   - who this person is           ← 提示要点
+#   Part 3                         ← 紧跟 Part 2 的 Part 3 沿用同一关键词和编号
+#   1. What qualities ...          ← 问题
+
+HEADER = re.compile(r"Part\s*(\d+)(?:\s*[-–]\s*\d+)?\s*[:：]?", re.IGNORECASE)
+QUESTION = re.compile(r"\d+\s*[.)、．]\s*(.+)")
+BULLET = re.compile(r"[-*•·]\s*(.+)")
+SHOULD_SAY = re.compile(r"you should say\s*[:：]?", re.IGNORECASE)
+MARKUP = re.compile(r"\*\*|[#`“”\[\]]")
+
+# 从文件名或标题里取 Part x-y（Part x 视为 Part x-1）
+PART_TITLE = re.compile(r"Part\s*(\d+)(?:-(\d+))?", re.IGNORECASE)
+
+
+@dataclass
+class Topic:
+    keyword: str
+    part: int
+    index: int                                       # 同类 Part 中的序号，即 Part x-y 的 y
+    cue: str = ""                                    # Part 2 题干 "Describe a ..."
+    questions: list = field(default_factory=list)
+    bullets: list = field(default_factory=list)
+    lines: list = field(default_factory=list)        # Part 标题之后的正文行（已清洗）
+
+    @property
+    def title(self):
+        return f"Part {self.part}-{self.index}"
+
+    # 还原成发给模型的题目文本
+    def text(self):
+        head = [self.keyword] if self.keyword else []
+        return "\n".join(head + [f"Part {self.part}"] + self.lines)
+
+
+def part_key(text):
+    match = PART_TITLE.search(text)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2)) if match.group(2) else 1
+
+
+def clean(line):
+    return MARKUP.sub("", line).strip()
+
+
+class _TopicBuilder:
+    def __init__(self):
+        self.current = None
+        self.pending = None          # 还没归属的最后一行普通文本（可能是下一个话题的关键词）
+        self.counters = {}
+        self.block = 0               # Part 2 / Part 3 共用的编号
+
+    def _next_index(self, part, follows_part2):
+        if part in (2, 3):
+            if not follows_part2:
+                self.block += 1
+            return self.block
+        self.counters[part] = self.counters.get(part, 0) + 1
+        return self.counters[part]
+
+    # 处理一行；遇到新的 Part 标题时返回上一个已完成的话题
+    def feed(self, raw):
+        line = clean(raw)
+        if not line:
+            return None
+
+        header = HEADER.fullmatch(line)
+        if header:
+            return self._start(int(header.group(1)))
+
+        topic = self.current
+        if topic is None:
+            self.pending = line
+            return None
+
+        question = QUESTION.fullmatch(line)
+        bullet = BULLET.fullmatch(line)
+        if question:
+            topic.questions.append(question.group(1).strip())
+        elif bullet:
+            topic.bullets.append(bullet.group(1).strip())
+            line = "- " + bullet.group(1).strip()
+        elif SHOULD_SAY.fullmatch(line):
+            pass
+        elif line.endswith(("?", "？")):
+            topic.questions.append(line)
+        else:
+            if topic.part == 2 and not topic.cue:
+                topic.cue = line
+            self.pending = line
+            topic.lines.append(line)
+            return None
+        self.pending = None
+        topic.lines.append(line)
+        return None
+
+    def _start(self, part):
+        finished = self.current
+        follows_part2 = part == 3 and finished is not None and finished.part == 2
+        keyword = ""
+        if follows_part2:
+            keyword = finished.keyword
+        elif self.pending is not None:
+            keyword = self.pending
+            if finished is not None:
+                finished.lines.pop()
+                if finished.cue == keyword:
+                    finished.cue = ""
+        self.pending = None
+        self.current = Topic(keyword, part, self._next_index(part, follows_part2))
+        return finished
+
+    def close(self):
+        finished, self.current = self.current, None
+        return finished
+
+
+# 逐行解析，边读边产出 Topic
+def iter_topics(lines):
+    builder = _TopicBuilder()
+    for line in lines:
+        topic = builder.feed(line)
+        if topic is not None:
+            yield topic
+    topic = builder.close()
+    if topic is not None:
+        yield topic
+
+
+def parse_topics(text):
+    return list(iter_topics(text.splitlines()))
+
+
+def parse_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return list(iter_topics(f))
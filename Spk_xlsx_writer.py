@@ -0,0 +1,79 @@
+import io
+import re
+import zipfile
+from functools import lru_cache
+from Spk_docx_writer import escape, strip_invalid, WRITE_CHUNK
+
+# === 流式 Excel 写出 ===
+# 与 Spk_docx_writer 的做法相同：openpyxl 逐个单元格建对象、设样式，几千行就要半秒以上，
+# 所以只用 openpyxl 生成一次模板（表头、列宽、冻结首行、换行样式），数据行直接拼成 XML
+# 边生成边写进 zip 里的工作表，单元格用内联字符串，不需要共享字符串表。
+
+SHEET_PART = "xl/worksheets/sheet1.xml"
+
+
+def column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+# 模板：第 1 行为加粗表头；返回 (其余部件, 工作表开头（含表头）, 结尾, 数据单元格的样式编号)
+@lru_cache(maxsize=4)
+def template_parts(title, columns, widths):
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    ws.append(list(columns))
+    for i, width in enumerate(widths):
+        ws.column_dimensions[column_letter(i)].width = width
+        ws.cell(1, i + 1).font = Font(bold=True)
+        ws.cell(2, i + 1).alignment = Alignment(wrap_text=True, vertical="top")   # 只为在 styles.xml 里登记样式
+    ws.freeze_panes = "A2"
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    with zipfile.ZipFile(buffer) as zf:
+        parts = {name: zf.read(name) for name in zf.namelist()}
+    sheet_xml = parts.pop(SHEET_PART).decode("utf-8")
+    sheet_xml = re.sub(r"<dimension [^>]*/>", "", sheet_xml)    # 可选元素，行数写完才知道，直接去掉
+    style = re.search(r'<c r="A2" s="(\d+)"', sheet_xml).group(1)
+    return parts, sheet_xml[:sheet_xml.index('<row r="2"')], sheet_xml[sheet_xml.index("</sheetData>"):], style
+
+
+def _cell_xml(ref, value, style):
+    if value is None or value == "":
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    text = escape(strip_invalid(str(value)))
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+# rows 为每行单元格值的可迭代对象（字符串 / 数字 / None），第 1 行是 columns 表头，数据从第 2 行开始
+def write_xlsx(path, columns, rows, widths=None, title="Sheet1"):
+    columns = tuple(columns)
+    parts, head, tail, style = template_parts(title, columns, tuple(widths or [12] * len(columns)))
+    letters = [column_letter(i) for i in range(len(columns))]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+        with zf.open(SHEET_PART, "w") as f:
+            pending, size = [head], len(head)
+            for r, row in enumerate(rows, 2):
+                cells = "".join(_cell_xml(f"{letter}{r}", value, style) for letter, value in zip(letters, row))
+                fragment = f'<row r="{r}">{cells}</row>'
+                pending.append(fragment)
+                size += len(fragment)
+                if size >= WRITE_CHUNK:
+                    f.write("".join(pending).encode("utf-8"))
+                    pending, size = [], 0
+            pending.append(tail)
+            f.write("".join(pending).encode("utf-8"))
+    return path
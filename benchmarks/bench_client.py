@@ -0,0 +1,90 @@
+import io
+import os
+import sys
+import time
+import argparse
+import requests
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Spk_deepseek_client import DeepseekClient, CircuitBreaker, CircuitOpenError
+from mock_deepseek_server import MockDeepseekServer
+
+# === Deepseek 客户端基准（离线，使用本地 mock 服务器）===
+# 1. 吞吐：每次新建连接的 requests.post 与共享连接池的 DeepseekClient 对比
+# 2. 故障：服务端按比例返回 500 / 429 时的成功率、重试和熔断表现
+#   python benchmarks/bench_client.py --requests 200 --concurrency 16
+
+PAYLOAD = {
+    "model": "deepseek-chat",
+    "messages": [{"role": "system", "content": "mock"}, {"role": "user", "content": "Part 1\n1. Hello?"}],
+    "max_tokens": 300,
+}
+
+
+def bare_post(url):
+    res = requests.post(url, headers={"Authorization": "Bearer test"}, json=PAYLOAD, timeout=30)
+    return res.status_code == 200
+
+
+# 客户端会打印每次失败的请求，这里只看汇总，所以吞掉批次内的输出
+def run_batch(fn, n, concurrency):
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        ok = sum(1 for r in pool.map(lambda _: fn(), range(n)) if r)
+    return ok, time.perf_counter() - start
+
+
+def bench_throughput(n, concurrency, latency):
+    print(f"== 吞吐：{n} 个请求，并发 {concurrency}，服务端延迟 {latency}s ==")
+    with MockDeepseekServer(latency=latency) as server:
+        ok, seconds = run_batch(lambda: bare_post(server.url), n, concurrency)
+        print(f"requests.post     成功 {ok}/{n}  {n / seconds:7.1f} req/s  新建连接 {server.stats['connections']}")
+
+    with MockDeepseekServer(latency=latency) as server:
+        client = DeepseekClient("test", url=server.url, pool_size=concurrency)
+        ok, seconds = run_batch(lambda: client.chat(dict(PAYLOAD), retries=1) is not None, n, concurrency)
+        print(f"DeepseekClient    成功 {ok}/{n}  {n / seconds:7.1f} req/s  新建连接 {server.stats['connections']}")
+        print(client.summary())
+        client.close()
+
+
+def bench_failures(n, concurrency, latency, error_rate, rate_limit_rate):
+    print(f"\n== 故障：500 比例 {error_rate}，429 比例 {rate_limit_rate} ==")
+    with MockDeepseekServer(latency=latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate,
+                            retry_after=0.2) as server:
+        client = DeepseekClient("test", url=server.url, pool_size=concurrency,
+                                breaker=CircuitBreaker(threshold=10, cooldown=1))
+        rejected = 0
+
+        def call():
+            nonlocal rejected
+            try:
+                return client.chat(dict(PAYLOAD), retries=4, delay=0.1) is not None
+            except CircuitOpenError:
+                rejected += 1
+                return False
+
+        ok, seconds = run_batch(call, n, concurrency)
+        print(f"成功 {ok}/{n}，耗时 {seconds:.1f}s，服务端收到 {server.stats['requests']} 个请求"
+              f"（500: {server.stats['errors']}，429: {server.stats['rate_limited']}），熔断拒绝 {rejected} 次")
+        print(client.summary())
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    bench_throughput(args.requests, args.concurrency, args.latency)
+    bench_failures(args.requests, args.concurrency, args.latency, args.error_rate, args.rate_limit_rate)
+
+
+if __name__ == "__main__":
+    main()
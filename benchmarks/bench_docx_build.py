@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import time
+import argparse
+import importlib
+import tempfile
+import tracemalloc
+from itertools import chain
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from docx import Document
+from Spk_docx_writer import write_docx
+from Spk_S4_Txt_to_Docx import answer_fragments, ordered_sections
+from bench_topic_parser import make_sheet
+from Spk_topic_parser import parse_topics
+
+s5 = importlib.import_module("Spk_S5_Q&A_Together")
+
+# === Word 组装基准 ===
+# 合成 N 个话题及其答案，对比两种写法生成 汇总口语答案.docx + 预填内容.docx + 合并文档：
+#   python-docx：S4 建文档并保存 → S5 建预填文档并保存 → 重新打开答案文档 → 逐个搬运元素 → 保存
+#   流式写出：Spk_docx_writer 直接由话题记录写出三个文件
+# 同时用 tracemalloc 记录 Python 堆内存峰值（不含 lxml 在 C 层分配的内存，python-docx 的实际占用更高）；
+# 流式写出的峰值超过 --max-mb 时以非零状态退出。
+#   python benchmarks/bench_docx_build.py --topics 2000 --max-mb 64
+
+ANSWER_PARAGRAPH = ("I'd say it really depends on the situation, but generally speaking I try to keep things simple "
+                    "and focus on what matters most to me at the time.")
+
+
+def make_answers(topics, paragraphs=6):
+    parts_dict = {}
+    for topic in topics:
+        content = "\n\n".join(f"{i}. {ANSWER_PARAGRAPH}" for i in range(1, paragraphs + 1))
+        parts_dict.setdefault(topic.part, {})[topic.index] = (f"batch-{topic.title}-已生成-1", content)
+    return parts_dict
+
+
+# 原来的写法，保留在这里作为对照
+def python_docx_build(topics, parts_dict, out_dir):
+    doc = Document()
+    for title, content in ordered_sections(parts_dict):
+        doc.add_heading(title, level=2)
+        for para in re.sub(r'[*#`“”]', '', content).strip().split("\n\n"):
+            if para.strip():
+                doc.add_paragraph(para.strip())
+    answer_path = os.path.join(out_dir, "answers.docx")
+    doc.save(answer_path)
+
+    prefill_doc = Document()
+    for topic in topics:
+        if topic.keyword and topic.part in (1, 2):
+            prefill_doc.add_paragraph(topic.keyword, style="Heading 3")
+        prefill_doc.add_paragraph(f"Part {topic.part}")
+        for line in topic.lines:
+            prefill_doc.add_paragraph(line[2:] if line.startswith("- ") else line)
+    prefill_doc.save(os.path.join(out_dir, "prefill.docx"))
+
+    main_doc = Document(answer_path)
+    for element in list(main_doc.element.body):
+        prefill_doc.element.body.append(element)
+    prefill_doc.save(os.path.join(out_dir, "combined.docx"))
+
+
+def streaming_build(topics, parts_dict, out_dir):
+    write_docx(os.path.join(out_dir, "answers.docx"), answer_fragments(parts_dict))
+    write_docx(os.path.join(out_dir, "prefill.docx"), s5.prefill_fragments(topics))
+    write_docx(os.path.join(out_dir, "combined.docx"),
+               chain(s5.prefill_fragments(topics), answer_fragments(parts_dict)))
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--max-mb", type=float, default=64.0, help="流式写出允许的内存峰值（MB）")
+    parser.add_argument("--skip-baseline", action="store_true", help="不跑 python-docx 对照（话题数很大时很慢）")
+    args = parser.parse_args()
+
+    topics = parse_topics(make_sheet(args.topics))
+    parts_dict = make_answers(topics)
+    print(f"{len(topics)} 个话题")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        if not args.skip_baseline:
+            rows.append(("python-docx", *measure(python_docx_build, topics, parts_dict, out_dir)))
+        rows.append(("流式写出", *measure(streaming_build, topics, parts_dict, out_dir)))
+        check = Document(os.path.join(out_dir, "combined.docx"))
+        print(f"合并文档可被 python-docx 打开：{len(check.paragraphs)} 个段落")
+
+    print(f"{'方式':<12} {'耗时':>10} {'内存峰值':>10}")
+    for name, seconds, peak_mb in rows:
+        print(f"{name:<12} {seconds:>9.2f}s {peak_mb:>8.1f}MB")
+
+    peak_mb = rows[-1][2]
+    if peak_mb > args.max_mb:
+        print(f"流式写出内存峰值 {peak_mb:.1f}MB 超过上限 {args.max_mb}MB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import io
+import os
+import sys
+import time
+import argparse
+import importlib
+import tempfile
+import contextlib
+from itertools import chain
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Spk_docx_writer import write_docx
+from Spk_S4_Txt_to_Docx import answer_fragments
+from Spk_export import FORMATS, build_model, export
+from bench_topic_parser import make_sheet
+from Spk_topic_parser import parse_topics
+
+s5 = importlib.import_module("Spk_S5_Q&A_Together")
+
+# === 多格式导出基准 ===
+# 合成 N 个话题及其答案（格式与 S3 的输出一致：先列出全部问题，再逐题作答），比较：
+#   只写 docx（S5 原来的输出）
+#   docx + xlsx + md + json 四种格式（包含整理导出模型的时间）
+#   python benchmarks/bench_export.py --topics 500 --repeat 3
+
+ANSWER_PARAGRAPH = ("I'd say it really depends on the situation, but generally speaking I try to keep things simple "
+                    "and focus on what matters most to me at the time.")
+
+
+def make_answer(topic, paragraphs=3):
+    body = "\n\n".join([ANSWER_PARAGRAPH] * paragraphs)
+    if topic.part == 2:
+        return f"Part 2\n{topic.cue}\n\n" + "\n\n".join([ANSWER_PARAGRAPH] * paragraphs * 5)
+    listing = "\n".join(topic.questions)
+    return f"Part {topic.part}\n{listing}\n---\n" + "\n\n".join(f"**{q}**\n{body}" for q in topic.questions)
+
+
+def make_answers(topics):
+    parts_dict = {}
+    for topic in topics:
+        parts_dict.setdefault(topic.part, {})[topic.index] = (f"batch-{topic.title}-已生成-1", make_answer(topic))
+    return parts_dict
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    topics = parse_topics(make_sheet(args.topics))
+    parts_dict = make_answers(topics)
+
+    def docx_writer(path, model):
+        return write_docx(path, chain(s5.prefill_fragments(topics), answer_fragments(parts_dict)))
+
+    with tempfile.TemporaryDirectory() as folder:
+        base = os.path.join(folder, "booklet")
+        model = build_model(topics, parts_dict)
+        split = sum(len(t.qa) > 1 for t in model if t.part != 2)
+        print(f"{len(topics)} 个话题（{args.topics} 组），Part 1/3 按问题拆开答案 "
+              f"{split}/{sum(t.part != 2 for t in model)}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = [
+                ("只写 docx", best_of(args.repeat, lambda: export(base, [], ("docx",), docx_writer))),
+                ("四种格式", best_of(args.repeat, lambda: export(base, build_model(topics, parts_dict), FORMATS,
+                                                               docx_writer))),
+                ("S5 完整运行", best_of(args.repeat, lambda: s5.run(folder, folder, topics=topics,
+                                                                answer_parts=parts_dict))),
+            ]
+        sizes = {fmt: os.path.getsize(f"{base}.{fmt}") / 1024 for fmt in FORMATS}
+
+    print("  ".join(f"{fmt} {size:.0f}KB" for fmt, size in sizes.items()))
+    baseline = rows[0][1]
+    print(f"{'方式':<16} {'耗时':>10} {'相对只写 docx':>14}")
+    for name, seconds in rows:
+        print(f"{name:<16} {seconds * 1000:>8.0f}ms {seconds / baseline:>13.2f}x")
+
+
+if __name__ == "__main__":
+    main()
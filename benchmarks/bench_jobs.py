@@ -0,0 +1,73 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+from mock_deepseek_server import MockDeepseekServer
+from Spk_jobs import JobQueue, WorkerPool, new_workspace, workspace_dirs, FINISHED, DONE
+
+# === 任务队列冒烟测试 ===
+# 走页面实际使用的路径：启动 WorkerPool（spawn 出的工作进程），往 SQLite 队列提交 Step 2 任务，
+# 等工作进程跑完，检查任务状态为 done 并打印每个任务从提交到完成的耗时。
+# Step 2 会在工作进程里再开 OCR 进程池，工作进程若是 daemon 会在这里失败。
+# Deepseek 请求发往本地 mock 服务器（--latency 为模拟的服务端延迟）。任务失败时以非 0 退出。
+#   python benchmarks/bench_jobs.py --jobs 2 --workers 2
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures", "screenshots")
+
+
+def submit_step2(queue, root, screenshots):
+    workspace = new_workspace(root)
+    img_dir, _, _ = workspace_dirs(workspace, root)
+    for i, page in enumerate(sorted(glob.glob(os.path.join(FIXTURE_DIR, "page_*.png")))[:screenshots], start=1):
+        shutil.copy(page, os.path.join(img_dir, f"input_{i}.png"))
+    return queue.submit(workspace, ["Step 2"], {"Step 2": {"use_cache": False, "reuse": False}})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=1, help="提交的任务数（每个任务一个工作区）")
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数")
+    parser.add_argument("--screenshots", type=int, default=2, help="每个任务的截图数（最多 4 张 fixture）")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock 服务器的模拟延迟（秒）")
+    parser.add_argument("--timeout", type=float, default=300, help="等待全部任务完成的最长时间（秒）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root, MockDeepseekServer(latency=args.latency) as server:
+        # 工作进程是 spawn 出来的，通过环境变量拿到 mock 服务器地址
+        os.environ["DEEPSEEK_API_URL"] = server.url
+        os.environ.setdefault("DEEPSEEK_API_KEY", "mock")
+        queue_path = os.path.join(root, "jobs.sqlite")
+        queue = JobQueue(queue_path)
+        pool = WorkerPool(args.workers, queue_path, root).start()
+        try:
+            start = time.perf_counter()
+            job_ids = [submit_step2(queue, root, args.screenshots) for _ in range(args.jobs)]
+            jobs = []
+            while time.perf_counter() - start < args.timeout:
+                jobs = queue.list(job_ids)
+                if all(job["status"] in FINISHED for job in jobs):
+                    break
+                time.sleep(0.2)
+        finally:
+            pool.stop()
+            queue.close()
+
+    print(f"{args.jobs} 个 Step 2 任务，每个 {args.screenshots} 张截图，{args.workers} 个工作进程")
+    print(f"{'任务':<14} {'状态':<10} {'耗时':>8}  错误")
+    failed = 0
+    for job in sorted(jobs, key=lambda j: j["created"]):
+        seconds = (job["finished"] or time.time()) - job["created"]
+        print(f"{job['id']:<14} {job['status']:<10} {seconds:>7.2f}s  {job['error'] or ''}")
+        failed += job["status"] != DONE
+    if failed:
+        sys.exit(f"{failed} 个任务没有完成")
+
+
+if __name__ == "__main__":
+    main()
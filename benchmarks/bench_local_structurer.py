@@ -0,0 +1,174 @@
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+import textwrap
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Spk_local_structurer import structure_locally, DEFAULT_LOCAL_THRESHOLD
+from Spk_S2_Screenshot_to_text import call_deepseek, struct_prompt, struct_max_tokens
+from Spk_token_budget import compact_ocr, detect_parts
+from Spk_topic_parser import parse_topics
+from Spk_llm_cache import ResponseCache
+from Spk_deepseek_client import DeepseekClient
+from mock_deepseek_server import MockDeepseekServer
+
+# === 本地结构化基准 ===
+# fixtures/screenshots 的 OCR 文本按几种常见的识别情况改写，比较本地结构化的结果与人工标注的结构：
+#   原文      OCR 文本与截图文字完全一致
+#   折行      窄屏截图，长问题 / 题干 / 要点被折成两行
+#   OCR 噪声  折行 + 状态栏 / 页码、"PART l"、"1," 编号、要点前的 "e" "•"
+#   乱码      OCR 噪声 + 个别题目里混入 "|" 等符号、丢掉问号
+#   裁掉标题  截图没截到第一个 Part 标题
+# 每种情况统计：本地直接完成的页数、其中结构完全正确的页数、不看置信度全部用本地结果时的正确页数、平均耗时。
+# 结构正确指各话题的 Part、题干、要点、问题都与标注相同，Part 1 的关键词也相同
+# （Part 2 截图上的关键词多为中文，OCR 识别不出来，本地用题干代替，不参与比较）。
+# 最后用本地 mock 服务器测一次 Deepseek 路径的单页耗时（--latency 为模拟的服务端延迟；mock 只回显文本，不比较准确率）。
+#   python benchmarks/bench_local_structurer.py --repeat 200 --latency 2.0
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screenshots")
+
+EXPECTED = {
+    "page_1": """Daily routines
+Part 1
+1. What is your morning routine like?
+2. Do you prefer planning your day or being spontaneous?
+3. Do you think routines are important?
+
+Technology
+Part 1
+1. How often do you use your phone?
+2. What apps do you use most frequently?
+3. Do you think technology helps or harms communication?""",
+    "page_2": """热心的人
+Part 2
+Describe a person who helped you in a difficult situation.
+You should say:
+- who this person is
+- what the situation was
+- how he or she helped you
+- and explain how you felt about it
+Part 3
+1. What qualities make someone helpful?
+2. Do people help others more now than in the past?
+3. How do communities support people in need?""",
+    "page_3": """Free time
+Part 1
+1. What do you like to do in your free time?
+2. How often do you have free time during the week?
+3. Do you prefer relaxing alone or with others?
+
+放松的活动
+Part 2
+Describe a relaxing activity you enjoy doing.
+You should say:
+- what it is
+- where you do it
+- how often you do it
+- and explain why it relaxes you""",
+    "page_4": """Part 3
+1. Why do people need time to relax?
+2. Do you think people relax in the same way now as in the past?
+3. Should schools teach students how to manage stress?
+4. Is it harder for young people to relax today?""",
+}
+
+STATUS_BAR = "12:30 4G 85%\n< Back  IELTS Speaking\n"
+PAGE_FOOTER = "\n< 1/3 >\n"
+
+
+def wrapped(text, rng, width=34):
+    return "\n".join(piece for line in text.splitlines() for piece in (textwrap.wrap(line, width) or [""]))
+
+
+def ocr_noise(text, rng):
+    lines = []
+    for line in wrapped(text, rng, 42).splitlines():
+        if line.startswith("Part ") and rng.random() < 0.5:
+            line = line.upper().replace("1", "l")
+        elif line[:2] in ("1.", "2.", "3.", "4.") and rng.random() < 0.3:
+            line = line[0] + "," + line[2:]
+        elif line.startswith(("who ", "what ", "where ", "how ", "and ")):
+            line = rng.choice(["e ", "• ", ""]) + line
+        lines.append(line)
+    return STATUS_BAR + "\n".join(lines) + PAGE_FOOTER
+
+
+def garbled(text, rng):
+    lines = ocr_noise(text, rng).splitlines()
+    questions = [i for i, line in enumerate(lines) if line.endswith("?")]
+    for i in rng.sample(questions, min(2, len(questions))):
+        lines[i] = lines[i][:-1] if rng.random() < 0.5 else lines[i].replace(" ", " | ", 1)
+    return "\n".join(lines)
+
+
+def cropped(text, rng):
+    lines = text.splitlines()
+    first = next(i for i, line in enumerate(lines) if line.startswith("Part "))
+    return "\n".join(lines[:first] + lines[first + 1:])
+
+
+VARIANTS = {
+    "原文": lambda text, rng: text,
+    "折行": wrapped,
+    "OCR 噪声": ocr_noise,
+    "乱码": garbled,
+    "裁掉标题": cropped,
+}
+
+
+def structure(text):
+    return [(t.part, t.cue, t.bullets, t.questions, t.keyword if t.part == 1 else "") for t in parse_topics(text)]
+
+
+def bench_local(pages, rng, repeat, threshold):
+    print(f"{'情况':<8} {'页数':>5} {'本地完成':>8} {'其中正确':>8} {'全用本地正确':>12} {'平均耗时':>10}")
+    for name, variant in VARIANTS.items():
+        total = accepted = accepted_ok = forced_ok = 0
+        seconds = 0.0
+        for _ in range(repeat):
+            for page, text in pages.items():
+                ocr_text = variant(text, rng)
+                start = time.perf_counter()
+                result = structure_locally(ocr_text)
+                seconds += time.perf_counter() - start
+                ok = structure(result.text) == structure(EXPECTED[page])
+                total += 1
+                forced_ok += ok
+                if result.confidence >= threshold:
+                    accepted += 1
+                    accepted_ok += ok
+        print(f"{name:<8} {total:>5} {accepted:>8} {accepted_ok:>8} {forced_ok:>12} {seconds / total * 1000:>8.3f}ms")
+
+
+def bench_llm(pages, latency):
+    with MockDeepseekServer(latency=latency) as server:
+        client = DeepseekClient("mock", url=server.url)
+        cache = ResponseCache(enabled=False)
+        start = time.perf_counter()
+        for text in pages.values():
+            text = compact_ocr(text)
+            call_deepseek(struct_prompt(detect_parts(text)) + text, cache, client, struct_max_tokens(text))
+        seconds = (time.perf_counter() - start) / len(pages)
+        client.close()
+    print(f"\nDeepseek 路径（mock 服务端延迟 {latency}s）：平均 {seconds * 1000:.1f}ms / 页")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50, help="每种情况重复的轮数（每轮随机改写一次）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_LOCAL_THRESHOLD, help="本地结构化的置信度阈值")
+    parser.add_argument("--latency", type=float, default=2.0, help="mock 服务器的模拟延迟（秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    pages = {os.path.splitext(os.path.basename(p))[0]: open(p, encoding="utf-8").read()
+             for p in sorted(glob.glob(os.path.join(FIXTURE_DIR, "page_*.txt")))}
+    bench_local(pages, random.Random(args.seed), args.repeat, args.threshold)
+    bench_llm(pages, args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image
+from Spk_ocr_engine import create_engine, OcrUnavailable
+from Spk_ocr_preprocess import preprocess
+
+# === OCR 引擎基准 ===
+# 比较常驻的 tesserocr 句柄与每张图启动一次 tesseract 的 pytesseract：
+#   初始化  建引擎（tesserocr 在这时加载语言数据；pytesseract 只是导入）
+#   空白图  识别一张 32x32 空白图，几乎没有识别工作，近似每张图的固定开销
+#   截图    fixtures 里的截图（预处理提前做好，只计识别），每张的平均耗时
+# 两个后端都可用时顺便比较识别结果是否相同。某个后端不可用时跳过它。
+#   python benchmarks/bench_ocr_engine.py --repeat 10
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screenshots")
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def bench_backend(backend, images, repeat):
+    start = time.perf_counter()
+    try:
+        engine = create_engine(backend)
+    except OcrUnavailable as e:
+        print(f"{backend:<12} 不可用：{e}")
+        return None
+    init = time.perf_counter() - start
+    blank = Image.new("L", (32, 32), 255)
+    overhead, _ = timed(lambda: engine.recognize(blank), repeat)
+    seconds, texts = 0.0, []
+    for image, tess_config in images:
+        elapsed, text = timed(lambda: engine.recognize(image, tess_config), repeat)
+        seconds += elapsed
+        texts.append(text)
+    engine.close()
+    print(f"{backend:<12} {init * 1000:>10.1f}ms {overhead * 1000:>10.1f}ms {seconds / len(images) * 1000:>10.1f}ms")
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="每张图识别的次数")
+    args = parser.parse_args()
+
+    images = [preprocess(Image.open(p)) for p in sorted(glob.glob(os.path.join(FIXTURE_DIR, "page_*.png")))]
+    print(f"{len(images)} 张截图，每张识别 {args.repeat} 次")
+    print(f"{'后端':<12} {'初始化':>10} {'空白图':>10} {'截图平均':>10}")
+    results = {backend: bench_backend(backend, images, args.repeat) for backend in ("tesserocr", "pytesseract")}
+    if all(results.values()):
+        same = sum(a.strip() == b.strip() for a, b in zip(results["tesserocr"], results["pytesseract"]))
+        print(f"\n识别结果相同：{same}/{len(images)} 张")
+
+
+if __name__ == "__main__":
+    main()
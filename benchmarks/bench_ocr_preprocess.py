@@ -0,0 +1,99 @@
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Spk_ocr_preprocess import preprocess, TARGET_DPI
+from Spk_ocr_engine import create_engine, OcrUnavailable, BACKENDS
+
+# === OCR 预处理基准 ===
+# 对 fixtures/screenshots 下的每张截图分别做"原图直接 OCR"和"预处理后 OCR"，
+# 输出每张图的 OCR 耗时和字符准确率（1 - 编辑距离 / 标准答案长度）。
+# 识别用与 S2 相同的 OCR 引擎（Spk_ocr_engine.create_engine，--ocr-backend 可指定后端），两种方式共用一个引擎。
+#   python benchmarks/bench_ocr_preprocess.py --repeat 3
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screenshots")
+
+
+# 比较前统一空白：截图里的自动换行不算错误
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def edit_distance(a: str, b: str) -> int:
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i]
+        for j, cb in enumerate(b, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def char_accuracy(ocr_text: str, truth: str) -> float:
+    ocr_text, truth = normalize(ocr_text), normalize(truth)
+    return max(0.0, 1 - edit_distance(ocr_text, truth) / max(1, len(truth)))
+
+
+def run_raw(engine, image):
+    return engine.recognize(image)
+
+
+def run_preprocessed(engine, image, dpi):
+    processed, config = preprocess(image, dpi)
+    return engine.recognize(processed, config)
+
+
+def timed(fn, repeat):
+    best, text = float("inf"), ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3, help="每张图重复次数（取最快一次）")
+    parser.add_argument("--dpi", type=int, default=TARGET_DPI, help="预处理目标 DPI")
+    parser.add_argument("--ocr-backend", choices=BACKENDS, default=None, help="OCR 后端（默认读 OCR_BACKEND 配置）")
+    args = parser.parse_args()
+
+    images = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.png")))
+    if not images:
+        print("没有找到 fixture 截图，请先运行 benchmarks/make_fixtures.py")
+        return
+
+    try:
+        engine = create_engine(args.ocr_backend)
+    except OcrUnavailable as e:
+        print(e)
+        sys.exit(1)
+    print(f"OCR 引擎：{engine.name}")
+
+    print(f"{'图片':<12}{'原图耗时':>10}{'原图准确率':>12}{'预处理耗时':>12}{'预处理准确率':>14}")
+    totals = [0.0, 0.0, 0.0, 0.0]
+    for path in images:
+        with open(os.path.splitext(path)[0] + ".txt", encoding="utf-8") as f:
+            truth = f.read()
+        with Image.open(path) as image:
+            image.load()
+            raw_time, raw_text = timed(lambda: run_raw(engine, image), args.repeat)
+            pre_time, pre_text = timed(lambda: run_preprocessed(engine, image, args.dpi), args.repeat)
+        row = [raw_time, char_accuracy(raw_text, truth), pre_time, char_accuracy(pre_text, truth)]
+        totals = [t + r for t, r in zip(totals, row)]
+        print(f"{os.path.basename(path):<12}{row[0]:>9.3f}s{row[1]:>12.1%}{row[2]:>11.3f}s{row[3]:>14.1%}")
+
+    engine.close()
+    n = len(images)
+    print(f"{'平均':<12}{totals[0] / n:>9.3f}s{totals[1] / n:>12.1%}{totals[2] / n:>11.3f}s{totals[3] / n:>14.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Spk_S2_Screenshot_to_text import ocr_image_timed, render_pdf_page, pdf_page_count
+from Spk_ocr_engine import create_engine, init_worker, OcrUnavailable
+
+# === PDF OCR 吞吐基准 ===
+# 用 fixtures/screenshots 的截图循环拼出一份 N 页的 PDF（也可以用 --pdf 指定现成的），测量：
+#   逐页渲染：每次只渲染一页（S2 的做法），页 / 秒
+#   渲染 + 预处理 + OCR：按页分给 1 个和多个进程，页 / 秒
+# 需要 poppler（pdftoppm / pdfinfo）和 OCR 引擎（tesserocr 或 tesseract，见 Spk_ocr_engine）。
+#   python benchmarks/bench_pdf_ocr.py --pages 100 --workers 1 4 8
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screenshots")
+
+
+def make_pdf(path, pages):
+    from PIL import Image
+    sources = [Image.open(p).convert("RGB") for p in sorted(glob.glob(os.path.join(FIXTURE_DIR, "page_*.png")))]
+    first, rest = sources[0], [sources[i % len(sources)] for i in range(1, pages)]
+    first.save(path, "PDF", resolution=300, save_all=True, append_images=rest)
+
+
+def tools_missing():
+    missing = [tool for tool in ("pdftoppm", "pdfinfo") if not shutil.which(tool)]
+    try:
+        create_engine().close()
+    except OcrUnavailable:
+        missing.append("OCR 引擎")
+    return missing
+
+
+def ocr_pages(pdf_path, pages, workers, dpi):
+    start = time.perf_counter()
+    chars = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = [pool.submit(ocr_image_timed, pdf_path, True, dpi, page) for page in range(1, pages + 1)]
+        for future in as_completed(futures):
+            chars += len(future.result()[0])
+    return time.perf_counter() - start, chars
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--pdf", default=None, help="使用现成的 PDF，不生成")
+    parser.add_argument("--dpi", type=int, default=300, help="渲染 / OCR 的 DPI")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    missing = tools_missing()
+    if missing:
+        print(f"缺少 {'、'.join(missing)}，无法运行 PDF 基准")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as folder:
+        pdf_path = args.pdf or os.path.join(folder, "bench.pdf")
+        if not args.pdf:
+            make_pdf(pdf_path, args.pages)
+        pages = pdf_page_count(pdf_path)
+        print(f"{pages} 页 PDF，{os.path.getsize(pdf_path) / 1024 / 1024:.1f}MB，DPI {args.dpi}")
+
+        start = time.perf_counter()
+        for page in range(1, pages + 1):
+            render_pdf_page(pdf_path, page, args.dpi).close()
+        render_seconds = time.perf_counter() - start
+        print(f"{'逐页渲染':<20} {pages / render_seconds:>8.2f} 页/秒")
+
+        for workers in args.workers:
+            seconds, chars = ocr_pages(pdf_path, pages, workers, args.dpi)
+            print(f"{f'渲染 + OCR（{workers} 进程）':<20} {pages / seconds:>8.2f} 页/秒  共 {chars} 字符")
+
+
+if __name__ == "__main__":
+    main()
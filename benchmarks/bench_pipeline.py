@@ -0,0 +1,180 @@
+import io
+import os
+import sys
+import glob
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+from mock_deepseek_server import MockDeepseekServer
+
+# === 全流程离线基准 ===
+# 用 fixtures/screenshots 里的截图（按批量大小复制）和本地 mock Deepseek 服务器跑完整流水线，
+# 按步骤记录耗时 / CPU / 内存 / OCR / LLM 统计（来自 Spk_perf），结果存成 JSON，方便不同提交之间对比。
+#
+#   截图 → Step 1 重命名 → Step 2 OCR + 结构化
+#   预填（截图对应的标准答案 txt，即 Step 2 理想情况下的输出）→ Step 3 生成答案 → Step 4 / 5 组装 Word
+#
+# Step 3 使用标准答案作为预填，不依赖 mock 服务器对结构化提示的回显，生成阶段的输入在各次提交之间保持一致。
+# 所有缓存都关闭，每次都是冷启动。本机没有 tesseract 时 Step 2 记为跳过。
+#
+#   python benchmarks/bench_pipeline.py --sizes 4 16 64 --latency 0.2
+#   python benchmarks/bench_pipeline.py --compare benchmarks/results/<旧提交>.json
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures", "screenshots")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+STEP_NAMES = {"Step 1": "rename", "Step 2": "ocr_structure", "Step 3": "generate", "Step 4": "answer_docx",
+              "Step 5": "combined_docx"}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# 准备一个批次：n 张截图（依次复制 fixture，文件名模仿手机截图）和对应的预填 txt
+def prepare_workspace(root, n):
+    pages = sorted(glob.glob(os.path.join(FIXTURE_DIR, "page_*.png")))
+    dirs = {name: os.path.join(root, name) for name in ("img", "ocr_prefill", "prefill", "answer")}
+    for path in dirs.values():
+        os.makedirs(path)
+    texts = []
+    for i in range(n):
+        page = pages[i % len(pages)]
+        shutil.copy(page, os.path.join(dirs["img"], f"Screenshot_{i + 1:04d}.png"))
+        with open(os.path.splitext(page)[0] + ".txt", "r", encoding="utf-8") as f:
+            texts.append(f.read().strip())
+    with open(os.path.join(dirs["prefill"], "bench_口语话题_预填.txt"), "w", encoding="utf-8") as f:
+        f.write("\n\n".join(texts) + "\n")
+    return dirs
+
+
+def ocr_available():
+    from Spk_ocr_engine import create_engine, OcrUnavailable
+    try:
+        create_engine().close()
+    except OcrUnavailable:
+        return False
+    return True
+
+
+def stage_record(result):
+    record = {"ok": result.ok, "wall_s": round(result.seconds, 3)}
+    record.update({k: v for k, v in result.perf.items() if k != "profile"})
+    if result.error:
+        record["error"] = result.error
+    return record
+
+
+def bench_size(n, with_ocr, workers, rpm, tpm):
+    from Spk_pipeline import Pipeline
+
+    with tempfile.TemporaryDirectory() as root:
+        dirs = prepare_workspace(root, n)
+        options = {
+            "Step 1": {"dedup": False},      # fixture 循环复制，内容相同的截图不能被合并
+            "Step 2": {"use_cache": False, "dedup": False, "reuse": False, "local": False},   # 测 Deepseek 路径
+            "Step 3": {"use_cache": False, "reuse": False, "workers": workers, "rpm": rpm, "tpm": tpm},
+        }
+        steps = {}
+        front = Pipeline(dirs["img"], dirs["ocr_prefill"], dirs["answer"], options=options,
+                         perf_log=os.path.join(root, "perf.jsonl"))
+        with redirect_stdout(io.StringIO()):
+            for result in front.run(["Step 1", "Step 2"] if with_ocr else ["Step 1"]):
+                steps[STEP_NAMES[result.step]] = stage_record(result)
+        if not with_ocr:
+            steps["ocr_structure"] = {"skipped": "tesseract 不可用"}
+
+        back = Pipeline(dirs["img"], dirs["prefill"], dirs["answer"], options=options,
+                        perf_log=os.path.join(root, "perf.jsonl"))
+        with redirect_stdout(io.StringIO()):
+            for result in back.run(["Step 3", "Step 4", "Step 5"]):
+                steps[STEP_NAMES[result.step]] = stage_record(result)
+
+    end_to_end = sum(s.get("wall_s", 0.0) for s in steps.values())
+    return {"screenshots": n, "steps": steps, "end_to_end_s": round(end_to_end, 3)}
+
+
+def print_table(results, baseline=None):
+    base = {r["screenshots"]: r for r in (baseline or {}).get("results", [])}
+    header = f"{'截图数':>6} " + " ".join(f"{name:>14}" for name in STEP_NAMES.values()) + f" {'端到端':>10}"
+    print(header)
+    for r in results:
+        cells = []
+        for name in STEP_NAMES.values():
+            step = r["steps"].get(name, {})
+            if "wall_s" not in step:
+                cells.append(f"{'跳过':>14}")
+                continue
+            cell = f"{step['wall_s']:.2f}s"
+            old = base.get(r["screenshots"], {}).get("steps", {}).get(name, {}).get("wall_s")
+            if old:
+                cell += f"({(step['wall_s'] - old) / old:+.0%})"
+            cells.append(f"{cell:>14}")
+        total = f"{r['end_to_end_s']:.2f}s"
+        old_total = base.get(r["screenshots"], {}).get("end_to_end_s")
+        if old_total:
+            total += f"({(r['end_to_end_s'] - old_total) / old_total:+.0%})"
+        print(f"{r['screenshots']:>6} " + " ".join(cells) + f" {total:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64], help="每批的截图数量")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock 服务器每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock 服务器返回 500 的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=4, help="Step 3 并发数")
+    # 默认放开 Step 3 的限流，测的是流水线本身而不是 API 配额
+    parser.add_argument("--rpm", type=int, default=100000, help="Step 3 每分钟请求数上限")
+    parser.add_argument("--tpm", type=int, default=100000000, help="Step 3 每分钟 token 上限")
+    parser.add_argument("--output", default=None, help="结果 JSON 路径，默认 benchmarks/results/<提交>.json")
+    parser.add_argument("--compare", default=None, help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    with MockDeepseekServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            seed=args.seed) as server:
+        # 客户端在创建时读取 DEEPSEEK_API_URL，必须在第一次运行 Step 2 / 3 之前设置
+        os.environ["DEEPSEEK_API_URL"] = server.url
+        os.environ.setdefault("DEEPSEEK_API_KEY", "mock")
+        with_ocr = ocr_available()
+        results = []
+        for n in args.sizes:
+            print(f"== {n} 张截图 ==")
+            results.append(bench_size(n, with_ocr, args.workers, args.rpm, args.tpm))
+        requests_served = server.stats["requests"]
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "config": {"sizes": args.sizes, "latency": args.latency, "jitter": args.jitter,
+                   "error_rate": args.error_rate, "seed": args.seed, "workers": args.workers, "rpm": args.rpm, "tpm": args.tpm,
+                   "ocr": with_ocr},
+        "mock_requests": requests_served,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"对比基准：{baseline.get('commit')}（括号内为相对变化）")
+    print_table(results, baseline)
+    print(f"结果已保存：{output}")
+
+
+if __name__ == "__main__":
+    main()
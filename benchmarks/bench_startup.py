@@ -0,0 +1,79 @@
+import os
+import sys
+import argparse
+import subprocess
+
+# === 启动时间预算 ===
+# 每个入口在全新的解释器里用 `python -X importtime` 导入一次，取模块自身的累计导入时间
+# （不含解释器和 site 的启动），重复几次取最小值，与预算比较；超出预算或导入了不该在启动时加载的
+# 重量级依赖（streamlit / PIL / numpy / pytesseract / docx / requests）时以非零状态退出。
+#
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --repeat 10 --scale 2   # 慢机器上放宽预算
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 入口模块 → 预算（毫秒），约为实测值的 1.5 倍。改动前 S2 约 1400ms、S3 约 1000ms（导入 streamlit / PIL / numpy）
+BUDGETS_MS = {
+    "Spk_S1_Screenshot_Rename": 40,
+    "Spk_S2_Screenshot_to_text": 100,
+    "Spk_S3_Dpsk_Answer_Draft": 100,
+    "Spk_S4_Txt_to_Docx": 60,
+    "Spk_S5_Q&A_Together": 60,
+    "Spk_pipeline": 50,
+    "Spk_jobs": 60,
+}
+HEAVY_MODULES = ("streamlit", "PIL", "numpy", "pytesseract", "docx", "requests", "httpx")
+
+
+# 在子进程里导入一次，返回 (累计微秒, 导入过的顶层包集合)
+# 模块名里有 "&" 时只能用 __import__；importlib.import_module 不会产生 importtime 记录
+def measure(module):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"__import__({module!r})"],
+                            cwd=REPO_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败：\n{result.stderr[-2000:]}")
+    cumulative, packages = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|", 2)
+        if not total.strip().isdigit():
+            continue
+        name = name.strip()
+        packages.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(total)
+    return cumulative, packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="每个入口测几次，取最小值")
+    parser.add_argument("--scale", type=float, default=1.0, help="预算倍数")
+    parser.add_argument("modules", nargs="*", help="只测这些入口（默认全部）")
+    args = parser.parse_args()
+
+    failed = []
+    print(f"{'入口':<28} {'导入(ms)':>10} {'预算(ms)':>10}  结果")
+    for module in args.modules or BUDGETS_MS:
+        runs = [measure(module) for _ in range(max(1, args.repeat))]
+        best = min(total for total, _ in runs) / 1000
+        budget = BUDGETS_MS.get(module, 0) * args.scale
+        heavy = sorted(set(HEAVY_MODULES) & runs[0][1])
+        ok = best <= budget and not heavy
+        status = "通过" if ok else "超出预算"
+        if heavy:
+            status = "导入了 " + "、".join(heavy)
+        print(f"{module:<28} {best:>10.1f} {budget:>10.0f}  {status}")
+        if not ok:
+            failed.append(module)
+
+    if failed:
+        print(f"\n{len(failed)} 个入口未通过：{'、'.join(failed)}")
+        sys.exit(1)
+    print("\n全部入口都在预算内")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import glob
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Spk_token_budget import count_tokens, compact_ocr, detect_parts
+from Spk_S2_Screenshot_to_text import STRUCT_PROMPT, struct_prompt, struct_max_tokens, STRUCT_MAX_TOKENS
+from Spk_S3_Dpsk_Answer_Draft import BASE_PROMPT, MAX_TOKENS, DEFAULT_TPM, request_budget
+from Spk_topic_parser import parse_topics
+from bench_topic_parser import make_sheet
+
+# === token 预算基准 ===
+# 不发请求，只在本地统计压缩前后每次请求的 token 数：
+#   S2：fixtures 里的 OCR 文本加上常见噪声（状态栏、页码、框线符号），完整提示词 vs 按 Part 类型裁剪
+#   S3：合成预填文件的每个 Part，完整系统提示 + max_tokens=3000 vs 按 Part 类型和问题数
+# 限流器按"输入 + max_tokens"预留 TPM，最后换算成在 --tpm 限额下发完所有请求至少需要的时间。
+#   python benchmarks/bench_token_budget.py --topics 200 --tpm 200000
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screenshots")
+OCR_NOISE_HEAD = "12:30 4G 85%\n<  ||  ~ __\n"
+OCR_NOISE_TAIL = "\n\n< 1/3 >\n— — —\n"
+
+
+def report(name, full_in, sent_in, full_max, sent_max, count, tpm):
+    full_time = (full_in + full_max) / tpm * 60
+    sent_time = (sent_in + sent_max) / tpm * 60
+    print(f"{name:<6} {count:>6} {full_in / count:>10.0f} {sent_in / count:>10.0f} {1 - sent_in / full_in:>7.0%} "
+          f"{full_max / count:>10.0f} {sent_max / count:>10.0f} {full_time:>10.1f}s {sent_time:>8.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=200, help="合成预填文件的话题组数")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TPM, help="每分钟 token 限额，用于换算排队时间")
+    args = parser.parse_args()
+
+    print(f"{'':<6} {'请求数':>6} {'输入(完整)':>10} {'输入(压缩)':>10} {'节省':>7} "
+          f"{'max(完整)':>10} {'max(压缩)':>10} {'TPM排队(完整)':>10} {'(压缩)':>8}")
+
+    pages = [open(p, encoding="utf-8").read() for p in sorted(glob.glob(os.path.join(FIXTURE_DIR, "page_*.txt")))]
+    totals = [0, 0, 0, 0]
+    for page in pages:
+        raw = OCR_NOISE_HEAD + page + OCR_NOISE_TAIL
+        text = compact_ocr(raw)
+        totals[0] += count_tokens(STRUCT_PROMPT + raw)
+        totals[1] += count_tokens(struct_prompt(detect_parts(text)) + text)
+        totals[2] += STRUCT_MAX_TOKENS
+        totals[3] += struct_max_tokens(text)
+    report("S2", *totals, len(pages), args.tpm)
+
+    topics = [t for t in parse_topics(make_sheet(args.topics)) if t.lines]
+    totals = [0, 0, 0, 0]
+    for topic in topics:
+        system, max_tokens = request_budget([topic])
+        totals[0] += count_tokens(BASE_PROMPT + topic.text())
+        totals[1] += count_tokens(system + topic.text())
+        totals[2] += MAX_TOKENS
+        totals[3] += max_tokens
+    report("S3", *totals, len(topics), args.tpm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from Spk_topic_index import TopicIndex, minhash, normalize
+
+# === 话题索引基准 ===
+# 生成 N 条合成题目写入索引，测量：
+#   写入：逐条 add 的耗时；加载：重新打开索引（从 SQLite 读签名、重建分桶）的耗时
+#   查找：近似重复的题目（改大小写、标点、编号，删掉一行）和全新题目的单次查找 p50 / p99，以及命中率
+#   对照：同样的查询逐条和所有签名比较（NumPy 全表扫描），两者命中率之差即 LSH 分桶漏掉的比例
+#   python benchmarks/bench_topic_index.py --topics 10000 --queries 500
+
+KIND = "answer:bench"
+OPENERS = ("Do you like", "Why do people", "How often do you", "What kind of", "Is it important to",
+           "Describe a time when you", "Do you think", "When was the last time you")
+
+
+# 合成题目：句首是常见句式，后面是随机词（词表 3000 个），每条 3~6 行
+def make_topics(n, seed=0):
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+    topics = []
+    for _ in range(n):
+        lines = [f"{q}. {rng.choice(OPENERS)} {' '.join(rng.choices(vocab, k=rng.randint(4, 9)))}?"
+                 for q in range(1, rng.randint(4, 7))]
+        topics.append((rng.randint(1, 3), "\n".join(lines)))
+    return topics
+
+
+# 同一话题在另一批 OCR 里常见的差异：大小写、标点、编号格式，偶尔漏识别一行
+def perturb(text, rng):
+    lines = text.split("\n")
+    if len(lines) > 4 and rng.random() < 0.3:
+        del lines[rng.randrange(len(lines))]
+    text = "\n".join(re.sub(r"^(\d+)\.", r"\1)", line) for line in lines)
+    return text.upper() if rng.random() < 0.5 else text.replace("?", " ?")
+
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def brute_force(signatures, parts, part, text, threshold):
+    rows = np.flatnonzero(parts == part)
+    similarity = (signatures[rows] == minhash(normalize(text))).mean(axis=1)
+    return bool(rows.size) and similarity.max() >= threshold
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--threshold", type=float, default=0.85)
+    args = parser.parse_args()
+
+    topics = make_topics(args.topics)
+    rng = random.Random(1)
+    near = [(part, perturb(text, rng)) for part, text in rng.sample(topics, min(args.queries, len(topics)))]
+    fresh = make_topics(args.queries, seed=1)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "topic_index.sqlite")
+        index = TopicIndex(path, args.threshold)
+        index.conn.execute("PRAGMA synchronous=OFF")
+        start = time.perf_counter()
+        for i, (part, text) in enumerate(topics):
+            index.add(KIND, part, text, f"answer {i}", source=f"topic {i}")
+        insert_seconds = time.perf_counter() - start
+        index.close()
+
+        start = time.perf_counter()
+        index = TopicIndex(path, args.threshold)
+        load_seconds = time.perf_counter() - start
+        print(f"{len(topics)} 条题目，阈值 {args.threshold}")
+        print(f"写入 {insert_seconds:.2f}s（{insert_seconds / len(topics) * 1000:.2f}ms/条），"
+              f"重新加载 {load_seconds * 1000:.0f}ms")
+
+        signatures = index.signatures[:index.size]
+        parts = np.array([part for part, _ in topics])
+        print(f"{'查询':<14} {'p50(ms)':>9} {'p99(ms)':>9} {'命中率':>8}   {'全表扫描 p50(ms)':>16} {'命中率':>8}")
+        for name, queries in (("近似重复", near), ("全新题目", fresh)):
+            index_times, scan_times, hits, scan_hits = [], [], 0, 0
+            for part, text in queries:
+                start = time.perf_counter()
+                hits += index.lookup(KIND, part, text) is not None
+                index_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                scan_hits += brute_force(signatures, parts, part, text, args.threshold)
+                scan_times.append(time.perf_counter() - start)
+            p50, p99 = percentiles(index_times)
+            print(f"{name:<14} {p50:>9.3f} {p99:>9.3f} {hits / len(queries):>8.1%}   {percentiles(scan_times)[0]:>16.3f} {scan_hits / len(queries):>8.1%}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Spk_topic_parser import parse_topics, parse_file
+
+# === 话题解析基准 ===
+# 生成含 N 个话题的合成预填文件，对比原来 S3 里的正则拆分和逐行解析器的耗时，
+# 并按 1/10 规模各跑一次，检查耗时是否随话题数线性增长。
+#   python benchmarks/bench_topic_parser.py --topics 10000
+
+
+# 原 S3 的 split_parts，保留在这里作为对照
+def regex_split_parts(file_content):
+    parts = {}
+    pattern = r"(Part\s*\d+(?:-\d+)?)[\s\S]*?(?=Part\s*\d+(?:-\d+)?|$)"
+    count_tracker = {}
+    for match in re.finditer(pattern, file_content, re.IGNORECASE):
+        full_text = match.group(0).strip()
+        part_number_match = re.match(r"Part\s*(\d+)", full_text, re.IGNORECASE)
+        if not part_number_match:
+            continue
+        part_number = int(part_number_match.group(1))
+        count_tracker[part_number] = count_tracker.get(part_number, 0) + 1
+        parts[f"Part {part_number}-{count_tracker[part_number]}"] = [full_text]
+    return parts
+
+
+# 三个话题里约有一个 Part 2/3 话题块，其余为 Part 1
+def make_sheet(topics, seed=0):
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(topics):
+        if rng.random() < 0.35:
+            blocks.append("\n".join([
+                f"话题{i}",
+                "Part 2",
+                f"Describe a place number {i} that you visited.",
+                "You should say:",
+                "- where it is",
+                "- when you went there",
+                "- what you did there",
+                "- and explain how you felt about it",
+                "Part 3",
+            ] + [f"{q}. Why do people like visiting place {i} question {q}?" for q in range(1, rng.randint(3, 6))]))
+        else:
+            blocks.append("\n".join(
+                [f"Topic {i}", "Part 1"]
+                + [f"{q}. Do you often think about topic {i}, question {q}?" for q in range(1, rng.randint(3, 7))]
+            ))
+    return "\n\n".join(blocks) + "\n"
+
+
+def timed(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for n in (max(1, args.topics // 10), args.topics):
+        sheet = make_sheet(n)
+        with tempfile.NamedTemporaryFile("w", suffix="_口语话题_预填.txt", encoding="utf-8", delete=False) as f:
+            f.write(sheet)
+            path = f.name
+        try:
+            regex_s, regex_parts = timed(lambda: regex_split_parts(sheet), args.repeat)
+            text_s, topics = timed(lambda: parse_topics(sheet), args.repeat)
+            file_s, _ = timed(lambda: parse_file(path), args.repeat)
+        finally:
+            os.remove(path)
+        rows.append((n, len(sheet), regex_s, len(regex_parts), text_s, file_s, len(topics)))
+
+    print(f"{'话题数':>8} {'字符数':>10} {'正则拆分':>10} {'Part数':>8} {'逐行解析':>10} {'读文件解析':>10} {'话题记录':>8}")
+    for n, chars, regex_s, regex_n, text_s, file_s, topic_n in rows:
+        print(f"{n:>8} {chars:>10} {regex_s * 1000:>8.1f}ms {regex_n:>8} {text_s * 1000:>8.1f}ms "
+              f"{file_s * 1000:>8.1f}ms {topic_n:>8}")
+
+    (small, _, small_regex, _, small_text, _, _), (large, _, large_regex, _, large_text, _, _) = rows
+    scale = large / small
+    print(f"\n话题数放大 {scale:.0f} 倍：正则拆分耗时 ×{large_regex / small_regex:.1f}，"
+          f"逐行解析耗时 ×{large_text / small_text:.1f}")
+
+
+if __name__ == "__main__":
+    main()
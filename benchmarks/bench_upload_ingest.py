@@ -0,0 +1,94 @@
+import io
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image, ImageDraw
+from Spk_S1_Screenshot_Rename import ingest_image, MAX_INGEST_SIDE
+
+# === 上传保存基准 ===
+# 模拟 Streamlit 把 N 个上传文件交给页面（BytesIO，内容与 UploadedFile 一样由 bytes 构造），比较：
+#   原来的写法（最初 app 里的代码）：每次页面运行都把每个文件 f.write(file.read())，read() 会把内容整个复制成新的 bytes
+#   现在的写法：ingest_image 分块写出 + 计算哈希，过大的图片导入时缩小
+#   页面刷新：原来每次都全部重写；现在按 file_id 缓存的哈希判断，已保存的文件不再写盘
+# 首次保存时现在的写法更慢（要算哈希，过大的图片要解码、缩小、重新编码），省下的是页面刷新时的重复写盘
+# 和之后 OCR 处理大图的开销；BytesIO 的 read() 读整个内容时不复制，原来的写法也没有多占内存。
+# 用 tracemalloc 记录 Python 堆峰值（Pillow 解码在 C 层分配的内存不计入）。
+#   python benchmarks/bench_upload_ingest.py --images 200 --oversized-every 20
+
+
+def make_uploads(n, oversized_every):
+    uploads = []
+    for i in range(n):
+        big = oversized_every and i % oversized_every == 0
+        image = Image.new("RGB", (6000, 4000) if big else (1080, 2400), "white")
+        draw = ImageDraw.Draw(image)
+        for row in range(40, image.height - 40, 60):
+            draw.rectangle((60, row, image.width - 60 - (i * 37 + row) % 400, row + 24), fill="black")
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG" if big else "PNG")
+        uploads.append((f"upload_{i}", f"Screenshot_{i}.{'jpg' if big else 'png'}", buffer.getvalue()))
+    return uploads
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--oversized-every", type=int, default=20, help="每隔几张放一张 6000x4000 的大图（0 表示不放）")
+    args = parser.parse_args()
+
+    uploads = make_uploads(args.images, args.oversized_every)
+    total_mb = sum(len(data) for _, _, data in uploads) / 1024 / 1024
+    print(f"{len(uploads)} 个上传文件，共 {total_mb:.1f}MB")
+
+    with tempfile.TemporaryDirectory() as old_dir, tempfile.TemporaryDirectory() as new_dir:
+        def old():
+            for i, (_, name, data) in enumerate(uploads):
+                file = io.BytesIO(data)
+                with open(os.path.join(old_dir, f"input_{i + 1}{os.path.splitext(name)[1]}"), "wb") as f:
+                    f.write(file.read())
+
+        hashes, saved = {}, {}
+
+        def new():
+            for file_id, name, data in uploads:
+                file = io.BytesIO(data)
+                if file_id not in hashes:
+                    hashes[file_id] = hashlib.sha256(file.getvalue()).hexdigest()
+                if hashes[file_id] in saved:
+                    continue
+                ext = os.path.splitext(name)[1]
+                saved[hashes[file_id]], _ = ingest_image(file, new_dir, f"input_{len(saved) + 1}{ext}", MAX_INGEST_SIDE)
+
+        rows = [("原来：read() 整块写出", *measure(old)),
+                ("原来：页面刷新（全部重写）", *measure(old))]
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows.append(("分块写出 + 缩小", *measure(new)))
+            rows.append(("页面刷新（已保存）", *measure(new)))
+        disk_old = sum(os.path.getsize(os.path.join(old_dir, f)) for f in os.listdir(old_dir)) / 1024 / 1024
+        disk_new = sum(os.path.getsize(os.path.join(new_dir, f)) for f in os.listdir(new_dir)) / 1024 / 1024
+
+    print(f"{'写法':<18} {'耗时':>10} {'Python 堆峰值':>14}")
+    for name, seconds, peak in rows:
+        print(f"{name:<18} {seconds * 1000:>8.1f}ms {peak:>12.2f}MB")
+    print(f"写盘大小：原来 {disk_old:.1f}MB，现在 {disk_new:.1f}MB（原来的写法每次页面刷新都会重新全部写一遍）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+from PIL import Image, ImageDraw, ImageFont
+
+# === 生成 OCR 基准测试用的截图 fixture ===
+# 仿照手机截图：顶部状态栏、深色标题栏、题目正文、底部导航条。
+# 每张图旁边保存同名 .txt 作为 OCR 的标准答案。生成结果已提交到仓库，
+# 只有修改题目内容时才需要重新运行本脚本。
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screenshots")
+WIDTH, HEIGHT = 1080, 2340
+MARGIN = 60
+LINE_GAP = 22
+
+PAGES = {
+    "page_1": ("light", """Daily routines
+Part 1
+1. What is your morning routine like?
+2. Do you prefer planning your day or being spontaneous?
+3. Do you think routines are important?
+
+Technology
+Part 1
+1. How often do you use your phone?
+2. What apps do you use most frequently?
+3. Do you think technology helps or harms communication?"""),
+    "page_2": ("light", """Part 2
+Describe a person who helped you in a difficult situation.
+You should say:
+who this person is
+what the situation was
+how he or she helped you
+and explain how you felt about it
+Part 3
+1. What qualities make someone helpful?
+2. Do people help others more now than in the past?
+3. How do communities support people in need?"""),
+    "page_3": ("light", """Free time
+Part 1
+1. What do you like to do in your free time?
+2. How often do you have free time during the week?
+3. Do you prefer relaxing alone or with others?
+
+Part 2
+Describe a relaxing activity you enjoy doing.
+You should say:
+what it is
+where you do it
+how often you do it
+and explain why it relaxes you"""),
+    "page_4": ("dark", """Part 3
+1. Why do people need time to relax?
+2. Do you think people relax in the same way now as in the past?
+3. Should schools teach students how to manage stress?
+4. Is it harder for young people to relax today?"""),
+}
+
+
+def wrap(draw, text, font, max_width):
+    lines = []
+    for paragraph in text.split("\n"):
+        words = paragraph.split(" ")
+        line = ""
+        for word in words:
+            candidate = f"{line} {word}".strip()
+            if draw.textlength(candidate, font=font) <= max_width or not line:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+    return lines
+
+
+def render(text, theme):
+    bg, fg, bar = ((255, 255, 255), (20, 20, 20), (33, 62, 120)) if theme == "light" \
+        else ((18, 18, 18), (230, 230, 230), (45, 45, 45))
+    image = Image.new("RGB", (WIDTH, HEIGHT), bg)
+    draw = ImageDraw.Draw(image)
+    small = ImageFont.load_default(size=34)
+    body = ImageFont.load_default(size=44)
+
+    # 状态栏
+    draw.text((MARGIN, 30), "9:41", fill=fg, font=small)
+    draw.text((WIDTH - MARGIN - 170, 30), "5G  87%", fill=fg, font=small)
+    # 标题栏
+    draw.rectangle((0, 100, WIDTH, 250), fill=bar)
+    draw.text((MARGIN, 150), "<  Speaking Question Bank", fill=(255, 255, 255), font=body)
+    # 正文
+    y = 320
+    for line in wrap(draw, text, body, WIDTH - 2 * MARGIN):
+        if line:
+            draw.text((MARGIN, y), line, fill=fg, font=body)
+        y += 44 + LINE_GAP
+    # 导航条
+    draw.rounded_rectangle((WIDTH // 2 - 180, HEIGHT - 50, WIDTH // 2 + 180, HEIGHT - 38), 6, fill=fg)
+    return image
+
+
+def main():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, (theme, text) in PAGES.items():
+        render(text, theme).save(os.path.join(FIXTURE_DIR, f"{name}.png"), optimize=True)
+        with open(os.path.join(FIXTURE_DIR, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"已生成：{name}.png")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# === 本地 mock Deepseek 服务器 ===
+# 模仿 /v1/chat/completions：支持普通返回和 SSE 流式返回，可配置延迟、错误率和 429 限流比例。
+# 每个请求的随机数由"请求体哈希 + 同一请求体第几次出现"决定，并发顺序不同也能复现同样的结果。
+#
+#   with MockDeepseekServer(latency=0.5, error_rate=0.1) as server:
+#       os.environ["DEEPSEEK_API_URL"] = server.url
+#
+#   python benchmarks/mock_deepseek_server.py --port 8765 --latency 1.0
+
+ANSWER_SENTENCE = "This is a mock answer sentence that stands in for generated speaking content."
+
+
+# 默认的返回内容：有 system 消息时当作答案生成，否则原样回显用户消息的最后一段；
+# 要求 JSON 输出时按 "### <块ID>" 标题逐块作答
+def default_responder(payload):
+    messages = payload.get("messages", [])
+    user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    if payload.get("response_format", {}).get("type") == "json_object":
+        blocks = re.split(r"^### (.+)$", user, flags=re.MULTILINE)[1:]
+        answers = {}
+        for block_id, body in zip(blocks[::2], blocks[1::2]):
+            answers[block_id.strip()] = default_responder({
+                "messages": [{"role": "system", "content": ""}, {"role": "user", "content": body}],
+                "max_tokens": 600,
+            })
+        return json.dumps({"answers": answers}, ensure_ascii=False)
+    if any(m["role"] == "system" for m in messages):
+        first_line = user.strip().splitlines()[0] if user.strip() else ""
+        words = max(20, min(payload.get("max_tokens", 600), 600)) // 15
+        return f"{first_line}\n\n" + "\n\n".join([ANSWER_SENTENCE] * words)
+    return user[-2000:]
+
+
+class MockDeepseekServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1, chunk_delay=0.005, seed=0, responder=default_responder):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.chunk_delay = chunk_delay
+        self.seed = seed
+        self.responder = responder
+        self.lock = threading.Lock()
+        self.seen = {}
+        self.stats = {"requests": 0, "connections": 0, "errors": 0, "rate_limited": 0, "prompt_chars": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def _rng_for(self, body):
+        digest = hashlib.sha256(body).hexdigest()
+        with self.lock:
+            n = self.seen.get(digest, 0)
+            self.seen[digest] = n + 1
+        return random.Random(f"{self.seed}:{digest}:{n}")
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # 支持 keep-alive，用来对比连接复用
+            # 响应头和正文分两次写出；不关 Nagle 时复用的连接上正文要等客户端的延迟 ACK（约 40ms），
+            # 每个请求都多出这段等待，连接复用反而显得更慢
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                server._count("connections")
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                payload = json.loads(body or b"{}")
+                rng = server._rng_for(body)
+                server._count("requests")
+                prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+                server._count("prompt_chars", prompt_chars)
+
+                time.sleep(max(0.0, server.latency + rng.uniform(-server.jitter, server.jitter)))
+                roll = rng.random()
+                if roll < server.rate_limit_rate:
+                    server._count("rate_limited")
+                    self._send_json(429, {"error": "rate limited"}, {"Retry-After": str(server.retry_after)})
+                    return
+                if roll < server.rate_limit_rate + server.error_rate:
+                    server._count("errors")
+                    self._send_json(500, {"error": "mock failure"})
+                    return
+
+                content = server.responder(payload)
+                usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                if not payload.get("stream"):
+                    self._send_json(200, {
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                     "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i in range(0, len(content), 40):
+                    chunk = {"choices": [{"index": 0, "delta": {"content": content[i:i + 40]}}]}
+                    self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+                    time.sleep(server.chunk_delay)
+                done = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                self._write_chunk(f"data: {json.dumps(done)}\n\n")
+                self._write_chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n")
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟的随机抖动范围（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockDeepseekServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    print(f"mock Deepseek 服务器已启动：{server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()